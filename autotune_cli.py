@@ -0,0 +1,161 @@
+# autotune_cli.py
+"""
+Headless auto-tuning af én robot (uden Tk)
+
+Kører samme auto-tune forløb som GUI'en (AutoTuneEngine) i sin egen
+event-loop. Fremdriften skrives som én JSON-linje pr. hændelse på stdout
+(started, job, run_started, run_stopped, result, timing, status, finished/stopped);
+øvrig log-tekst går til stderr, så stdout kan pipes direkte til en fil eller jq.
+
+Brug:
+    python autotune_cli.py --port /dev/ttyUSB0 --strategy halving > progress.jsonl
+    python autotune_cli.py --space space.json --resume
+    python autotune_cli.py --simulate --speed 20 --duration 10   # Simuleret robot, 20x realtid
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    SERIAL_PORT,
+    BAUD_RATE,
+    AUTO_STRATEGY,
+    AUTO_DURATION_SEC,
+    HALVING_DURATION_S,
+    AUTO_GRID_ORDER,
+    REPEAT_TOP_K,
+    AUTOTUNE_RESULTS_FILE,
+    AUTOTUNE_CAMPAIGN_FILE,
+    SIMROBOT_SPEED,
+    PLANT_PARAMETER_FILE,
+    load_pid_settings
+)
+from communication.serial_handler import SerialThread
+from datalogger.data_logger import DataLogger
+from tuning.auto_tuner import AutoTuner
+from tuning.strategies import STRATEGIES, NelderMeadStrategy
+from tuning.search_space import GRID_ORDERS, SearchSpace
+from tuning.engine import AutoTuneEngine, EventLoop
+from simulation.simulated_robot import SimulatedRobot
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+
+class JsonProgress:
+    """Skriver motorens hændelser som JSON-linjer (samples udelades)"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, event, data):
+        if event == 'sample':
+            return
+        self.stream.write(json.dumps(dict(data, event=event)) + "\n")
+        self.stream.flush()
+
+
+def build_autotuner(args, history):
+    if args.resume:
+        return AutoTuner.from_campaign(args.campaign, history=history, retest=args.retest)
+    if args.space:
+        with open(args.space, 'r') as f:
+            space = json.load(f)
+    else:
+        space = SearchSpace.default_spec()
+    tune_params = {'space': space, 'duration_s': args.duration, 'grid_order': args.order,
+                   'repeat_top_k': args.repeat_top_k}
+    if args.strategy == NelderMeadStrategy.name:
+        # Startpunktet gemmes i kampagnen, så --resume fortsætter fra samme simplex
+        tune_params['strategy_options'] = {'start': NelderMeadStrategy.default_start()}
+    return AutoTuner(tune_params, strategy=args.strategy, campaign_file=args.campaign, history=history,
+                     retest=args.retest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless auto-tuning med JSON-fremdrift på stdout.")
+    parser.add_argument('--port', type=str, default=SERIAL_PORT)
+    parser.add_argument('--baudrate', type=int, default=BAUD_RATE)
+    parser.add_argument('--strategy', type=str, default=AUTO_STRATEGY, choices=sorted(STRATEGIES))
+    parser.add_argument('--duration', type=float, default=None,
+                        help=f'Kørselstid pr. job i sekunder (standard {AUTO_DURATION_SEC}s, '
+                             f'{HALVING_DURATION_S:g}s for halving/hyperband).')
+    parser.add_argument('--order', type=str, default=AUTO_GRID_ORDER, choices=GRID_ORDERS)
+    parser.add_argument('--space', type=str, default=None,
+                        help='JSON-fil med søgerummet (liste af dimensioner, se tuning/search_space.py).')
+    parser.add_argument('--repeat-top-k', type=int, default=REPEAT_TOP_K,
+                        help='Gentag kandidater indtil rækkefølgen af de k bedste er afgjort (0 = ingen gentagelser).')
+    parser.add_argument('--campaign', type=str, default=AUTOTUNE_CAMPAIGN_FILE)
+    parser.add_argument('--resume', action='store_true', help='Genoptag kampagnen i --campaign.')
+    parser.add_argument('--retest', action='store_true', help='Gentest jobs der allerede findes i historikken.')
+    parser.add_argument('--connect-timeout', type=float, default=10.0, help='Sekunder at vente på forbindelsen.')
+    parser.add_argument('--results', type=str, default=AUTOTUNE_RESULTS_FILE, help='CSV-fil til resultaterne.')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Tun en simuleret robot på en pty i stedet for --port.')
+    parser.add_argument('--speed', type=float, default=SIMROBOT_SPEED,
+                        help='Med --simulate: simulerede sekunder pr. sekund (timerne skaleres tilsvarende).')
+    parser.add_argument('--plant-file', type=str, default=PLANT_PARAMETER_FILE,
+                        help='Med --simulate: identificerede model-parametre (fra identify_plant.py).')
+    parser.add_argument('--uncalibrated', action='store_true',
+                        help='Med --simulate: brug standard-modellen uden identificerede parametre (kun til test).')
+    args = parser.parse_args()
+    if args.duration is None:
+        args.duration = STRATEGIES[args.strategy].default_duration_s
+
+    progress = JsonProgress(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        history = DataLogger.read_autotune_results(args.results)
+        try:
+            autotuner = build_autotuner(args, history)
+        except (ValueError, IOError) as e:
+            print(f"AUTO-TUNE ERROR: {e}")
+            sys.exit(1)
+        if autotuner.total_jobs == 0:
+            print("AUTO-TUNE ERROR: Ingen test-jobs at køre. Tjek søgerummet.")
+            sys.exit(1)
+
+        time_scale = 1.0
+        if args.simulate:
+            try:
+                robot = SimulatedRobot(WheeledPendulumSimulator.from_parameter_file(args.plant_file, args.uncalibrated),
+                                       speed=args.speed)
+            except ValueError as e:
+                print(f"AUTO-TUNE ERROR: {e}")
+                sys.exit(1)
+            robot.start()
+            args.port = robot.port
+            time_scale = args.speed
+            print(f"SIMULERING: Simuleret robot på {robot.port} ({args.speed:g}x realtid)")
+
+        loop = EventLoop(time_scale=time_scale)
+        serial_thread = SerialThread(args.port, args.baudrate,
+                                     lambda line: loop.call_soon(lambda: engine.handle_line(line)),
+                                     lambda message: print(f"SERIAL: {message}"))
+        engine = AutoTuneEngine(serial_thread, loop, results_file=args.results)
+        engine.add_listener(progress)
+        engine.add_listener(lambda event, data: loop.stop() if event in ('finished', 'stopped') else None)
+
+        serial_thread.start()
+        deadline = time.time() + args.connect_timeout
+        while not serial_thread.is_connected() and serial_thread.is_alive() and time.time() < deadline:
+            time.sleep(0.1)
+        if not serial_thread.is_connected():
+            print(f"AUTO-TUNE ERROR: Kunne ikke forbinde til {args.port}.")
+            serial_thread.stop()
+            sys.exit(1)
+
+        base_params, _ = load_pid_settings()
+        loop.call_soon(lambda: engine.start(autotuner, base_params))
+        try:
+            loop.run()
+        except KeyboardInterrupt:
+            # Kampagnen er gemt efter hvert job og kan genoptages med --resume
+            engine.stop("Afbrudt (Ctrl+C)")
+        finally:
+            serial_thread.stop()
+            serial_thread.join(timeout=2)
@@ -0,0 +1,149 @@
+# discretization_study.py
+"""
+Diskretiseringsstudie i simulering: regulator-periode, filter-alpha og IMU-forsinkelse
+
+For hver kombination søges gains (fælles tilfældige samples, de bedste
+genkørt med ny støj), og den bedste opnåelige score rapporteres sammen med
+andelen af gains der holder robotten oppe. Tabellen viser også forskellen til
+firmwarens nuværende indstilling (LOOP_TIME_MS 50, ALPHA 0.1), så timing-
+budgettet kan vælges ud fra data.
+
+Brug:
+    python discretization_study.py
+    python discretization_study.py --loop-times 0.01,0.02,0.05 --alphas 0.1,1 --delays 0 --samples 1000
+    python discretization_study.py --output discretization.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    DISC_LOOP_TIMES_S,
+    DISC_FILTER_ALPHAS,
+    DISC_SENSOR_DELAYS_S,
+    DISC_GAIN_SAMPLES,
+    DISC_KP_RANGE,
+    DISC_KI_RANGE,
+    DISC_KD_RANGE,
+    DISC_CONFIRM_TOP,
+    DISC_CONFIRM_SEEDS,
+    PLANT_LOOP_TIME_S,
+    PLANT_FILTER_ALPHA,
+    PLANT_SENSOR_DELAY_S,
+    SIM_DURATION_S,
+    SIM_SEED,
+    PLANT_PARAMETER_FILE
+)
+from datalogger.data_logger import DataLogger
+from simulation.discretization import DiscretizationStudy
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+
+def parse_list(text):
+    return tuple(float(x) for x in text.split(','))
+
+
+def parse_range(text):
+    low, high = (float(x) for x in text.split(','))
+    return low, high
+
+
+def is_firmware(row, firmware):
+    return all(abs(row[name] - value) < 1e-9 for name, value in firmware.items())
+
+
+def print_report(rows, firmware):
+    reference = next((row['score'] for row in rows if is_firmware(row, firmware)), None)
+    print(f"\n{'Loop':>7}{'Alpha':>7}{'Forsink.':>10}{'Score':>9}{'Søgning':>9}{'Stabile':>9}"
+          f"{'Forskel':>9}  Bedste gains")
+    for row in rows:
+        marker = " *" if is_firmware(row, firmware) else ""
+        delta = f"{row['score'] - reference:>+9.1f}" if reference is not None else f"{'-':>9}"
+        print(f"{row['loop_time_s'] * 1000:>5.0f}ms{row['filter_alpha']:>7.2f}{row['sensor_delay_s'] * 1000:>8.0f}ms"
+              f"{row['score']:>9.1f}{row['screen_score']:>9.1f}{100.0 * row['stable_fraction']:>8.0f}%{delta}"
+              f"  KP={row['kp']:.1f}, KI={row['ki']:.1f}, KD={row['kd']:.2f}{marker}")
+    if reference is not None:
+        print("* = firmwarens nuværende indstilling (Forskel er i forhold til den)")
+
+    print("\nBedste score pr. regulator-periode:")
+    for loop_time_s in sorted({row['loop_time_s'] for row in rows}):
+        best = max((row for row in rows if row['loop_time_s'] == loop_time_s), key=lambda row: row['score'])
+        print(f"  {loop_time_s * 1000:>5.0f} ms: {best['score']:>7.1f} (alpha {best['filter_alpha']:g}, "
+              f"forsinkelse {best['sensor_delay_s'] * 1000:.0f} ms)")
+
+
+def write_csv(rows, filename):
+    columns = ["LoopTimeMs", "FilterAlpha", "SensorDelayMs", "Score", "ScreenScore", "StableFraction",
+               "KP", "KI", "KD"]
+    DataLogger.write_csv_rows(filename, columns, [
+        {"LoopTimeMs": f"{row['loop_time_s'] * 1000:g}", "FilterAlpha": f"{row['filter_alpha']:g}",
+         "SensorDelayMs": f"{row['sensor_delay_s'] * 1000:g}", "Score": f"{row['score']:.2f}",
+         "ScreenScore": f"{row['screen_score']:.2f}", "StableFraction": f"{row['stable_fraction']:.3f}",
+         "KP": f"{row['kp']:.3f}", "KI": f"{row['ki']:.3f}", "KD": f"{row['kd']:.4f}"}
+        for row in rows])
+    print(f"Resultater gemt til {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bedste simulerede score pr. regulator-periode, "
+                                                 "filter-alpha og IMU-forsinkelse.")
+    parser.add_argument('--loop-times', type=parse_list, default=DISC_LOOP_TIMES_S,
+                        help='Regulator-perioder i sekunder, f.eks. 0.01,0.02,0.05.')
+    parser.add_argument('--alphas', type=parse_list, default=DISC_FILTER_ALPHAS, help='Filter-alpha værdier.')
+    parser.add_argument('--delays', type=parse_list, default=DISC_SENSOR_DELAYS_S,
+                        help='IMU-forsinkelser i sekunder.')
+    parser.add_argument('--samples', type=int, default=DISC_GAIN_SAMPLES, help='Tilfældige gains pr. kombination.')
+    parser.add_argument('--kp', type=parse_range, default=DISC_KP_RANGE, help='Interval for KP, f.eks. 0,100.')
+    parser.add_argument('--ki', type=parse_range, default=DISC_KI_RANGE, help='Interval for KI.')
+    parser.add_argument('--kd', type=parse_range, default=DISC_KD_RANGE, help='Interval for KD.')
+    parser.add_argument('--confirm-top', type=int, default=DISC_CONFIRM_TOP,
+                        help='Bedste gains pr. kombination der genkøres med ny støj.')
+    parser.add_argument('--confirm-seeds', type=int, default=DISC_CONFIRM_SEEDS, help='Antal genkørsler.')
+    parser.add_argument('--duration', type=float, default=SIM_DURATION_S, help='Simuleret kørselstid i sekunder.')
+    parser.add_argument('--plant-file', type=str, default=PLANT_PARAMETER_FILE,
+                        help='Identificerede model-parametre (fra identify_plant.py); kræves uden --uncalibrated.')
+    parser.add_argument('--uncalibrated', action='store_true',
+                        help='Brug standard-modellen uden identificerede parametre (kun til test af værktøjet).')
+    parser.add_argument('--seed', type=int, default=SIM_SEED)
+    parser.add_argument('--output', type=str, default=None, help='Valgfri CSV-fil til resultatet.')
+    args = parser.parse_args()
+
+    try:
+        simulator_options = WheeledPendulumSimulator.calibrated_parameters(args.plant_file, args.uncalibrated)
+    except ValueError as e:
+        print(f"FEJL: {e}")
+        sys.exit(1)
+    if simulator_options:
+        print(f"SIMULERING: Model-parametre fra {args.plant_file}")
+    else:
+        print("SIMULERING: Advarsel - ukalibreret standard-model; resultaterne siger intet om robotten.")
+    # Den identificerede periode er firmwarens nuværende - den bruges som reference i tabellen
+    firmware = {'loop_time_s': simulator_options.get('loop_time_s', PLANT_LOOP_TIME_S),
+                'filter_alpha': simulator_options.get('filter_alpha', PLANT_FILTER_ALPHA),
+                'sensor_delay_s': simulator_options.get('sensor_delay_s', PLANT_SENSOR_DELAY_S)}
+    simulator_options['duration_s'] = args.duration
+    try:
+        study = DiscretizationStudy(loop_times_s=args.loop_times, filter_alphas=args.alphas,
+                                    sensor_delays_s=args.delays, gain_samples=args.samples, kp_range=args.kp,
+                                    ki_range=args.ki, kd_range=args.kd, confirm_top=args.confirm_top,
+                                    confirm_seeds=args.confirm_seeds, simulator_options=simulator_options,
+                                    seed=args.seed)
+    except ValueError as e:
+        print(f"FEJL: {e}")
+        sys.exit(1)
+
+    per_period = study.num_combinations // len(study.loop_times_s) * args.samples
+    print(f"SIMULERING: {study.num_combinations} kombinationer x {args.samples} gains "
+          f"({per_period} konfigurationer pr. regulator-periode)...")
+    start = time.perf_counter()
+    rows = study.run(progress=lambda loop_time_s, loop_rows: print(
+        f"  {loop_time_s * 1000:>5.0f} ms færdig: bedste score {max(row['score'] for row in loop_rows):.1f} "
+        f"({time.perf_counter() - start:.1f}s)"))
+    print_report(rows, firmware)
+    if args.output:
+        write_csv(rows, args.output)
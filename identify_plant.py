@@ -0,0 +1,99 @@
+# identify_plant.py
+"""
+System-identifikation fra detaljerede logs
+
+Fitter en ARX-model fra balanceCmd til pitch og de fysiske parametre for
+WheeledPendulumSimulator (pendullængde, balancepunkt, motorens tidskonstant
+og RPM pr. output) med mindste kvadraters metode over alle session-logs.
+Parametrene gemmes i PLANT_PARAMETER_FILE, som simuleringsværktøjerne kan
+indlæse med --plant-file.
+
+Brug:
+    python identify_plant.py
+    python identify_plant.py --files "data/session_*KP18*_detailed.csv" --na 3 --nb 3
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    DATA_DIR,
+    SYSID_CACHE_DIR,
+    SYSID_ARX_NA,
+    SYSID_ARX_NB,
+    SYSID_ARX_NK,
+    PLANT_PARAMETER_FILE
+)
+from analysis.system_identification import SystemIdentifier
+
+
+def format_fit(fit):
+    if fit is None:
+        return "for få data"
+    return f"fit {fit['fit_percent']:.1f}%, R2 {fit['r2']:.3f}, RMSE {fit['rmse']:.4g} ({fit['samples']} samples)"
+
+
+def print_report(results):
+    print("\nPr. fil (ARX fit):")
+    for row in results['files']:
+        fit = f"{row['fit_percent']:.1f}%" if row['fit_percent'] is not None else "-"
+        print(f"  {os.path.basename(row['file']):<60} {row['runs']:>3} kørsler {row['samples']:>7} samples  {fit}")
+
+    arx = results['arx']
+    print(f"\nARX (balanceCmd -> pitch): {format_fit(arx)}")
+    if arx is not None:
+        print(f"  na={arx['na']}, nb={arx['nb']}, nk={arx['nk']}, sample-tid {arx['sample_time_s'] * 1000:.1f} ms")
+        for name, value in arx['params'].items():
+            print(f"  {name:>4} = {value:+.5f} ± {arx['stderr'][name]:.5f}")
+
+    for title, fit in (("Pendul (omega' = g/l*theta - a/l + c0)", results['pendulum']),
+                       ("Motor (dv = alpha*(G*u - v))", results['motor'])):
+        print(f"\n{title}: {format_fit(fit)}")
+        if fit is not None:
+            for name, value in fit['params'].items():
+                print(f"  {name:>10} = {value:+.5g} ± {fit['stderr'][name]:.3g}")
+
+    print("\nModel-parametre til simulatoren:")
+    if not results['plant']:
+        print("  Ingen - loggene mangler displacement eller giver ikke fysisk meningsfulde værdier.")
+    for name, value in results['plant'].items():
+        print(f"  {name:<24} {value:.4g}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="System-identifikation fra detaljerede session-logs.")
+    parser.add_argument('--data-dir', type=str, default=DATA_DIR, help='Mappe med session_*_detailed.csv filer.')
+    parser.add_argument('--files', type=str, default=None, help='Glob-mønster der erstatter --data-dir.')
+    parser.add_argument('--na', type=int, default=SYSID_ARX_NA, help='ARX: antal tidligere pitch-værdier.')
+    parser.add_argument('--nb', type=int, default=SYSID_ARX_NB, help='ARX: antal balanceCmd-værdier.')
+    parser.add_argument('--nk', type=int, default=SYSID_ARX_NK, help='ARX: forsinkelse i samples.')
+    parser.add_argument('--cache-dir', type=str, default=SYSID_CACHE_DIR, help='Mappe til binære log-kopier.')
+    parser.add_argument('--output', type=str, default=PLANT_PARAMETER_FILE, help='JSON-fil til model-parametrene.')
+    args = parser.parse_args()
+
+    pattern = args.files or os.path.join(args.data_dir, "session_*_detailed.csv")
+    files = sorted(glob.glob(pattern))
+    if not files:
+        print(f"Ingen logfiler fundet ({pattern}).")
+        sys.exit(1)
+
+    try:
+        identifier = SystemIdentifier(na=args.na, nb=args.nb, nk=args.nk, cache_dir=args.cache_dir)
+    except ValueError as e:
+        print(f"FEJL: {e}")
+        sys.exit(1)
+    for filename in files:
+        identifier.add_file(filename)
+
+    results = identifier.results()
+    print_report(results)
+    if results['arx'] is None:
+        print("\nFor få brugbare kørsler til et fit - intet gemt.")
+        sys.exit(1)
+    SystemIdentifier.export(args.output, results)
+    print(f"\nParametre gemt til {args.output}")
@@ -0,0 +1,84 @@
+# multi_robot_tune.py
+"""
+Automatisk tuning fordelt på flere identiske robotter (uden GUI)
+
+Hver port får sin egen robot-worker, og jobs fra søgestrategien deles ud fra
+en fælles kø. Resultaterne logges i autotune_results.csv med robot-ID og rå
+score, og kampagnen gemmes løbende, så den kan genoptages med --resume.
+
+Brug:
+    python multi_robot_tune.py --ports /dev/ttyUSB0,/dev/ttyUSB1 --strategy bayes
+"""
+
+import argparse
+import os
+import sys
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    AUTO_STRATEGY,
+    AUTO_DURATION_SEC,
+    HALVING_DURATION_S,
+    AUTO_GRID_ORDER,
+    REPEAT_TOP_K,
+    AUTOTUNE_RESULTS_FILE,
+    AUTOTUNE_CAMPAIGN_FILE,
+    MULTI_ROBOT_PORTS,
+    MULTI_ROBOT_REFERENCE_INTERVAL,
+    BAUD_RATE,
+    load_pid_settings
+)
+from datalogger.data_logger import DataLogger
+from tuning.auto_tuner import AutoTuner
+from tuning.strategies import STRATEGIES, NelderMeadStrategy
+from tuning.search_space import GRID_ORDERS, SearchSpace
+from tuning.multi_robot import MultiRobotScheduler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auto-tuning fordelt på flere robotter.")
+    parser.add_argument('--ports', type=str, default=",".join(MULTI_ROBOT_PORTS),
+                        help='Kommasepareret liste af serielle porte (én pr. robot).')
+    parser.add_argument('--baudrate', type=int, default=BAUD_RATE)
+    parser.add_argument('--strategy', type=str, default=AUTO_STRATEGY, choices=sorted(STRATEGIES))
+    parser.add_argument('--duration', type=float, default=None,
+                        help=f'Kørselstid pr. job i sekunder (standard {AUTO_DURATION_SEC}s, '
+                             f'{HALVING_DURATION_S:g}s for halving/hyperband).')
+    parser.add_argument('--order', type=str, default=AUTO_GRID_ORDER, choices=GRID_ORDERS)
+    parser.add_argument('--reference-interval', type=int, default=MULTI_ROBOT_REFERENCE_INTERVAL,
+                        help='Kør reference-konfigurationen for hver N jobs pr. robot (0 = aldrig).')
+    parser.add_argument('--repeat-top-k', type=int, default=REPEAT_TOP_K,
+                        help='Gentag kandidater indtil rækkefølgen af de k bedste er afgjort (0 = ingen gentagelser).')
+    parser.add_argument('--campaign', type=str, default=AUTOTUNE_CAMPAIGN_FILE)
+    parser.add_argument('--resume', action='store_true', help='Genoptag kampagnen i --campaign.')
+    parser.add_argument('--retest', action='store_true', help='Gentest jobs der allerede findes i historikken.')
+    args = parser.parse_args()
+    if args.duration is None:
+        args.duration = STRATEGIES[args.strategy].default_duration_s
+
+    ports = [port.strip() for port in args.ports.split(',') if port.strip()]
+    history = DataLogger.read_autotune_results(AUTOTUNE_RESULTS_FILE)
+    try:
+        if args.resume:
+            tuner = AutoTuner.from_campaign(args.campaign, history=history, retest=args.retest)
+        else:
+            tune_params = {'space': SearchSpace.default_spec(), 'duration_s': args.duration, 'grid_order': args.order,
+                           'repeat_top_k': args.repeat_top_k}
+            if args.strategy == NelderMeadStrategy.name:
+                tune_params['strategy_options'] = {'start': NelderMeadStrategy.default_start()}
+            tuner = AutoTuner(tune_params, strategy=args.strategy, campaign_file=args.campaign,
+                              history=history, retest=args.retest)
+    except ValueError as e:
+        print(f"AUTO-TUNE ERROR: {e}")
+        sys.exit(1)
+
+    base_params, _ = load_pid_settings()
+    scheduler = MultiRobotScheduler(tuner, ports, base_params=base_params, baudrate=args.baudrate,
+                                    reference_interval=args.reference_interval)
+    if scheduler.run() == 0:
+        print("AUTO-TUNE ERROR: Ingen robotter kunne forbindes.")
+        sys.exit(1)
+    if tuner.best_job:
+        print(f"Bedste: {AutoTuner.format_job(tuner.best_job)} (Score {tuner.best_score:.2f})")
@@ -13,7 +13,7 @@ import numpy as np
 from scipy.interpolate import griddata
 from scipy.spatial import QhullError
 
-def create_plot(file_path, min_score=None):
+def create_plot(file_path, min_score=None, max_rank=None):
     """Hovedfunktion til at oprette og håndtere det interaktive plot."""
     try:
         if not os.path.exists(file_path):
@@ -24,6 +24,9 @@ def create_plot(file_path, min_score=None):
         if min_score is not None:
             full_df = full_df[full_df['Score'] >= min_score]
             print(f"Viser kun resultater med score >= {min_score}")
+        if max_rank is not None and 'Rank' in full_df:
+            full_df = full_df[full_df['Rank'] <= max_rank]
+            print(f"Viser kun jobs med Pareto-rang <= {max_rank}")
         
         available_ki_values = sorted(full_df['KI'].unique())
 
@@ -113,6 +116,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Visualiser auto-tuner resultater i 3D.")
     parser.add_argument('--file', type=str, default='autotune_results.csv', help='Sti til CSV-fil.')
     parser.add_argument('--min-score', type=float, default=None, help='Minimum score, der skal vises.')
+    parser.add_argument('--max-rank', type=int, default=None,
+                        help='Vis kun jobs med Pareto-rang <= denne (kræver Rank-kolonnen i pareto_front.csv).')
     args = parser.parse_args()
     
-    create_plot(args.file, args.min_score)
\ No newline at end of file
+    create_plot(args.file, args.min_score, args.max_rank)
\ No newline at end of file
@@ -18,6 +18,8 @@ try:
     parser = argparse.ArgumentParser(description="Visualiser auto-tuner resultater i 3D.")
     parser.add_argument('--file', type=str, default='autotune_results.csv', help='Sti til CSV-fil.')
     parser.add_argument('--min-score', type=float, default=None, help='Minimum score, der skal vises.')
+    parser.add_argument('--max-rank', type=int, default=None,
+                        help='Vis kun jobs med Pareto-rang <= denne (kræver Rank-kolonnen i pareto_front.csv).')
     args = parser.parse_args()
 
     if not os.path.exists(args.file):
@@ -28,6 +30,9 @@ try:
     if args.min_score is not None:
         full_df = full_df[full_df['Score'] >= args.min_score]
         print(f"Viser kun resultater med score >= {args.min_score}")
+    if args.max_rank is not None and 'Rank' in full_df:
+        full_df = full_df[full_df['Rank'] <= args.max_rank]
+        print(f"Viser kun jobs med Pareto-rang <= {args.max_rank}")
     
     # Find de unikke KI værdier, som slideren skal kunne vælge imellem
     available_ki_values = sorted(full_df['KI'].unique())
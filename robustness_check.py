@@ -0,0 +1,116 @@
+# robustness_check.py
+"""
+Monte Carlo robusthed af PID-kandidater i simulering
+
+Kandidaterne (angivet direkte eller de bedste fra auto-tune resultaterne)
+simuleres på mange tilfældigt forstyrrede modeller af robotten (batteri,
+masse, motor, IMU-forsinkelse, balancepunkt) fordelt over CPU-kernerne.
+Tabellen sorteres efter andelen der vælter og derefter 5%-percentilen, så
+robuste kandidater står øverst.
+
+Brug:
+    python robustness_check.py                          # Top 10 fra autotune_results.csv
+    python robustness_check.py --candidate 18,0.1,0.2 --candidate 20,0,0.3 --samples 500
+"""
+
+import argparse
+import os
+import sys
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    AUTOTUNE_RESULTS_FILE,
+    ROBUST_SAMPLES,
+    ROBUST_WORKERS,
+    ROBUST_TOP_CANDIDATES,
+    SIM_DURATION_S,
+    SIM_SEED,
+    PLANT_PARAMETER_FILE
+)
+from datalogger.data_logger import DataLogger
+from simulation.robustness import RobustnessEvaluator, SIMULATED_PARAMS
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+
+def parse_candidate(text):
+    kp, ki, kd = (float(x) for x in text.split(','))
+    return {'kp': kp, 'ki': ki, 'kd': kd}
+
+
+def top_candidates(filename, count):
+    """De bedste unikke parameter-sæt fra auto-tune resultaterne (bedste score pr. sæt)"""
+    best = {}
+    for params, score in DataLogger.read_autotune_results(filename):
+        job = {name: params[name] for name in SIMULATED_PARAMS if name in params}
+        key = tuple(sorted(job.items()))
+        if key not in best or score > best[key][1]:
+            best[key] = (job, score)
+    ranked = sorted(best.values(), key=lambda item: item[1], reverse=True)
+    return [job for job, _ in ranked[:count]]
+
+
+def format_job(job):
+    return ", ".join(f"{name.upper()}={job[name]:g}" for name in SIMULATED_PARAMS if name in job)
+
+
+def print_report(results):
+    # Væltede kørsler scorer 0, så færrest fald sorteres først og derefter den laveste percentil
+    results = sorted(results, key=lambda row: (row['failure_rate'], -row['p5'], -row['mean']))
+    print(f"{'Nominel':>9}{'Middel':>9}{'Std':>8}{'P5':>9}{'Vælter':>8}  Kandidat")
+    for row in results:
+        print(f"{row['nominal']:>9.1f}{row['mean']:>9.1f}{row['std']:>8.1f}{row['p5']:>9.1f}"
+              f"{100.0 * row['failure_rate']:>7.0f}%  {format_job(row['job'])}")
+
+
+def write_csv(results, filename):
+    names = [name for name in SIMULATED_PARAMS if any(name in row['job'] for row in results)]
+    columns = [name.upper() for name in names] + ["Nominal", "Mean", "Std", "P5", "FailureRate"]
+    rows = [dict({name.upper(): row['job'].get(name, "") for name in names},
+                 Nominal=f"{row['nominal']:.2f}", Mean=f"{row['mean']:.2f}", Std=f"{row['std']:.2f}",
+                 P5=f"{row['p5']:.2f}", FailureRate=f"{row['failure_rate']:.3f}") for row in results]
+    DataLogger.write_csv_rows(filename, columns, rows)
+    print(f"Resultater gemt til {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo robusthed af PID-kandidater i simulering.")
+    parser.add_argument('--candidate', type=parse_candidate, action='append', default=[],
+                        help='Kandidat som KP,KI,KD (kan gentages). Uden kandidater bruges --results.')
+    parser.add_argument('--results', type=str, default=AUTOTUNE_RESULTS_FILE, help='Auto-tune resultater (CSV).')
+    parser.add_argument('--top', type=int, default=ROBUST_TOP_CANDIDATES, help='Antal kandidater fra --results.')
+    parser.add_argument('--samples', type=int, default=ROBUST_SAMPLES, help='Forstyrrede modeller pr. kandidat.')
+    parser.add_argument('--workers', type=int, default=ROBUST_WORKERS, help='Antal processer (standard: CPU-kerner).')
+    parser.add_argument('--duration', type=float, default=SIM_DURATION_S, help='Simuleret kørselstid i sekunder.')
+    parser.add_argument('--plant-file', type=str, default=PLANT_PARAMETER_FILE,
+                        help='Identificerede model-parametre (fra identify_plant.py); kræves uden --uncalibrated.')
+    parser.add_argument('--uncalibrated', action='store_true',
+                        help='Brug standard-modellen uden identificerede parametre (kun til test af værktøjet).')
+    parser.add_argument('--seed', type=int, default=SIM_SEED)
+    parser.add_argument('--output', type=str, default=None, help='Valgfri CSV-fil til resultatet.')
+    args = parser.parse_args()
+
+    candidates = args.candidate or top_candidates(args.results, args.top)
+    if not candidates:
+        print(f"Ingen kandidater: angiv --candidate eller kør auto-tune først ({args.results}).")
+        sys.exit(1)
+
+    try:
+        simulator_options = WheeledPendulumSimulator.calibrated_parameters(args.plant_file, args.uncalibrated)
+    except ValueError as e:
+        print(f"FEJL: {e}")
+        sys.exit(1)
+    if simulator_options:
+        print(f"SIMULERING: Model-parametre fra {args.plant_file}")
+    else:
+        print("SIMULERING: Advarsel - ukalibreret standard-model; resultaterne siger intet om robotten.")
+    simulator_options['duration_s'] = args.duration
+    evaluator = RobustnessEvaluator(simulator_options=simulator_options, samples=args.samples,
+                                    workers=args.workers, seed=args.seed)
+    print(f"SIMULERING: {len(candidates)} kandidater x {args.samples} forstyrrede modeller "
+          f"på {evaluator.workers} processer...")
+    results = evaluator.evaluate(candidates)
+    print_report(results)
+    if args.output:
+        write_csv(results, args.output)
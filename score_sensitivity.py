@@ -0,0 +1,116 @@
+# score_sensitivity.py
+"""
+Script til at undersøge hvor følsom valget af bedste PID-konfiguration er over for
+straf-vægtene i config/settings.py.
+
+Alle detaljerede session-logs i data-mappen læses én gang, metrik-vektorerne
+beregnes pr. kørsel, og derefter genberegnes rangeringen for hele vægt-gitteret
+uden at robotten skal køre igen.
+
+Brug:
+    python score_sensitivity.py --factors 0.5,1,2
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+import numpy as np
+from config.settings import DATA_DIR
+from datalogger.data_logger import DataLogger
+from datalogger.session_manager import SessionManager
+from analysis.weight_sensitivity import WeightSensitivity, WEIGHT_NAMES, DEFAULT_WEIGHTS
+
+
+def load_sessions(data_dir):
+    """Indlæs alle detaljerede session-logs i en WeightSensitivity instans."""
+    sensitivity = WeightSensitivity()
+    files = sorted(glob.glob(os.path.join(data_dir, "session_*_detailed.csv")))
+    for filename in files:
+        pid_params = SessionManager.parse_pid_string(filename)
+        if pid_params is None:
+            print(f"Springer over (ukendt filnavn): {filename}")
+            continue
+        for run_data in DataLogger.read_detailed_runs(filename):
+            sensitivity.add_run(pid_params, run_data)
+    print(f"Indlæst {sensitivity.num_runs} kørsler fordelt på {len(sensitivity.config_keys)} konfigurationer "
+          f"fra {len(files)} filer.")
+    return sensitivity
+
+
+def format_params(pid_params):
+    text = f"KP={pid_params['kp']:.2f}, KI={pid_params['ki']:.2f}, KD={pid_params['kd']:.2f}"
+    if 'init_balance' in pid_params:
+        text += f", Init={pid_params['init_balance']:.2f}"
+    if 'power_gain' in pid_params:
+        text += f", Gain={pid_params['power_gain']:.2f}"
+    return text
+
+
+def print_report(result, top):
+    """Udskriv de vægt-kombinationer der ændrer valget af bedste konfiguration."""
+    weights = result['weights']
+    changed = result['changed']
+    configs = result['config_params']
+
+    print("\n" + "=" * 80)
+    print("Nuværende vægte: " + ", ".join(f"{n}={w:g}" for n, w in zip(WEIGHT_NAMES, DEFAULT_WEIGHTS)))
+    print(f"Bedste konfiguration med nuværende vægte: {format_params(result['baseline_params'])}")
+    print(f"{changed.sum()} af {changed.size} vægt-kombinationer vælger en anden konfiguration "
+          f"({100.0 * changed.mean():.1f}%)")
+    print("=" * 80)
+
+    if not changed.any():
+        return
+
+    # Vis de kombinationer hvor rangeringen afviger mest fra den nuværende
+    order = np.argsort(result['rank_correlation'][changed])[:top]
+    changed_idx = np.flatnonzero(changed)[order]
+    header = "".join(f"{n:>13}" for n in WEIGHT_NAMES) + f"{'RangKorr':>10}{'Score':>9}  Bedste konfiguration"
+    print(header)
+    for i in changed_idx:
+        row = "".join(f"{w:>13g}" for w in weights[i])
+        print(f"{row}{result['rank_correlation'][i]:>10.2f}{result['best_score'][i]:>9.1f}  "
+              f"{format_params(configs[result['best_index'][i]])}")
+
+
+def write_csv(result, filename):
+    """Gem hele gitteret til CSV for videre analyse."""
+    configs = result['config_params']
+    with open(filename, 'w', newline='') as f:
+        f.write(",".join(WEIGHT_NAMES) + ",BestKP,BestKI,BestKD,BestInitBalance,BestPowerGain,"
+                "BestScore,Changed,RankCorrelation\n")
+        for i, weights in enumerate(result['weights']):
+            best = configs[result['best_index'][i]]
+            extra = ",".join(f"{best[name]:.4f}" if name in best else "" for name in ('init_balance', 'power_gain'))
+            f.write(",".join(f"{w:g}" for w in weights) +
+                    f",{best['kp']:.4f},{best['ki']:.4f},{best['kd']:.4f},{extra},"
+                    f"{result['best_score'][i]:.2f},{int(result['changed'][i])},"
+                    f"{result['rank_correlation'][i]:.4f}\n")
+    print(f"Resultater gemt til {filename}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Følsomhedsanalyse af score-vægtene.")
+    parser.add_argument('--data-dir', type=str, default=DATA_DIR, help='Mappe med session_*_detailed.csv filer.')
+    parser.add_argument('--factors', type=str, default='0.5,1,2',
+                        help='Kommasepareret liste af skaleringsfaktorer for hver vægt.')
+    parser.add_argument('--top', type=int, default=20, help='Antal afvigende kombinationer der vises.')
+    parser.add_argument('--output', type=str, default=None, help='Valgfri CSV-fil til hele resultatet.')
+    args = parser.parse_args()
+
+    factors = [float(x) for x in args.factors.split(',') if x.strip()]
+    sensitivity = load_sessions(args.data_dir)
+    if sensitivity.num_runs == 0:
+        print("Ingen kørsler fundet.")
+        sys.exit(0)
+
+    weight_grid = WeightSensitivity.make_weight_grid(factors)
+    result = sensitivity.analyze(weight_grid)
+    print_report(result, args.top)
+    if args.output:
+        write_csv(result, args.output)
@@ -0,0 +1,121 @@
+# sim_benchmark.py
+"""
+Benchmark af den vektoriserede balance-simulering
+
+Simulerer et stort antal tilfældige PID-konfigurationer på én gang med
+BatchBalanceSimulator og måler tiden for simulering og metrik-beregning.
+Bagefter genberegnes metrikkerne for en stikprøve af konfigurationerne med
+ScoreCalculator (den samme kode som scorer robottens kørsler), så det kan
+ses at den vektoriserede udgave giver de samme tal.
+
+Brug:
+    python sim_benchmark.py                      # 10.000 konfigurationer, 10 s ved 100 Hz
+    python sim_benchmark.py --configs 50000 --rate 200 --check 50
+    python sim_benchmark.py --model wheeled --rate 20 --substeps 10   # Firmwarens LOOP_TIME_MS = 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+import numpy as np
+from config.settings import SIM_SEED
+from analysis.score_calculator import ScoreCalculator
+from simulation.balance_sim import BatchBalanceSimulator
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+MODELS = {'pendulum': BatchBalanceSimulator, 'wheeled': WheeledPendulumSimulator}
+METRIC_NAMES = ('valid_time', 'amplitude_rms', 'avg_frequency', 'degradation_factor', 'position_rmse_m')
+
+
+def parse_range(text):
+    low, high = (float(x) for x in text.split(','))
+    return low, high
+
+
+def random_gains(num_configs, kp_range, ki_range, kd_range, seed):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(*kp_range, num_configs), rng.uniform(*ki_range, num_configs),
+            rng.uniform(*kd_range, num_configs))
+
+
+def cross_check(simulator, result, metrics, indices):
+    """
+    Største afvigelse pr. metrik mellem den vektoriserede beregning og
+    ScoreCalculator for de valgte konfigurationer.
+    """
+    deviations = {name: 0.0 for name in METRIC_NAMES + ('score',)}
+    for i in indices:
+        run_data = simulator.run_data(result, i)
+        # ScoreCalculator skriver debug-linjer med hele kørslen - dem vil vi ikke se her
+        with contextlib.redirect_stdout(io.StringIO()):
+            reference = ScoreCalculator.calculate_run_metrics(run_data)
+            score, _, _, _ = ScoreCalculator.calculate_run_score(run_data)
+        reference['score'] = score
+        for name in deviations:
+            expected, actual = reference[name], float(metrics[name][i])
+            if np.isinf(expected) and np.isinf(actual):
+                continue
+            deviations[name] = max(deviations[name], abs(expected - actual))
+    return deviations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark af vektoriseret simulering af mange PID-konfigurationer.")
+    parser.add_argument('--model', type=str, default='pendulum', choices=sorted(MODELS),
+                        help='pendulum: output = hjul-acceleration, wheeled: firmwarens motor-kæde.')
+    parser.add_argument('--configs', type=int, default=10000, help='Antal konfigurationer der simuleres samtidig.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Simuleret kørselstid i sekunder.')
+    parser.add_argument('--rate', type=float, default=100.0, help='Regulatorens frekvens i Hz.')
+    parser.add_argument('--substeps', type=int, default=1, help='Integrations-skridt pr. regulator-periode.')
+    parser.add_argument('--kp', type=parse_range, default=(0.0, 60.0), help='Interval for KP, f.eks. 0,60.')
+    parser.add_argument('--ki', type=parse_range, default=(0.0, 5.0), help='Interval for KI.')
+    parser.add_argument('--kd', type=parse_range, default=(0.0, 3.0), help='Interval for KD.')
+    parser.add_argument('--check', type=int, default=20,
+                        help='Antal konfigurationer der genberegnes med ScoreCalculator (0 = ingen kontrol).')
+    parser.add_argument('--seed', type=int, default=SIM_SEED)
+    args = parser.parse_args()
+
+    loop_time_s = 1.0 / args.rate
+    simulator = MODELS[args.model](dt=loop_time_s / args.substeps, loop_time_s=loop_time_s,
+                                         duration_s=args.duration, seed=args.seed)
+    kp, ki, kd = random_gains(args.configs, args.kp, args.ki, args.kd, args.seed)
+
+    start = time.perf_counter()
+    result = simulator.simulate(kp, ki, kd)
+    simulated = time.perf_counter()
+    metrics = simulator.metrics(result)
+    finished = time.perf_counter()
+
+    steps = simulator.num_loops * simulator.substeps
+    trajectory_mb = (result['pitch_deg'].nbytes + result['position_m'].nbytes) / 1e6
+    print(f"{args.model}: {args.configs} konfigurationer x {args.duration:g} s ved {args.rate:g} Hz "
+          f"({simulator.num_loops} regulator-perioder, {steps} integrations-skridt)")
+    print(f"  Simulering:       {simulated - start:7.2f} s  "
+          f"({args.configs * steps / (simulated - start) / 1e6:.1f} mio. konfigurations-skridt/s)")
+    print(f"  Metrikker:        {finished - simulated:7.2f} s")
+    print(f"  I alt:            {finished - start:7.2f} s  ({trajectory_mb:.0f} MB trajektorier)")
+    print(f"  Stabile:          {metrics['stable'].sum()} ({100.0 * metrics['stable'].mean():.1f}%)")
+
+    best = int(np.argmax(metrics['score']))
+    print(f"  Bedste score:     {metrics['score'][best]:.1f} "
+          f"(KP={kp[best]:.2f}, KI={ki[best]:.2f}, KD={kd[best]:.2f})")
+
+    if args.check > 0:
+        rng = np.random.default_rng(args.seed)
+        # Halvdelen af stikprøven tages blandt de stabile, så også frekvens og degradering kontrolleres
+        stable = np.flatnonzero(metrics['stable'])
+        indices = np.concatenate([
+            rng.choice(stable, size=min(args.check // 2, stable.size), replace=False),
+            rng.choice(args.configs, size=min(args.check - args.check // 2, args.configs), replace=False)
+        ])
+        deviations = cross_check(simulator, result, metrics, indices)
+        print(f"\nKontrol mod ScoreCalculator ({indices.size} konfigurationer), største afvigelse:")
+        for name, deviation in deviations.items():
+            print(f"  {name:<20} {deviation:.2e}")
@@ -0,0 +1,68 @@
+# simulated_robot.py
+"""
+Start en eller flere simulerede robotter på pseudo-terminaler
+
+Hver robot kører WheeledPendulumSimulator i realtid og taler firmwarens
+serielle protokol, så GUI'en eller multi_robot_tune.py kan forbindes til de
+udskrevne porte i stedet for fysiske robotter. autotune_cli.py kan selv starte
+en simuleret robot med --simulate (og køre hurtigere end realtid med --speed).
+
+Brug:
+    python simulated_robot.py                       # Én robot, porten udskrives
+    python simulated_robot.py --robots 3 --loop-time 0.01
+"""
+
+import argparse
+import os
+import sys
+import time
+
+if os.path.exists('src'):
+    sys.path.insert(0, 'src')
+
+from config.settings import (
+    SIMROBOT_SPEED,
+    SIM_SEED,
+    PLANT_PARAMETER_FILE
+)
+from simulation.simulated_robot import SimulatedRobot
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulerede robotter på pseudo-terminaler.")
+    parser.add_argument('--robots', type=int, default=1, help='Antal robotter (hver sin port og støj).')
+    parser.add_argument('--speed', type=float, default=SIMROBOT_SPEED,
+                        help='Simulerede sekunder pr. sekund. Værten skal skalere sine timere tilsvarende.')
+    parser.add_argument('--loop-time', type=float, default=None, help='Regulatorens periode i sekunder.')
+    parser.add_argument('--plant-file', type=str, default=PLANT_PARAMETER_FILE,
+                        help='Identificerede model-parametre (fra identify_plant.py); kræves uden --uncalibrated.')
+    parser.add_argument('--uncalibrated', action='store_true',
+                        help='Brug standard-modellen uden identificerede parametre (kun til test af værktøjet).')
+    parser.add_argument('--seed', type=int, default=SIM_SEED)
+    args = parser.parse_args()
+
+    overrides = {'loop_time_s': args.loop_time} if args.loop_time else {}
+    robots = []
+    try:
+        for number in range(args.robots):
+            simulator = WheeledPendulumSimulator.from_parameter_file(args.plant_file, args.uncalibrated,
+                                                                     seed=args.seed + number, **overrides)
+            robots.append(SimulatedRobot(simulator, speed=args.speed))
+    except ValueError as e:
+        print(f"FEJL: {e}")
+        sys.exit(1)
+
+    for robot in robots:
+        robot.start()
+        print(f"SIMULERING: Robot på {robot.port} ({robot.simulator.loop_time_s * 1000:.0f} ms loop, "
+              f"{args.speed:g}x realtid)")
+    print("Tryk Ctrl+C for at stoppe.")
+    try:
+        while all(robot.is_alive() for robot in robots):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    for robot in robots:
+        robot.stop()
+        robot.join(timeout=2)
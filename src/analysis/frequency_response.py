@@ -0,0 +1,219 @@
+# analysis/frequency_response.py
+"""
+Frekvensrespons (Bode) estimering fra chirp/PRBS excitation af setpunktet
+
+Excitationen r sendes som et offset på init_balance. Ud fra FFT kryds-spektre
+estimeres plantens overføringsfunktion fra balanceCmd til pitch samt
+sløjfeoverføringen L, hvorfra gain- og fasemargin aflæses.
+"""
+
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config.settings import (
+    EXCITATION_AMPLITUDE_DEG,
+    CHIRP_F_START_HZ,
+    CHIRP_F_END_HZ,
+    PRBS_ORDER,
+    FREQ_RESPONSE_SEGMENT_S,
+    FREQ_RESPONSE_MIN_COHERENCE,
+    SPECTRA_CACHE_DIR
+)
+
+# Feedback-taps for maksimal-længde LFSR (Fibonacci) pr. orden
+PRBS_TAPS = {5: (5, 3), 6: (6, 5), 7: (7, 6), 8: (8, 6, 5, 4), 9: (9, 5), 10: (10, 7)}
+
+
+class FrequencyResponseEstimator:
+    """
+    Generering af excitationssignaler og FFT-baseret estimering af frekvensrespons
+    """
+
+    @staticmethod
+    def chirp_signal(duration_s, update_s, f_start=CHIRP_F_START_HZ, f_end=CHIRP_F_END_HZ,
+                     amplitude=EXCITATION_AMPLITUDE_DEG):
+        """Logaritmisk sweep fra f_start til f_end, samplet med kommando-perioden"""
+        t = np.arange(0.0, duration_s, update_s)
+        k = np.log(f_end / f_start)
+        phase = 2 * np.pi * f_start * duration_s / k * (np.exp(t * k / duration_s) - 1.0)
+        return t, amplitude * np.sin(phase)
+
+    @staticmethod
+    def prbs_signal(duration_s, update_s, amplitude=EXCITATION_AMPLITUDE_DEG, order=PRBS_ORDER):
+        """Pseudo-random binær sekvens (maksimal-længde LFSR) med værdierne +/- amplitude"""
+        taps = PRBS_TAPS.get(order)
+        if taps is None:
+            raise ValueError(f"PRBS orden {order} understøttes ikke")
+
+        t = np.arange(0.0, duration_s, update_s)
+        register = [1] * order
+        bits = np.empty(t.size)
+        for i in range(t.size):
+            bits[i] = register[-1]
+            feedback = 0
+            for tap in taps:
+                feedback ^= register[tap - 1]
+            register = [feedback] + register[:-1]
+        return t, amplitude * (2.0 * bits - 1.0)
+
+    @staticmethod
+    def zero_order_hold(event_times, event_values, timestamps):
+        """Excitationens værdi ved hver telemetri-sample (sidste sendte værdi gælder)"""
+        event_times = np.asarray(event_times, dtype=float)
+        event_values = np.asarray(event_values, dtype=float)
+        idx = np.searchsorted(event_times, np.asarray(timestamps, dtype=float), side='right') - 1
+        return np.where(idx >= 0, event_values[np.clip(idx, 0, None)], 0.0)
+
+    @staticmethod
+    def _welch_spectra(x, y, nperseg):
+        """Gennemsnitligt kryds-spektrum S_xy over Hann-vinduede segmenter med 50% overlap"""
+        window = np.hanning(nperseg)
+        step = max(1, nperseg // 2)
+        x_seg = sliding_window_view(x, nperseg)[::step]
+        y_seg = sliding_window_view(y, nperseg)[::step]
+        x_seg = (x_seg - x_seg.mean(axis=1, keepdims=True)) * window
+        y_seg = (y_seg - y_seg.mean(axis=1, keepdims=True)) * window
+        X = np.fft.rfft(x_seg, axis=1)
+        Y = np.fft.rfft(y_seg, axis=1)
+        return (np.conj(X) * Y).mean(axis=0)
+
+    @staticmethod
+    def estimate(timestamps, excitation, balance_cmd, pitch, segment_s=FREQ_RESPONSE_SEGMENT_S):
+        """
+        Estimér frekvensrespons ud fra en kørsel med excitation
+
+        Telemetrien resamples først til et ækvidistant tidsgitter. Planten
+        estimeres indirekte (P = S_ry / S_ru), så målestøj der ikke er korreleret
+        med excitationen ikke giver bias, og sløjfeoverføringen findes via
+        følsomhedsfunktionen S = S_re / S_rr, hvor e = r - pitch: L = 1/S - 1.
+
+        Returns:
+            dict: freqs, plant, loop og coherence arrays (kun positive frekvenser)
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        if timestamps.size < 16:
+            return None
+
+        dt = float(np.median(np.diff(timestamps)))
+        grid = np.arange(timestamps[0], timestamps[-1], dt)
+        r = np.interp(grid, timestamps, np.asarray(excitation, dtype=float))
+        u = np.interp(grid, timestamps, np.asarray(balance_cmd, dtype=float))
+        y = np.interp(grid, timestamps, np.asarray(pitch, dtype=float))
+        e = r - y
+
+        nperseg = min(int(round(segment_s / dt)), grid.size)
+        if nperseg < 16:
+            return None
+
+        s_rr = FrequencyResponseEstimator._welch_spectra(r, r, nperseg).real
+        s_yy = FrequencyResponseEstimator._welch_spectra(y, y, nperseg).real
+        s_ru = FrequencyResponseEstimator._welch_spectra(r, u, nperseg)
+        s_ry = FrequencyResponseEstimator._welch_spectra(r, y, nperseg)
+        s_re = FrequencyResponseEstimator._welch_spectra(r, e, nperseg)
+
+        freqs = np.fft.rfftfreq(nperseg, dt)
+        valid = (freqs > 0) & (s_rr > 0) & (np.abs(s_ru) > 0) & (np.abs(s_re) > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plant = s_ry / s_ru
+            sensitivity = s_re / s_rr
+            loop = 1.0 / sensitivity - 1.0
+            coherence = np.abs(s_ry) ** 2 / (s_rr * s_yy)
+
+        return {
+            'freqs': freqs[valid],
+            'plant': plant[valid],
+            'loop': loop[valid],
+            'coherence': coherence[valid]
+        }
+
+    @staticmethod
+    def stability_margins(freqs, loop, coherence=None, min_coherence=FREQ_RESPONSE_MIN_COHERENCE):
+        """
+        Find gain- og fasemargin for sløjfeoverføringen L
+
+        Returns:
+            dict: gain_margin_db, phase_margin_deg, gain_crossover_hz, phase_crossover_hz
+                  (inf/nan hvis der ikke findes en krydsning i det målte bånd)
+        """
+        freqs = np.asarray(freqs)
+        loop = np.asarray(loop)
+        if coherence is not None:
+            keep = np.asarray(coherence) >= min_coherence
+            freqs, loop = freqs[keep], loop[keep]
+
+        margins = {
+            'gain_margin_db': float('inf'),
+            'phase_margin_deg': float('inf'),
+            'gain_crossover_hz': float('nan'),
+            'phase_crossover_hz': float('nan')
+        }
+        if freqs.size < 2:
+            return margins
+
+        log_mag = np.log10(np.abs(loop))
+        phase_deg = np.degrees(np.unwrap(np.angle(loop)))
+
+        # Gain-krydsning: |L| = 1. Lineær interpolation mellem nabopunkter
+        cross = np.flatnonzero(np.sign(log_mag[:-1]) != np.sign(log_mag[1:]))
+        if cross.size:
+            i = cross[0]
+            frac = log_mag[i] / (log_mag[i] - log_mag[i + 1])
+            phase_at_cross = phase_deg[i] + frac * (phase_deg[i + 1] - phase_deg[i])
+            margins['gain_crossover_hz'] = float(freqs[i] + frac * (freqs[i + 1] - freqs[i]))
+            margins['phase_margin_deg'] = float((phase_at_cross + 360.0) % 360.0 - 180.0)
+
+        # Fase-krydsning: den (unwrappede) fase passerer -180 + k*360 grader
+        branch = np.floor((phase_deg + 180.0) / 360.0)
+        cross = np.flatnonzero(branch[:-1] != branch[1:])
+        if cross.size:
+            i = cross[0]
+            target = 360.0 * max(branch[i], branch[i + 1]) - 180.0
+            frac = (target - phase_deg[i]) / (phase_deg[i + 1] - phase_deg[i])
+            mag_at_cross = log_mag[i] + frac * (log_mag[i + 1] - log_mag[i])
+            margins['phase_crossover_hz'] = float(freqs[i] + frac * (freqs[i + 1] - freqs[i]))
+            margins['gain_margin_db'] = float(-20.0 * mag_at_cross)
+
+        return margins
+
+    @staticmethod
+    def save_cached(run_id, spectra, cache_dir=SPECTRA_CACHE_DIR):
+        """Gem de behandlede spektre for en kørsel, så de ikke skal genberegnes"""
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez_compressed(os.path.join(cache_dir, f"{run_id}.npz"), **spectra)
+
+    @staticmethod
+    def load_cached(run_id, cache_dir=SPECTRA_CACHE_DIR):
+        """Hent cachede spektre for en kørsel eller None"""
+        filename = os.path.join(cache_dir, f"{run_id}.npz")
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename) as cached:
+            return {key: cached[key] for key in cached.files}
+
+    @staticmethod
+    def analyze_run(run_id, run_data, excitation_log, cache_dir=SPECTRA_CACHE_DIR):
+        """
+        Estimér (eller hent fra cache) frekvensresponsen for en kørsel og beregn marginer
+
+        Args:
+            run_id: Unikt ID for kørslen (bruges som cache-nøgle)
+            run_data: Liste af data tuples (esp_ms, rel_s, pitch, rate, cmd, ...)
+            excitation_log: Liste af (rel_s, offset) for de sendte excitationsværdier
+        """
+        spectra = FrequencyResponseEstimator.load_cached(run_id, cache_dir)
+        if spectra is None:
+            if not run_data or not excitation_log:
+                return None
+            data = np.asarray(run_data, dtype=float)
+            event_times, event_values = zip(*excitation_log)
+            excitation = FrequencyResponseEstimator.zero_order_hold(event_times, event_values, data[:, 1])
+            spectra = FrequencyResponseEstimator.estimate(data[:, 1], excitation, data[:, 4], data[:, 2])
+            if spectra is None:
+                return None
+            FrequencyResponseEstimator.save_cached(run_id, spectra, cache_dir)
+
+        margins = FrequencyResponseEstimator.stability_margins(
+            spectra['freqs'], spectra['loop'], spectra['coherence']
+        )
+        margins['run_id'] = run_id
+        return margins
@@ -0,0 +1,156 @@
+# analysis/live_metrics.py
+"""
+Inkrementelle metrikker over et glidende vindue til live-visning under en kørsel
+
+Alle klasser opdateres med én sample ad gangen i konstant tid, så de kan
+køre direkte i data-ingest stien uden at bufferen skal gennemløbes igen.
+"""
+
+import cmath
+import math
+from collections import deque
+from config.settings import (
+    LIVE_METRICS_WINDOW_S,
+    LIVE_METRICS_NOMINAL_SAMPLE_S,
+    LIVE_DFT_MAX_FREQ_HZ,
+    ACTUATOR_OUTPUT_LIMIT,
+    ITERM_WINDUP_LIMIT,
+    ACTUATOR_SATURATION_FRACTION
+)
+
+
+class SlidingWindowSum:
+    """Løbende sum over de seneste `size` værdier"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+
+    def update(self, value):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    def reset(self):
+        self.values.clear()
+        self.total = 0.0
+
+
+class SlidingRms:
+    """Glidende RMS via en løbende sum af kvadrater"""
+
+    def __init__(self, size):
+        self._squares = SlidingWindowSum(size)
+
+    def update(self, value):
+        self._squares.update(value * value)
+
+    @property
+    def value(self):
+        return math.sqrt(max(self._squares.mean, 0.0))
+
+    def reset(self):
+        self._squares.reset()
+
+
+class SlidingDft:
+    """
+    Sliding DFT for en bank af frekvens-bins over et vindue på N samples
+
+    Hver bin opdateres rekursivt: X_k <- (X_k + x_ny - x_gammel) * e^(j*2*pi*k/N),
+    dvs. O(1) pr. bin pr. sample i stedet for en fuld FFT af vinduet.
+    """
+
+    def __init__(self, size, bins):
+        self.size = size
+        self.bins = list(bins)
+        self._twiddles = [cmath.exp(2j * math.pi * k / size) for k in self.bins]
+        self._spectrum = [0j] * len(self.bins)
+        self._samples = deque([0.0] * size, maxlen=size)
+        self.count = 0
+
+    def update(self, value):
+        delta = value - self._samples[0]
+        self._samples.append(value)
+        self.count += 1
+        self._spectrum = [(x + delta) * w for x, w in zip(self._spectrum, self._twiddles)]
+
+    def dominant_bin(self):
+        """Returnér (bin, amplitude) for den kraftigste bin, eller (None, 0) før vinduet er fyldt"""
+        if self.count < self.size or not self.bins:
+            return None, 0.0
+        magnitudes = [abs(x) for x in self._spectrum]
+        best = max(range(len(magnitudes)), key=magnitudes.__getitem__)
+        return self.bins[best], 2.0 * magnitudes[best] / self.size
+
+    def reset(self):
+        self._spectrum = [0j] * len(self.bins)
+        self._samples = deque([0.0] * self.size, maxlen=self.size)
+        self.count = 0
+
+
+class LiveMetrics:
+    """
+    Samler de live metrikker der vises under en kørsel: glidende pitch RMS,
+    dominerende oscillationsfrekvens, ITerm windup og aktuator-mætning
+    """
+
+    def __init__(self, window_s=LIVE_METRICS_WINDOW_S, sample_s=LIVE_METRICS_NOMINAL_SAMPLE_S):
+        self.window_samples = max(8, int(round(window_s / sample_s)))
+        self.sample_s = sample_s
+
+        # Bins fra 1 op til LIVE_DFT_MAX_FREQ_HZ (DC udelades - den er pitch-offset)
+        max_bin = min(self.window_samples // 2, int(LIVE_DFT_MAX_FREQ_HZ * window_s))
+        self.pitch_rms = SlidingRms(self.window_samples)
+        self.pitch_dft = SlidingDft(self.window_samples, range(1, max(2, max_bin + 1)))
+        self.saturation = SlidingWindowSum(self.window_samples)
+        self.sample_period = SlidingWindowSum(self.window_samples)
+        self.iterm_level = 0.0
+        self.peak_iterm_level = 0.0
+        self._last_time_s = None
+
+    def update(self, data_tuple):
+        """
+        Opdater med én sample i tuple-formatet fra _handle_csv_data:
+        (esp_ms, rel_s, pitch, rate, cmd, p, i, d, scaled, displacement)
+        """
+        time_s, pitch, iterm, scaled = data_tuple[1], data_tuple[2], data_tuple[6], data_tuple[8]
+
+        if self._last_time_s is not None and time_s > self._last_time_s:
+            self.sample_period.update(time_s - self._last_time_s)
+        self._last_time_s = time_s
+
+        self.pitch_rms.update(pitch)
+        self.pitch_dft.update(pitch)
+        self.saturation.update(1.0 if abs(scaled) >= ACTUATOR_SATURATION_FRACTION * ACTUATOR_OUTPUT_LIMIT else 0.0)
+        self.iterm_level = abs(iterm) / ITERM_WINDUP_LIMIT
+        self.peak_iterm_level = max(self.peak_iterm_level, self.iterm_level)
+
+    def snapshot(self):
+        """Returnér de aktuelle værdier som en dict (billig - ingen gennemløb af data)"""
+        sample_s = self.sample_period.mean or self.sample_s
+        dominant_bin, amplitude = self.pitch_dft.dominant_bin()
+        dominant_hz = dominant_bin / (self.window_samples * sample_s) if dominant_bin else None
+        return {
+            'rms_deg': self.pitch_rms.value,
+            'dominant_freq_hz': dominant_hz,
+            'dominant_amplitude_deg': amplitude,
+            'iterm_level': self.iterm_level,
+            'peak_iterm_level': self.peak_iterm_level,
+            'saturation_ratio': self.saturation.mean
+        }
+
+    def reset(self):
+        self.pitch_rms.reset()
+        self.pitch_dft.reset()
+        self.saturation.reset()
+        self.sample_period.reset()
+        self.iterm_level = 0.0
+        self.peak_iterm_level = 0.0
+        self._last_time_s = None
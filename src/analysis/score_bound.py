@@ -0,0 +1,88 @@
+# analysis/score_bound.py
+"""
+Løbende øvre grænse for den score en kørsel kan nå
+
+Bruges af auto-tuneren til at afbryde kørsler der allerede er håbløse. Grænsen
+bygger på de to straffe i scoreformlen der kun kan vokse med flere samples:
+RMS-amplituden af pitch og positions-RMSE. Frekvens- og degraderingsstraffene
+er altid >= 0 og udelades, mens bonusserne medregnes med deres maksimum, så
+grænsen aldrig undervurderer den endelige score.
+"""
+
+import math
+from config.settings import (
+    SCORE_OSCILLATION_AMPLITUDE_PENALTY,
+    SCORE_POSITION_RMSE_PENALTY,
+    SCORE_SETTLING_TIME_S,
+    EARLY_ABORT_FRACTION,
+    EARLY_ABORT_MIN_TIME_S
+)
+
+# Maksimale bonusser i _calculate_oscillation_score (amplitude < 1 grad, frekvens < 0.5 Hz)
+MAX_AMPLITUDE_BONUS = 50.0
+MAX_FREQUENCY_BONUS = 0.5 * 30.0
+
+
+class ScoreUpperBound:
+    """
+    Inkrementel øvre grænse for kørslens endelige score
+
+    Kvadratsummerne opdateres med én sample ad gangen. De resterende samples
+    antages i bedste fald at være perfekte (pitch = 0, position = 0), så den
+    endelige RMS er mindst sqrt(sum / forventet antal samples).
+    """
+
+    def __init__(self, expected_duration_s, settling_time_s=SCORE_SETTLING_TIME_S):
+        self.expected_duration_s = expected_duration_s
+        self.settling_time_s = settling_time_s
+        self.reset()
+
+    def reset(self):
+        self.pitch_sq_sum = 0.0
+        self.position_sq_sum = 0.0
+        self.count = 0
+        self.elapsed_s = 0.0
+
+    def update(self, data_tuple):
+        """Opdater med én sample i tuple-formatet (esp_ms, rel_s, pitch, ..., displacement)"""
+        time_s = data_tuple[1]
+        self.elapsed_s = time_s
+        # Scoren tager RMS over alle samples, så de tæller altid med i antallet. Kvadraterne
+        # under indsvingning udelades af summen - det gør grænsen kun mere forsigtig.
+        self.count += 1
+        if time_s < self.settling_time_s:
+            return
+        pitch, position = data_tuple[2], data_tuple[-1]
+        self.pitch_sq_sum += pitch * pitch
+        self.position_sq_sum += position * position
+
+    def _expected_samples(self):
+        """Forventet antal samples ved kørslens slutning"""
+        if self.count < 2 or self.elapsed_s <= self.settling_time_s:
+            return None
+        remaining_s = max(0.0, self.expected_duration_s - self.elapsed_s)
+        return self.count + remaining_s * self.count / self.elapsed_s
+
+    def upper_bound(self):
+        """Returnér den højest opnåelige score, eller None hvis der endnu er for lidt data"""
+        expected = self._expected_samples()
+        if expected is None:
+            return None
+        amplitude_rms = math.sqrt(self.pitch_sq_sum / expected)
+        position_rmse = math.sqrt(self.position_sq_sum / expected)
+
+        bound = 1000.0
+        bound -= amplitude_rms * SCORE_OSCILLATION_AMPLITUDE_PENALTY
+        bound -= position_rmse * SCORE_POSITION_RMSE_PENALTY
+        bound += MAX_AMPLITUDE_BONUS * max(0.0, 1.0 - amplitude_rms) + MAX_FREQUENCY_BONUS
+        return min(1000.0, bound)
+
+    def is_hopeless(self, best_score, fraction=EARLY_ABORT_FRACTION, min_time_s=EARLY_ABORT_MIN_TIME_S):
+        """
+        True hvis kørslen ikke længere kan nå `fraction` af den hidtil bedste score.
+        Kun meningsfuldt når der findes en positiv bedste score.
+        """
+        if best_score is None or best_score <= 0 or self.elapsed_s < min_time_s:
+            return False
+        bound = self.upper_bound()
+        return bound is not None and bound < fraction * best_score
@@ -4,7 +4,7 @@ Score beregning og analyse af robot performance data
 """
 
 import numpy as np
-from scipy import signal
+from scipy import signal, stats
 from config.settings import (
     BALANCED_PITCH_THRESHOLD_DEG,
     MIN_VALID_RUN_DURATION_S,
@@ -16,9 +16,16 @@ from config.settings import (
     SCORE_DEGRADATION_PENALTY,
     SCORE_POSITION_RMSE_PENALTY,
     SCORE_SETTLING_TIME_S,
-    OSCILLATION_WINDOW_SIZE_S
+    OSCILLATION_WINDOW_SIZE_S,
+    SESSION_CI_CONFIDENCE,
+    SESSION_BOOTSTRAP_SAMPLES,
+    SESSION_MIN_RUNS_FOR_DECISION,
+    SESSION_MAX_RUNS
 )
 
+# Nøgler i robottens TAG_SCORE_RESULT -> metrik-navne i ScoreCalculator
+ROBOT_METRIC_NAMES = {'valid_time': 'valid_time', 'rms_amp': 'amplitude_rms', 'pos_rmse': 'position_rmse_m'}
+
 
 class ScoreCalculator:
     """
@@ -88,6 +95,35 @@ class ScoreCalculator:
         
         return score, valid_time, total_duration, oscillation_metrics
 
+    @staticmethod
+    def calculate_run_metrics(run_data, robot_metrics=None):
+        """
+        Metrik-vektoren for en kørsel uden at vægte den sammen til én score.
+
+        Beregnes på samme valide periode som calculate_run_score. Robotten sender
+        selv valid_time, rms_amp og pos_rmse i sit score-resultat; de har forrang
+        for de værdier der beregnes her ud fra CSV-strømmen.
+
+        Returns:
+            dict: valid_time, amplitude_rms, avg_frequency, degradation_factor, position_rmse_m
+        """
+        metrics = {'valid_time': 0.0, 'amplitude_rms': float('inf'), 'avg_frequency': 0.0,
+                   'degradation_factor': 0.0, 'position_rmse_m': float('inf')}
+        if run_data:
+            timestamps = np.array([item[1] for item in run_data])
+            pitches = np.array([item[2] for item in run_data])
+            positions = np.array([item[-1] for item in run_data])
+            valid_end_idx = ScoreCalculator._find_oscillation_cutoff(pitches)
+            if valid_end_idx > 0:
+                metrics['valid_time'] = float(timestamps[valid_end_idx - 1])
+                metrics.update(ScoreCalculator._analyze_oscillations(
+                    timestamps[:valid_end_idx], pitches[:valid_end_idx], positions[:valid_end_idx]
+                ))
+        for robot_key, name in ROBOT_METRIC_NAMES.items():
+            if robot_metrics and robot_key in robot_metrics:
+                metrics[name] = robot_metrics[robot_key]
+        return {name: float(value) for name, value in metrics.items()}
+
     @staticmethod
     def _find_oscillation_cutoff(pitches):
         """Find punkt hvor oscillationer bliver for store"""
@@ -176,6 +212,30 @@ class ScoreCalculator:
             
         return score
 
+    @staticmethod
+    def calculate_batch_scores(valid_time, amplitude_rms, avg_frequency, degradation_factor, position_rmse_m,
+                               valid_samples=None):
+        """
+        Vektoriseret udgave af calculate_run_score's scoreregler for mange kørsler
+        på én gang (f.eks. simulerede konfigurationer). Alle argumenter er arrays
+        af samme længde.
+        """
+        amplitude_rms = np.asarray(amplitude_rms, dtype=float)
+        avg_frequency = np.asarray(avg_frequency, dtype=float)
+        score = 1000.0 - amplitude_rms * SCORE_OSCILLATION_AMPLITUDE_PENALTY
+        score -= np.maximum(avg_frequency - 1.0, 0.0) * SCORE_OSCILLATION_FREQUENCY_PENALTY
+        score -= np.asarray(degradation_factor, dtype=float) * SCORE_DEGRADATION_PENALTY
+        score -= np.asarray(position_rmse_m, dtype=float) * SCORE_POSITION_RMSE_PENALTY
+        score += np.maximum(1.0 - amplitude_rms, 0.0) * 50
+        score += np.maximum(0.5 - avg_frequency, 0.0) * 30
+        score = np.clip(score, -1000, 1000)
+
+        # Samme regler som for én kørsel: for kort -> 0, væltet med det samme -> -1000
+        score = np.where(np.asarray(valid_time) < MIN_VALID_RUN_DURATION_S, 0.0, score)
+        if valid_samples is not None:
+            score = np.where(np.asarray(valid_samples) == 0, -1000.0, score)
+        return score
+
     @staticmethod
     def calculate_session_stats(session_run_details):
         """
@@ -199,6 +259,10 @@ class ScoreCalculator:
         amplitudes = []
         frequencies = []
         degradations = []
+        overshoots = []
+        settling_times = []
+        phase_margins = []
+        gain_margins = []
         
         for d in session_run_details:
             if len(d) > 3 and isinstance(d[3], dict):
@@ -209,15 +273,115 @@ class ScoreCalculator:
                     frequencies.append(metrics['avg_frequency'])
                 if 'degradation_factor' in metrics:
                     degradations.append(metrics['degradation_factor'])
+                step_response = metrics.get('step_response')
+                if step_response and step_response.get('num_events'):
+                    overshoots.append(step_response['avg_overshoot_pct'])
+                    settling_times.append(step_response['avg_settling_time_s'])
+                frequency_response = metrics.get('frequency_response')
+                if frequency_response:
+                    phase_margins.append(frequency_response['phase_margin_deg'])
+                    gain_margins.append(frequency_response['gain_margin_db'])
         
+        intervals = ScoreCalculator.calculate_score_intervals(scores)
+
         return {
             'num_runs': num_runs,
             'avg_score': np.mean(scores),
             'max_score': np.max(scores),
             'min_score': np.min(scores),
+            'std_score': intervals['std'],
+            'sem_score': intervals['sem'],
+            'ci_low': intervals['t_low'],
+            'ci_high': intervals['t_high'],
+            'ci_boot_low': intervals['boot_low'],
+            'ci_boot_high': intervals['boot_high'],
             'avg_valid_time': np.mean(valid_times),
             'avg_total_duration': np.mean(total_durations),
             'avg_amplitude_rms': np.mean(amplitudes) if amplitudes else float('inf'),
             'avg_frequency': np.mean(frequencies) if frequencies else 0,
-            'avg_degradation': np.mean(degradations) if degradations else 0
-        }
\ No newline at end of file
+            'avg_degradation': np.mean(degradations) if degradations else 0,
+            'avg_overshoot_pct': np.mean(overshoots) if overshoots else None,
+            'avg_settling_time_s': np.mean(settling_times) if settling_times else None,
+            'avg_phase_margin_deg': np.mean(phase_margins) if phase_margins else None,
+            'avg_gain_margin_db': np.mean(gain_margins) if gain_margins else None
+        }
+
+    @staticmethod
+    def calculate_score_intervals(scores, confidence=SESSION_CI_CONFIDENCE,
+                                  num_bootstrap=SESSION_BOOTSTRAP_SAMPLES, rng=None):
+        """
+        Beregn Student-t og bootstrap konfidensintervaller for gennemsnitsscoren
+
+        Args:
+            scores: Liste/array af scores fra sessionens kørsler
+            confidence: Konfidensniveau (f.eks. 0.95)
+            num_bootstrap: Antal bootstrap gen-samplinger
+            rng: Valgfri np.random.Generator (for reproducerbarhed)
+
+        Returns:
+            dict: std, sem, t_low, t_high, boot_low, boot_high
+        """
+        scores = np.asarray(scores, dtype=float)
+        n = scores.size
+        if n == 0:
+            return {'std': 0.0, 'sem': float('inf'), 't_low': float('-inf'), 't_high': float('inf'),
+                    'boot_low': float('-inf'), 'boot_high': float('inf')}
+
+        mean = scores.mean()
+        if n < 2:
+            # Ét enkelt run siger intet om spredningen
+            return {'std': 0.0, 'sem': float('inf'), 't_low': float('-inf'), 't_high': float('inf'),
+                    'boot_low': mean, 'boot_high': mean}
+
+        std = scores.std(ddof=1)
+        sem = std / np.sqrt(n)
+        t_crit = stats.t.ppf(0.5 + confidence / 2.0, df=n - 1)
+
+        # Vektoriseret bootstrap: alle gen-samplinger trækkes i ét (num_bootstrap, n) index-array
+        rng = rng if rng is not None else np.random.default_rng()
+        resample_means = scores[rng.integers(0, n, size=(num_bootstrap, n))].mean(axis=1)
+        alpha = 1.0 - confidence
+        boot_low, boot_high = np.percentile(resample_means, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+
+        return {
+            'std': std,
+            'sem': sem,
+            't_low': mean - t_crit * sem,
+            't_high': mean + t_crit * sem,
+            'boot_low': boot_low,
+            'boot_high': boot_high
+        }
+
+    @staticmethod
+    def sequential_decision(scores, reference_score, min_runs=SESSION_MIN_RUNS_FOR_DECISION,
+                            max_runs=SESSION_MAX_RUNS, confidence=SESSION_CI_CONFIDENCE):
+        """
+        Sekventiel stop-regel for gentagne kørsler med samme parametre
+
+        Der stoppes når konfidensintervallet for gennemsnittet ligger helt over
+        (kandidaten er bedre) eller helt under (kandidaten er værre) reference-scoren.
+        Både t- og bootstrap-intervallet skal udelukke referencen, så beslutningen
+        er konservativ ved få kørsler. Uden reference stoppes efter min_runs med
+        'no_reference' - spredningen er kendt, men der er intet at sammenligne med.
+
+        Returns:
+            str: 'continue', 'better', 'worse', 'max_runs' eller 'no_reference'
+        """
+        n = len(scores)
+        if n < min_runs:
+            return 'continue'
+        if reference_score is None or not np.isfinite(reference_score):
+            # Ingen tidligere bedste at sammenligne med - stop når spredningen er kendt
+            return 'no_reference'
+
+        intervals = ScoreCalculator.calculate_score_intervals(scores, confidence=confidence)
+        low = min(intervals['t_low'], intervals['boot_low'])
+        high = max(intervals['t_high'], intervals['boot_high'])
+
+        if low > reference_score:
+            return 'better'
+        if high < reference_score:
+            return 'worse'
+        if n >= max_runs:
+            return 'max_runs'
+        return 'continue'
\ No newline at end of file
@@ -0,0 +1,142 @@
+# analysis/step_response.py
+"""
+Step-respons analyse af forstyrrelser (skub eller setpunkt-pulser) under en kørsel
+"""
+
+import numpy as np
+from config.settings import (
+    DISTURBANCE_DETECT_RATE_DPS,
+    DISTURBANCE_WINDOW_BEFORE_S,
+    DISTURBANCE_WINDOW_AFTER_S,
+    DISTURBANCE_SETTLING_BAND_DEG,
+    DISTURBANCE_INTERVAL_S
+)
+
+
+class StepResponseAnalyzer:
+    """
+    Segmenterer kørsels-bufferen omkring hver forstyrrelse og beregner
+    overshoot, indsvingningstid, positionsafvigelse og maks. motor-output
+    """
+
+    @staticmethod
+    def detect_events(timestamps, pitch_rates, threshold=DISTURBANCE_DETECT_RATE_DPS,
+                      min_separation_s=DISTURBANCE_INTERVAL_S / 2):
+        """
+        Find eksterne skub som spring i pitchRate over en tærskel
+
+        Returns:
+            np.ndarray: Tidspunkter (relativ tid i s) for de fundne forstyrrelser
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        candidates = np.flatnonzero(np.abs(np.asarray(pitch_rates, dtype=float)) > threshold)
+        if candidates.size == 0:
+            return np.empty(0)
+
+        # Kun første sample i hver klynge tæller som en ny forstyrrelse
+        candidate_times = timestamps[candidates]
+        gaps = np.diff(candidate_times, prepend=-np.inf)
+        return candidate_times[gaps > min_separation_s]
+
+    @staticmethod
+    def merge_events(commanded_times, detected_times, min_separation_s=DISTURBANCE_INTERVAL_S / 2):
+        """Kombinér kommanderede og detekterede forstyrrelser uden dubletter"""
+        commanded_times = np.asarray(commanded_times, dtype=float)
+        detected_times = np.asarray(detected_times, dtype=float)
+        if commanded_times.size and detected_times.size:
+            distance = np.abs(detected_times[:, None] - commanded_times[None, :]).min(axis=1)
+            detected_times = detected_times[distance > min_separation_s]
+        return np.sort(np.concatenate([commanded_times, detected_times]))
+
+    @staticmethod
+    def analyze(run_data, event_times,
+                window_before_s=DISTURBANCE_WINDOW_BEFORE_S,
+                window_after_s=DISTURBANCE_WINDOW_AFTER_S,
+                settling_band_deg=DISTURBANCE_SETTLING_BAND_DEG):
+        """
+        Beregn step-respons metrikker for alle forstyrrelser i en kørsel
+
+        Args:
+            run_data: Liste af data tuples (esp_ms, rel_s, pitch, rate, cmd, p, i, d, scaled, displacement)
+            event_times: Tidspunkter (relativ tid i s) for forstyrrelserne
+
+        Returns:
+            dict: Gennemsnitlige metrikker samt en liste med metrikker pr. forstyrrelse
+        """
+        empty_result = {'num_events': 0, 'events': []}
+        if not run_data or len(event_times) == 0:
+            return empty_result
+
+        data = np.asarray(run_data, dtype=float)
+        timestamps = data[:, 1]
+        pitches = data[:, 2]
+        scaled_output = data[:, 8]
+        positions = data[:, -1]
+        if timestamps.size < 10:
+            return empty_result
+
+        dt = float(np.median(np.diff(timestamps)))
+        if dt <= 0:
+            return empty_result
+        n_before = max(1, int(round(window_before_s / dt)))
+        n_after = max(2, int(round(window_after_s / dt)))
+
+        # Kun forstyrrelser med et fuldt vindue før og efter kan analyseres
+        event_idx = np.searchsorted(timestamps, np.asarray(event_times, dtype=float))
+        event_idx = event_idx[(event_idx >= n_before) & (event_idx + n_after <= timestamps.size)]
+        if event_idx.size == 0:
+            return empty_result
+
+        # (events, samples) index-matrix: alle vinduer udtrækkes på én gang
+        window_idx = event_idx[:, None] + np.arange(-n_before, n_after)[None, :]
+        pitch_windows = pitches[window_idx]
+        baseline = pitch_windows[:, :n_before].mean(axis=1, keepdims=True)
+        response = pitch_windows[:, n_before:] - baseline
+
+        # Første udsving og overshoot på den modsatte side efter toppen
+        peak_idx = np.argmax(np.abs(response), axis=1)
+        rows = np.arange(event_idx.size)
+        peak = response[rows, peak_idx]
+        after_peak = np.arange(n_after)[None, :] > peak_idx[:, None]
+        opposite = np.where(after_peak, -np.sign(peak)[:, None] * response, 0.0)
+        overshoot_deg = np.clip(opposite.max(axis=1), 0.0, None)
+        overshoot_pct = 100.0 * overshoot_deg / np.maximum(np.abs(peak), 1e-6)
+
+        # Indsvingningstid: sidste sample uden for båndet
+        outside = np.abs(response) > settling_band_deg
+        last_outside = n_after - 1 - np.argmax(outside[:, ::-1], axis=1)
+        settling_time = np.where(outside.any(axis=1), (last_outside + 1) * dt, 0.0)
+        settled = ~outside[:, -1]
+        settling_time = np.where(settled, settling_time, np.nan)
+
+        # Positionsafvigelse: hvor langt robotten kørte for at indhente forstyrrelsen
+        position_windows = positions[window_idx[:, n_before:]] - positions[event_idx][:, None]
+        recovery_displacement = position_windows[:, -1]
+        max_displacement = np.abs(position_windows).max(axis=1)
+
+        peak_scaled_output = np.abs(scaled_output[window_idx[:, n_before:]]).max(axis=1)
+
+        events = [
+            {
+                'time_s': float(timestamps[event_idx[i]]),
+                'peak_deg': float(peak[i]),
+                'overshoot_deg': float(overshoot_deg[i]),
+                'overshoot_pct': float(overshoot_pct[i]),
+                'settling_time_s': float(settling_time[i]),
+                'recovery_displacement_m': float(recovery_displacement[i]),
+                'max_displacement_m': float(max_displacement[i]),
+                'peak_scaled_output': float(peak_scaled_output[i])
+            }
+            for i in rows
+        ]
+
+        return {
+            'num_events': int(event_idx.size),
+            'num_settled': int(settled.sum()),
+            'avg_overshoot_pct': float(overshoot_pct.mean()),
+            'avg_settling_time_s': float(np.nanmean(settling_time)) if settled.any() else float('inf'),
+            'avg_recovery_displacement_m': float(np.abs(recovery_displacement).mean()),
+            'max_displacement_m': float(max_displacement.max()),
+            'peak_scaled_output': float(peak_scaled_output.max()),
+            'events': events
+        }
@@ -0,0 +1,289 @@
+# analysis/system_identification.py
+"""
+System-identifikation fra detaljerede logs til kalibrering af simulatoren
+
+To modeller fittes med mindste kvadraters metode på alle kørsler på én gang:
+
+  * ARX fra balanceCmd til pitch:
+        y[k] = -a1*y[k-1] - ... - a_na*y[k-na] + b1*u[k-nk] + ... + b_nb*u[k-nk-nb+1] + c
+  * Fysiske parametre til WheeledPendulumSimulator:
+        pendul:  omega' = (g/l)*theta - (1/l)*a + c0     (lineariseret, a = vognens acceleration)
+        motor:   v[k+1] - v[k] = alpha * (G*u[k] - v[k])  (første-ordens hjulhastighed)
+
+Logfilerne konverteres én gang til binære .npy-filer i SYSID_CACHE_DIR og
+læses derefter memory-mapped kørsel for kørsel. Kun normalligningerne
+(Phi'Phi, Phi'y) summeres, så hukommelsesforbruget er uafhængigt af hvor
+mange logs der indgår. Kørsler skæres af ved første sample over
+MAX_OSCILLATION_CUTOFF_DEG, ligesom scoren.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+from config.settings import (
+    MAX_OSCILLATION_CUTOFF_DEG,
+    SYSID_CACHE_DIR,
+    SYSID_ARX_NA,
+    SYSID_ARX_NB,
+    SYSID_ARX_NK,
+    SYSID_MIN_SEGMENT_SAMPLES,
+    SYSID_CHUNK_SAMPLES,
+    PLANT_WHEEL_RADIUS_M
+)
+from datalogger.data_logger import DataLogger
+
+G = 9.81
+RPM_TO_MPS = 2.0 * np.pi / 60.0
+
+# Kolonner i kørsels-tuplerne fra DataLogger.read_detailed_runs
+COL_TIME_MS, COL_REL_S, COL_PITCH, COL_RATE, COL_CMD, COL_SCALED, COL_DISPLACEMENT = 0, 1, 2, 3, 4, 8, 9
+NUM_COLUMNS = 10
+
+
+class LeastSquares:
+    """Mindste kvadraters fit akkumuleret som normalligninger, så data kan streames"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        size = len(self.names)
+        self.gram = np.zeros((size, size))
+        self.moment = np.zeros(size)
+        self.count = 0
+        self.sum_y = 0.0
+        self.sum_yy = 0.0
+
+    def add(self, phi, y):
+        phi = np.asarray(phi, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.gram += phi.T @ phi
+        self.moment += phi.T @ y
+        self.count += y.size
+        self.sum_y += float(y.sum())
+        self.sum_yy += float(y @ y)
+
+    def __iadd__(self, other):
+        self.gram += other.gram
+        self.moment += other.moment
+        self.count += other.count
+        self.sum_y += other.sum_y
+        self.sum_yy += other.sum_yy
+        return self
+
+    def solve(self):
+        """
+        Parametre og fit-kvalitet.
+
+        Returns:
+            dict: params (navn -> værdi), stderr, samples, rmse, fit_percent
+                  (100*(1 - |y - y_hat| / |y - middel|), som MATLAB's compare) og r2;
+                  None hvis der ikke er nok data
+        """
+        size = len(self.names)
+        if self.count <= size:
+            return None
+        theta = np.linalg.lstsq(self.gram, self.moment, rcond=None)[0]
+        sse = max(self.sum_yy - 2.0 * theta @ self.moment + theta @ self.gram @ theta, 0.0)
+        sst = max(self.sum_yy - self.sum_y ** 2 / self.count, 1e-300)
+        sigma2 = sse / (self.count - size)
+        stderr = np.sqrt(np.maximum(np.diag(np.linalg.pinv(self.gram)) * sigma2, 0.0))
+        return {
+            'params': dict(zip(self.names, theta.tolist())),
+            'stderr': dict(zip(self.names, stderr.tolist())),
+            'samples': self.count,
+            'rmse': float(np.sqrt(sse / self.count)),
+            'fit_percent': float(100.0 * (1.0 - np.sqrt(sse / sst))),
+            'r2': float(1.0 - sse / sst)
+        }
+
+
+class SystemIdentifier:
+    """Samler regressionerne fra mange logfiler og omsætter dem til model-parametre"""
+
+    def __init__(self, na=SYSID_ARX_NA, nb=SYSID_ARX_NB, nk=SYSID_ARX_NK,
+                 min_segment_samples=SYSID_MIN_SEGMENT_SAMPLES, cache_dir=SYSID_CACHE_DIR):
+        if na < 1 or nb < 1 or nk < 0:
+            raise ValueError(f"Ugyldige ARX-ordener: na={na}, nb={nb}, nk={nk}")
+        self.na, self.nb, self.nk = na, nb, nk
+        self.min_segment_samples = max(min_segment_samples, na + nk + nb + 2)
+        self.cache_dir = cache_dir
+        self.arx_names = [f"a{i}" for i in range(1, na + 1)] + [f"b{j}" for j in range(1, nb + 1)] + ["c"]
+        self.arx = LeastSquares(self.arx_names)
+        self.pendulum = LeastSquares(["g_over_l", "inv_l", "c0"])
+        self.motor = LeastSquares(["gain_alpha", "alpha"])
+        self.files = []  # (filnavn, kørsler, samples, ARX-fit for filen)
+        self.sample_times = []
+
+    @staticmethod
+    def cached_log(filename, cache_dir=SYSID_CACHE_DIR):
+        """
+        Logfilen som memory-mapped array (samples, 10) i kørsels-tuple formatet.
+
+        Den binære kopi laves første gang (og når CSV-filen er nyere), så
+        efterfølgende analyser ikke skal parse tekst. Cachen er navngivet efter
+        den fulde sti, så logs med samme navn i forskellige mapper ikke deler kopi.
+        """
+        path = os.path.abspath(filename)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+        cache_file = os.path.join(cache_dir, f"{stem}_{digest}.npy")
+        if not os.path.exists(cache_file) or os.path.getmtime(cache_file) < os.path.getmtime(filename):
+            os.makedirs(cache_dir, exist_ok=True)
+            SystemIdentifier._convert_log(filename, cache_file)
+        return np.load(cache_file, mmap_mode='r')
+
+    @staticmethod
+    def _convert_log(filename, cache_file, chunk_samples=SYSID_CHUNK_SAMPLES):
+        """
+        Skriv logfilen som .npy i blokke af `chunk_samples`, så hukommelsen ikke
+        afhænger af filens størrelse. Rækkerne skrives først rå til en midlertidig
+        fil (antallet kendes ikke på forhånd) og kopieres derefter ind i .npy-filen.
+        """
+        raw_file = cache_file + ".raw"
+        tmp_file = cache_file + ".tmp"
+        try:
+            count = 0
+            chunk = []
+            with open(raw_file, 'wb') as raw:
+                for _, sample in DataLogger.iter_detailed_samples(filename):
+                    chunk.append(sample)
+                    if len(chunk) >= chunk_samples:
+                        raw.write(np.array(chunk, dtype=float).tobytes())
+                        count += len(chunk)
+                        chunk = []
+                if chunk:
+                    raw.write(np.array(chunk, dtype=float).tobytes())
+                    count += len(chunk)
+
+            rows = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=float, shape=(count, NUM_COLUMNS))
+            if count:
+                source = np.memmap(raw_file, dtype=float, mode='r', shape=(count, NUM_COLUMNS))
+                for start in range(0, count, chunk_samples):
+                    rows[start:start + chunk_samples] = source[start:start + chunk_samples]
+                del source
+            rows.flush()
+            del rows
+            os.replace(tmp_file, cache_file)
+        finally:
+            for leftover in (raw_file, tmp_file):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    def segments(self, data):
+        """(start, slut) for hver kørsel, afskåret ved første sample over cutoff-vinklen"""
+        # read_detailed_runs starter hver kørsels relative tid i 0
+        starts = np.flatnonzero(np.asarray(data[:, COL_REL_S]) == 0.0)
+        ends = np.append(starts[1:], len(data))
+        for start, end in zip(starts, ends):
+            over = np.flatnonzero(np.abs(np.asarray(data[start:end, COL_PITCH])) > MAX_OSCILLATION_CUTOFF_DEG)
+            if over.size:
+                end = start + over[0]
+            if end - start >= self.min_segment_samples:
+                yield start, end
+
+    def _arx_regression(self, pitch, cmd):
+        first = max(self.na, self.nk + self.nb - 1)
+        count = len(pitch)
+        columns = [-pitch[first - i:count - i] for i in range(1, self.na + 1)]
+        columns += [cmd[first - self.nk - j:count - self.nk - j] for j in range(self.nb)]
+        columns.append(np.ones(count - first))
+        return np.column_stack(columns), pitch[first:]
+
+    @staticmethod
+    def _physical_regressions(run):
+        """Regressorer for pendul- og motor-fit; None hvis kørslen mangler forskydning"""
+        time_s = run[:, COL_TIME_MS] / 1000.0
+        displacement = run[:, COL_DISPLACEMENT]
+        if not np.any(displacement != 0.0) or np.any(np.diff(time_s) <= 0):
+            return None
+        theta = np.radians(run[:, COL_PITCH])
+        omega = np.radians(run[:, COL_RATE])
+        dt = np.diff(time_s)
+        velocity = np.diff(displacement) / dt
+        # Centrale differenser i de indre samples 1..N-2
+        accel = np.diff(velocity) / (0.5 * (dt[1:] + dt[:-1]))
+        omega_dot = (omega[2:] - omega[:-2]) / (time_s[2:] - time_s[:-2])
+        pendulum = (np.column_stack([theta[1:-1], -accel, np.ones(accel.size)]), omega_dot)
+        # Motor: hastigheden i næste periode som funktion af output og nuværende hastighed
+        output = run[1:-1, COL_SCALED]
+        motor = (np.column_stack([output, -velocity[:-1]]), velocity[1:] - velocity[:-1])
+        return pendulum, motor
+
+    def add_file(self, filename):
+        """Tilføj alle kørsler i en detaljeret logfil. Returnerer antal brugte kørsler."""
+        data = self.cached_log(filename, self.cache_dir)
+        arx = LeastSquares(self.arx_names)
+        used, samples = 0, 0
+        for start, end in self.segments(data):
+            run = np.array(data[start:end])  # Kun denne kørsel læses fra disken
+            arx.add(*self._arx_regression(run[:, COL_PITCH], run[:, COL_CMD]))
+            physical = self._physical_regressions(run)
+            if physical is not None:
+                self.pendulum.add(*physical[0])
+                self.motor.add(*physical[1])
+            self.sample_times.append(float(np.median(np.diff(run[:, COL_TIME_MS]))) / 1000.0)
+            used += 1
+            samples += end - start
+        self.arx += arx
+        self.files.append((filename, used, samples, arx.solve()))
+        return used
+
+    @staticmethod
+    def _pendulum_length(pendulum):
+        """
+        Pendullængden fra de to koefficienter g/l og 1/l, vægtet med deres
+        varians (delta-metoden). I lukket sløjfe er theta og a stærkt
+        korrelerede, så det ene estimat er ofte langt mere præcist end det andet.
+        """
+        estimates = []
+        for name, numerator in (('g_over_l', G), ('inv_l', 1.0)):
+            value, stderr = pendulum['params'][name], pendulum['stderr'][name]
+            if value > 0:
+                length = numerator / value
+                estimates.append((length, max(length * stderr / value, 1e-12) ** 2))
+        if not estimates:
+            return None
+        weights = [1.0 / variance for _, variance in estimates]
+        return float(sum(length * w for (length, _), w in zip(estimates, weights)) / sum(weights))
+
+    def results(self, wheel_radius_m=PLANT_WHEEL_RADIUS_M):
+        """
+        Fit for alle tilføjede logs.
+
+        Returns:
+            dict: 'arx' (fit fra LeastSquares.solve + ordener), 'pendulum', 'motor',
+                  'files' og 'plant' (parametre til WheeledPendulumSimulator). Kun
+                  fysisk meningsfulde parametre kommer med i 'plant'.
+        """
+        sample_time = float(np.median(self.sample_times)) if self.sample_times else None
+        arx = self.arx.solve()
+        if arx is not None:
+            arx.update(na=self.na, nb=self.nb, nk=self.nk, sample_time_s=sample_time)
+        pendulum = self.pendulum.solve()
+        motor = self.motor.solve()
+
+        plant = {}
+        if sample_time:
+            plant['loop_time_s'] = sample_time
+        length = self._pendulum_length(pendulum) if pendulum is not None else None
+        if length is not None:
+            plant['pendulum_length_m'] = length
+            # omega' = (g/l)*(theta - offset) => c0 = -(g/l)*offset
+            plant['balance_offset_deg'] = float(np.degrees(-pendulum['params']['c0'] * length / G))
+        if motor is not None and sample_time and 0 < motor['params']['alpha'] < 1:
+            alpha = motor['params']['alpha']
+            plant['motor_time_constant_s'] = float(-sample_time / np.log(1.0 - alpha))
+            mps_per_output = motor['params']['gain_alpha'] / alpha
+            if mps_per_output > 0:
+                plant['rpm_per_output'] = float(mps_per_output / (RPM_TO_MPS * wheel_radius_m))
+        return {'arx': arx, 'pendulum': pendulum, 'motor': motor, 'plant': plant,
+                'files': [{'file': name, 'runs': runs, 'samples': samples,
+                           'fit_percent': fit['fit_percent'] if fit else None}
+                          for name, runs, samples, fit in self.files]}
+
+    @staticmethod
+    def export(filename, results):
+        """Gem model-parametrene (og fit-kvaliteten) som JSON til WheeledPendulumSimulator.from_parameter_file"""
+        with open(filename, 'w') as f:
+            json.dump({'plant': results['plant'], 'arx': results['arx'], 'pendulum': results['pendulum'],
+                       'motor': results['motor']}, f, indent=4)
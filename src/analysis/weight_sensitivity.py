@@ -0,0 +1,186 @@
+# analysis/weight_sensitivity.py
+"""
+Følsomhedsanalyse af score-vægtene i config/settings.py
+
+Score-formlen i ScoreCalculator._calculate_oscillation_score er lineær i
+straf-konstanterne. Metrik-vektorerne fra _analyze_oscillations beregnes derfor
+én gang pr. kørsel, hvorefter scores for et helt gitter af vægt-kombinationer
+findes med en enkelt matrix-multiplikation - uden at køre robotten igen.
+"""
+
+import itertools
+import numpy as np
+from config.settings import (
+    MIN_VALID_RUN_DURATION_S,
+    SCORE_OSCILLATION_AMPLITUDE_PENALTY,
+    SCORE_OSCILLATION_FREQUENCY_PENALTY,
+    SCORE_DEGRADATION_PENALTY,
+    SCORE_POSITION_RMSE_PENALTY,
+)
+from analysis.score_calculator import ScoreCalculator
+
+
+WEIGHT_NAMES = ('amplitude', 'frequency', 'degradation', 'position')
+DEFAULT_WEIGHTS = np.array([
+    SCORE_OSCILLATION_AMPLITUDE_PENALTY,
+    SCORE_OSCILLATION_FREQUENCY_PENALTY,
+    SCORE_DEGRADATION_PENALTY,
+    SCORE_POSITION_RMSE_PENALTY,
+], dtype=float)
+
+
+class WeightSensitivity:
+    """
+    Samler metrik-vektorer for mange kørsler og genberegner scores og
+    PID-rangeringer for vilkårlige vægt-kombinationer
+    """
+
+    def __init__(self):
+        self.config_keys = []       # Unikke PID-konfigurationer (tuples af (navn, værdi))
+        self._config_params = []    # Tilhørende parameter dicts
+        self._run_config_idx = []   # Konfigurations-index pr. kørsel
+        self._offsets = []          # Vægt-uafhængig del af scoren pr. kørsel
+        self._features = []         # Straf-features pr. kørsel (ganges med vægtene)
+        self._fixed = []            # True hvis scoren ikke afhænger af vægtene
+
+    @property
+    def num_runs(self):
+        return len(self._offsets)
+
+    @staticmethod
+    def make_weight_grid(factors, base_weights=DEFAULT_WEIGHTS):
+        """
+        Lav et gitter af vægt-kombinationer ved at skalere hver standardvægt
+        med alle faktorer.
+
+        Returns:
+            np.ndarray: (num_combinations, 4) array af vægte
+        """
+        factors = np.asarray(factors, dtype=float)
+        combos = np.array(list(itertools.product(factors, repeat=len(base_weights))))
+        return combos * np.asarray(base_weights, dtype=float)
+
+    @staticmethod
+    def metric_vector(run_data):
+        """
+        Udtræk (offset, features, fixed) for én kørsel.
+
+        Følger samme gyldigheds-regler som ScoreCalculator.calculate_run_score,
+        så kørsler der væltede med det samme eller var for korte får en fast score.
+        """
+        timestamps = np.array([item[1] for item in run_data])
+        pitches = np.array([item[2] for item in run_data])
+        positions = np.array([item[-1] for item in run_data])
+        zero_features = np.zeros(len(WEIGHT_NAMES))
+
+        if timestamps.size == 0:
+            return 0.0, zero_features, True
+
+        valid_end_idx = ScoreCalculator._find_oscillation_cutoff(pitches)
+        if valid_end_idx == 0:
+            return -1000.0, zero_features, True
+
+        valid_timestamps = timestamps[:valid_end_idx]
+        valid_time = valid_timestamps[-1]
+        if valid_time < MIN_VALID_RUN_DURATION_S:
+            return 0.0, zero_features, True
+
+        metrics = ScoreCalculator._analyze_oscillations(
+            valid_timestamps, pitches[:valid_end_idx], positions[:valid_end_idx]
+        )
+        amplitude = metrics['amplitude_rms']
+        frequency = metrics['avg_frequency']
+        if not np.isfinite(amplitude) or not np.isfinite(metrics['position_rmse_m']):
+            return -1000.0, zero_features, True
+
+        # Skal spejle _calculate_oscillation_score: score = offset - features . vægte
+        offset = 1000.0
+        if amplitude < 1.0:
+            offset += (1.0 - amplitude) * 50
+        if frequency < 0.5:
+            offset += (0.5 - frequency) * 30
+
+        features = np.array([
+            amplitude,
+            max(frequency - 1.0, 0.0),
+            metrics['degradation_factor'],
+            metrics['position_rmse_m'],
+        ])
+        return offset, features, False
+
+    def add_run(self, pid_params, run_data):
+        """Tilføj en kørsel for en given PID-konfiguration"""
+        # Alle parametre indgår - sessioner der kun afviger i init_balance/power_gain er forskellige
+        key = tuple(sorted((name, round(float(value), 4)) for name, value in pid_params.items()))
+        if key not in self.config_keys:
+            self.config_keys.append(key)
+            self._config_params.append(dict(pid_params))
+
+        offset, features, fixed = self.metric_vector(run_data)
+        self._run_config_idx.append(self.config_keys.index(key))
+        self._offsets.append(offset)
+        self._features.append(features)
+        self._fixed.append(fixed)
+
+    def run_scores(self, weight_grid):
+        """
+        Beregn scoren for alle kørsler under alle vægt-kombinationer.
+
+        Returns:
+            np.ndarray: (num_runs, num_combinations) array af scores
+        """
+        weight_grid = np.atleast_2d(np.asarray(weight_grid, dtype=float))
+        offsets = np.asarray(self._offsets)
+        features = np.asarray(self._features).reshape(-1, len(WEIGHT_NAMES))
+
+        scores = offsets[:, None] - features @ weight_grid.T
+        return np.clip(scores, -1000, 1000)
+
+    def config_scores(self, weight_grid):
+        """
+        Gennemsnitlig score pr. PID-konfiguration under alle vægt-kombinationer.
+
+        Returns:
+            np.ndarray: (num_configs, num_combinations) array af gennemsnitsscores
+        """
+        run_idx = np.asarray(self._run_config_idx)
+        membership = np.zeros((len(self.config_keys), run_idx.size))
+        membership[run_idx, np.arange(run_idx.size)] = 1.0
+        membership /= membership.sum(axis=1, keepdims=True)
+        return membership @ self.run_scores(weight_grid)
+
+    def analyze(self, weight_grid, base_weights=DEFAULT_WEIGHTS):
+        """
+        Find bedste konfiguration for hver vægt-kombination og sammenlign med
+        rangeringen under de nuværende vægte.
+
+        Returns:
+            dict: Resultater med 'best_index', 'changed' og 'rank_correlation' pr. kombination
+        """
+        if not self.num_runs:
+            return {}
+
+        weight_grid = np.atleast_2d(np.asarray(weight_grid, dtype=float))
+        all_weights = np.vstack([np.asarray(base_weights, dtype=float), weight_grid])
+        config_scores = self.config_scores(all_weights)
+
+        best_index = np.argmax(config_scores, axis=0)
+        baseline_best = best_index[0]
+
+        # Spearman rang-korrelation mod baseline, vektoriseret over alle kombinationer
+        ranks = np.argsort(np.argsort(-config_scores, axis=0), axis=0).astype(float)
+        ranks -= ranks.mean(axis=0)
+        norm = np.sqrt((ranks ** 2).sum(axis=0))
+        norm[norm == 0] = 1.0
+        rank_correlation = (ranks[:, [0]] * ranks).sum(axis=0) / (norm[0] * norm)
+
+        return {
+            'weights': weight_grid,
+            'baseline_best': baseline_best,
+            'baseline_params': self._config_params[baseline_best],
+            'best_index': best_index[1:],
+            'best_score': config_scores[best_index[1:], np.arange(1, all_weights.shape[0])],
+            'changed': best_index[1:] != baseline_best,
+            'rank_correlation': rank_correlation[1:],
+            'config_params': list(self._config_params),
+        }
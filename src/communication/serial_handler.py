@@ -7,6 +7,14 @@ import serial
 import threading
 import time
 import re
+from config.settings import (
+    TAG_SCORE_RESULT,
+    TAG_CSV,
+    NUM_EXPECTED_CSV_COLUMNS,
+    PARAM_COMMAND_GAP_S,
+    PARAM_PRINT_DELAY_S,
+    PARAM_VERIFY_ATTEMPT_TIMEOUT_S
+)
 
 
 class SerialThread(threading.Thread):
@@ -36,6 +44,10 @@ class SerialThread(threading.Thread):
         self.verification_timeout = None
         self.max_retries = 3
         self.current_retry = 0
+        # Pauser og timeout ved parameter-upload (se settings - påvirker dødtid mellem auto-tune jobs)
+        self.command_gap_s = PARAM_COMMAND_GAP_S
+        self.print_delay_s = PARAM_PRINT_DELAY_S
+        self.verification_attempt_timeout_s = PARAM_VERIFY_ATTEMPT_TIMEOUT_S
 
     def connect(self):
         """Opret forbindelse til serial port"""
@@ -192,6 +204,37 @@ class SerialThread(threading.Thread):
         print(f"DEBUG: Kunne ikke parse parametre fra linje: {line}")
         return None
 
+    @staticmethod
+    def parse_score_result(line):
+        """
+        Parse en TAG_SCORE_RESULT linje fra robotten.
+
+        Returns:
+            dict med key=value parrene (score, valid_time, rms_amp, pos_rmse, ...)
+            eller None hvis robotten meldte fejl (status=fail/error)
+        """
+        content = line.replace(TAG_SCORE_RESULT, "").strip()
+        if "status=fail" in content or "status=error" in content:
+            return None
+        pairs = re.findall(r'([a-zA-Z_]+)\s*=\s*([0-9.-]+)', content)
+        return {key: float(value) for key, value in pairs}
+
+    @staticmethod
+    def parse_csv_line(line):
+        """
+        Parse en TAG_CSV linje fra robotten.
+
+        Returns:
+            tuple af floats (esp_ms, pitch, ...) eller None hvis linjen er ufuldstændig
+        """
+        parts = line[len(TAG_CSV):].strip().split(',')
+        if len(parts) != NUM_EXPECTED_CSV_COLUMNS:
+            return None
+        try:
+            return tuple(map(float, parts))
+        except ValueError:
+            return None
+
     def send_parameters_with_verification(self, parameters, callback):
         """Send parametre til robot og verificer at de blev modtaget"""
         print("SERIAL-TRÅD: send_parameters_with_verification kaldes...") # DEBUG
@@ -203,7 +246,7 @@ class SerialThread(threading.Thread):
         self.pending_parameters = parameters.copy()
         self.verification_callback = callback
         self.parameter_verification_active = True
-        self.verification_timeout = time.time() + 5.0  # 5 sekunder timeout
+        self.verification_timeout = time.time() + self.verification_attempt_timeout_s
         self.current_retry = 0
         print("SERIAL-TRÅD: Parameter verification er nu aktiv. Venter på svar fra robot...") # DEBUG
         
@@ -212,23 +255,7 @@ class SerialThread(threading.Thread):
             print(f"  {param}={value}")
         
         # Send alle parametre - EN ad gangen med pause
-        success = True
-        for param, value in parameters.items():
-            if param == "kp":
-                success &= self.send_command(f"kp={value}")
-                time.sleep(0.05)  # Kort pause mellem kommandoer
-            elif param == "ki":
-                success &= self.send_command(f"ki={value}")
-                time.sleep(0.05)
-            elif param == "kd":
-                success &= self.send_command(f"kd={value}")
-                time.sleep(0.05)
-            elif param == "init_balance":
-                success &= self.send_command(f"init={value}")
-                time.sleep(0.05)
-            elif param == "power_gain":
-                success &= self.send_command(f"gain={value}")
-                time.sleep(0.05)
+        success = self._send_parameter_commands(parameters)
         
         if not success:
             self.parameter_verification_active = False
@@ -236,7 +263,7 @@ class SerialThread(threading.Thread):
             return False
         
         # Send print kommando for at få bekræftelse
-        time.sleep(0.5)  # Længere pause før print
+        time.sleep(self.print_delay_s)  # Pause før print
         success = self.send_command("print")
         
         if not success:
@@ -246,6 +273,16 @@ class SerialThread(threading.Thread):
         
         return True
 
+    def _send_parameter_commands(self, parameters):
+        """Send hver parameter som sin egen kommando med en kort pause imellem"""
+        commands = {"kp": "kp", "ki": "ki", "kd": "kd", "init_balance": "init", "power_gain": "gain"}
+        success = True
+        for param, value in parameters.items():
+            if param in commands:
+                success &= self.send_command(f"{commands[param]}={value}")
+                time.sleep(self.command_gap_s)
+        return success
+
     def _handle_potential_verification_response(self, line):
         """Håndter potentiel verification response"""
         # Leder efter robot response med parametre - MERE FLEKSIBEL MATCHING
@@ -353,30 +390,14 @@ class SerialThread(threading.Thread):
         # Prøv igen hvis vi har flere forsøg tilbage
         if self.current_retry < self.max_retries - 1:
             self.current_retry += 1
-            self.verification_timeout = time.time() + 5.0
+            self.verification_timeout = time.time() + self.verification_attempt_timeout_s
             
             print(f"RETRY {self.current_retry + 1}/{self.max_retries} - Sender parametre igen...")
-            time.sleep(0.5)  # Længere pause
+            time.sleep(self.print_delay_s)
             
             # Send parametre igen - EN ad gangen
-            for param, value in self.pending_parameters.items():
-                if param == "kp":
-                    self.send_command(f"kp={value}")
-                    time.sleep(0.05)
-                elif param == "ki":
-                    self.send_command(f"ki={value}")
-                    time.sleep(0.05)
-                elif param == "kd":
-                    self.send_command(f"kd={value}")
-                    time.sleep(0.05)
-                elif param == "init_balance":
-                    self.send_command(f"init={value}")
-                    time.sleep(0.05)
-                elif param == "power_gain":
-                    self.send_command(f"gain={value}")
-                    time.sleep(0.05)
-            
-            time.sleep(0.2)
+            self._send_parameter_commands(self.pending_parameters)
+            time.sleep(self.print_delay_s)
             self.send_command("print")
         else:
             # Opgiv efter max forsøg
@@ -391,29 +412,13 @@ class SerialThread(threading.Thread):
         
         if self.current_retry < self.max_retries - 1:
             self.current_retry += 1
-            self.verification_timeout = time.time() + 5.0
+            self.verification_timeout = time.time() + self.verification_attempt_timeout_s
             
             print(f"RETRY {self.current_retry + 1}/{self.max_retries} - Prøver igen...")
             
             # Send parametre igen - EN ad gangen
-            for param, value in self.pending_parameters.items():
-                if param == "kp":
-                    self.send_command(f"kp={value}")
-                    time.sleep(0.05)
-                elif param == "ki":
-                    self.send_command(f"ki={value}")
-                    time.sleep(0.05)
-                elif param == "kd":
-                    self.send_command(f"kd={value}")
-                    time.sleep(0.05)
-                elif param == "init_balance":
-                    self.send_command(f"init={value}")
-                    time.sleep(0.05)
-                elif param == "power_gain":
-                    self.send_command(f"gain={value}")
-                    time.sleep(0.05)
-            
-            time.sleep(0.2)
+            self._send_parameter_commands(self.pending_parameters)
+            time.sleep(self.print_delay_s)
             self.send_command("print")
         else:
             # Opgiv efter max forsøg
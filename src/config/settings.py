@@ -23,6 +23,111 @@ MAX_OSCILLATION_CUTOFF_DEG = 15.0
 MAX_OSCILLATION_AMPLITUDE_RMS = 3.0
 SCORE_SETTLING_TIME_S = 1.0
 
+# --- Forstyrrelsestest (step-respons) ---
+# Forstyrrelsen er en kort puls på init_balance (setpunkt), som robotten skal indhente
+DISTURBANCE_FIRST_EVENT_S = 3.0
+DISTURBANCE_INTERVAL_S = 4.0
+DISTURBANCE_STEP_DEG = 3.0
+DISTURBANCE_PULSE_MS = 200
+DISTURBANCE_DETECT_RATE_DPS = 60.0  # pitchRate-spring der tolkes som et eksternt skub
+DISTURBANCE_WINDOW_BEFORE_S = 0.5
+DISTURBANCE_WINDOW_AFTER_S = 3.0
+DISTURBANCE_SETTLING_BAND_DEG = BALANCED_PITCH_THRESHOLD_DEG
+
+# --- Frekvensrespons (chirp/PRBS excitation via init=) ---
+EXCITATION_UPDATE_MS = 100
+EXCITATION_DURATION_S = 20.0
+EXCITATION_AMPLITUDE_DEG = 1.0
+CHIRP_F_START_HZ = 0.2
+CHIRP_F_END_HZ = 4.0
+PRBS_ORDER = 7
+FREQ_RESPONSE_SEGMENT_S = 5.0
+FREQ_RESPONSE_MIN_COHERENCE = 0.5
+
+# --- Live Metrikker (glidende vindue, O(1) pr. sample) ---
+LIVE_METRICS_WINDOW_S = 4.0
+LIVE_METRICS_NOMINAL_SAMPLE_S = 0.015
+LIVE_DFT_MAX_FREQ_HZ = 8.0
+# Svarer til BALANCE_PID_OUTPUT_LIMIT i firmwarens config.h
+ACTUATOR_OUTPUT_LIMIT = 100.0
+ITERM_WINDUP_LIMIT = 100.0
+ACTUATOR_SATURATION_FRACTION = 0.98
+
+# --- Simulering (forenklet balancerobot til pre-screening af gains) ---
+# Inverteret pendul på hjul: regulatoren styrer hjulenes acceleration.
+# Værdierne er grove skøn og skal kalibreres mod den fysiske robot.
+SIM_DT = 0.001                      # Integrations-skridt [s]
+SIM_LOOP_TIME_S = 0.005             # Regulatorens periode (sample-and-hold + én periodes forsinkelse) [s]
+SIM_DURATION_S = 15.0               # Simuleret kørselstid [s]
+SIM_PENDULUM_LENGTH_M = 0.1         # Afstand fra hjulaksel til tyngdepunkt [m]
+SIM_ACCEL_PER_OUTPUT = 0.24         # Hjul-acceleration pr. enhed regulator-output [m/s^2]
+SIM_MOTOR_TIME_CONSTANT_S = 0.005   # Første-ordens forsinkelse fra output til acceleration [s]
+SIM_INITIAL_PITCH_DEG = 2.0
+SIM_BALANCE_OFFSET_DEG = 0.0        # Tyngdepunktets sande ligevægtsvinkel
+SIM_SENSOR_NOISE_DEG = 0.1
+SIM_SEED = 1
+SIM_BATCH_SIZE = 2000               # Konfigurationer pr. vektoriseret batch
+
+# Hjul-pendul model med firmwarens timing og motor-tabeller (simulation/wheeled_plant.py).
+# Regulator-outputtet er en hastigheds-kommando til hjulene gennem RPM -> PWM tabellerne.
+# Værdierne er ikke kalibreret: med dem vælter DEFAULT_PID_PARAMS, og stabile gains kræver
+# KI over ca. 20. Simuleringsværktøjerne kræver derfor PLANT_PARAMETER_FILE fra
+# identify_plant.py (eller et eksplicit --uncalibrated ved test af selve værktøjerne).
+PLANT_DT = 0.005                    # Integrations-skridt [s]
+PLANT_LOOP_TIME_S = 0.050           # LOOP_TIME_MS i firmwarens config.h
+PLANT_FILTER_ALPHA = 0.1            # ALPHA til LOWPASSFILTER på pitch-raten (1.0 = intet filter)
+PLANT_PENDULUM_LENGTH_M = 0.2       # Effektiv længde (I + m*l^2) / (m*l) for robottens krop, skøn
+PLANT_SENSOR_DELAY_S = 0.0          # IMU-forsinkelse ud over sample-and-hold [s]
+PLANT_RATE_NOISE_DPS = 0.5          # Støj på pitch-raten (gyro) [grader/s]
+PLANT_RPM_PER_OUTPUT = 2.38         # Hjul-RPM pr. enhed output (fuldt output = MAX_RPM), skøn
+PLANT_WHEEL_RADIUS_M = 0.034        # Skøn - kalibreres
+PLANT_MOTOR_TIME_CONSTANT_S = 0.05  # Hjulhastighedens første-ordens forsinkelse (inkl. robottens inerti), skøn
+PLANT_MOTOR_GAIN = 1.0              # Skalering af motorens hastighed (batterispænding)
+
+# Monte Carlo robusthed: hver kandidat simuleres på mange tilfældigt forstyrrede modeller.
+# (type, a, b): 'scale' ganger den nominelle værdi med U(a, b), 'add' lægger U(a, b) til.
+ROBUST_PERTURBATIONS = {
+    "motor_gain": ("scale", 0.85, 1.15),             # Batterispænding
+    "pendulum_length_m": ("scale", 0.8, 1.2),        # Masse og tyngdepunkt
+    "motor_time_constant_s": ("scale", 0.7, 1.3),
+    "sensor_delay_s": ("add", 0.0, 0.02),            # IMU-forsinkelse
+    "balance_offset_deg": ("add", -1.0, 1.0),
+}
+ROBUST_SAMPLES = 200                # Forstyrrede modeller pr. kandidat
+ROBUST_WORKERS = None               # Processer (None = antal CPU-kerner)
+ROBUST_TOP_CANDIDATES = 10          # Antal kandidater fra auto-tune resultaterne
+
+# System-identifikation fra detaljerede logs (analysis/system_identification.py)
+SYSID_ARX_NA = 2                    # Antal tidligere pitch-værdier i ARX-modellen
+SYSID_ARX_NB = 2                    # Antal balanceCmd-værdier
+SYSID_ARX_NK = 1                    # Forsinkelse fra balanceCmd til pitch i samples
+SYSID_MIN_SEGMENT_SAMPLES = 20      # Kortere kørsler (før fald) bruges ikke
+SYSID_CHUNK_SAMPLES = 100000        # Samples pr. blok når en logfil konverteres til den binære cache
+
+# Simuleret robot bag en pty (simulation/simulated_robot.py) til end-to-end test af auto-tuneren
+SIMROBOT_SPEED = 1.0                # Simulerede sekunder pr. sekund (> 1 = hurtigere end virkeligheden)
+SIMROBOT_RECOVERY_S = 2.0           # Simuleret tid før en væltet robot rejses op igen
+SIMROBOT_MAX_LAG_S = 1.0            # Halter simuleringen mere end dette bagefter, opgives indhentningen
+
+# Diskretiseringsstudie (simulation/discretization.py): bedste score pr. kombination af
+# regulator-periode, filter-alpha og IMU-forsinkelse, med gains søgt for hver kombination
+DISC_LOOP_TIMES_S = (0.005, 0.010, 0.020, 0.050)
+DISC_FILTER_ALPHAS = (0.1, 0.3, 0.6, 1.0)
+DISC_SENSOR_DELAYS_S = (0.0, 0.005, 0.010, 0.020)
+DISC_GAIN_SAMPLES = 500             # Tilfældige (kp, ki, kd), fælles for alle kombinationer
+# Gains søges i robottens egne områder omkring DEFAULT_PID_PARAMS; studiet kræver den
+# identificerede model (PLANT_PARAMETER_FILE), så resultatet gælder for robotten
+DISC_KP_RANGE = (0.0, 40.0)
+DISC_KI_RANGE = (0.0, 1.0)
+DISC_KD_RANGE = (0.0, 1.0)
+DISC_CONFIRM_TOP = 5                # De bedste gains pr. kombination genkøres med ny støj...
+DISC_CONFIRM_SEEDS = 3              # ...så den rapporterede score ikke er det heldigste støj-udfald
+
+# Pre-screening: kun kandidater der forventes stabile og gode nok køres på robotten
+PRESCREEN_MIN_SCORE = 0.0
+PRESCREEN_MAX_CANDIDATES = 50       # Maks. antal fysiske kørsler efter screening
+PRESCREEN_MAX_SIMULATIONS = 200000  # Større søgerum screenes med en tilfældig stikprøve
+
 # --- GUI Plot Settings ---
 PLOT_HISTORY_SECONDS = 10
 
@@ -34,6 +139,12 @@ SCORE_DEGRADATION_PENALTY = 50
 SCORE_POSITION_RMSE_PENALTY = 2000
 OSCILLATION_WINDOW_SIZE_S = 2.0
 
+# --- Session Statistik (konfidensintervaller og sekventiel stop-regel) ---
+SESSION_CI_CONFIDENCE = 0.95
+SESSION_BOOTSTRAP_SAMPLES = 2000
+SESSION_MIN_RUNS_FOR_DECISION = 3
+SESSION_MAX_RUNS = 10
+
 
 # --- Default PID Parameters (Simplificeret) ---
 DEFAULT_PID_PARAMS = {
@@ -54,16 +165,135 @@ AUTO_KI_STEP = 0.1
 AUTO_KD_START = 0.0
 AUTO_KD_END = 0.3
 AUTO_KD_STEP = 0.1
+# Valgfrie ekstra dimensioner (aktiveres i GUI'en)
+AUTO_INIT_BALANCE_START = -1.0
+AUTO_INIT_BALANCE_END = 1.0
+AUTO_INIT_BALANCE_STEP = 0.5
+AUTO_POWER_GAIN_START = 0.0
+AUTO_POWER_GAIN_END = 0.2
+AUTO_POWER_GAIN_STEP = 0.05
+
+# --- Auto-Tune Søgestrategi ---
+AUTO_STRATEGY = "grid"
+# Rækkefølge af gitterpunkter: "lexicographic", "serpentine" eller "nearest".
+# Serpentine/nearest giver små parameterspring mellem jobs og dermed kortere indsvingning.
+AUTO_GRID_ORDER = "serpentine"
+BAYES_INITIAL_POINTS = 6
+BAYES_MAX_EVALUATIONS = 25
+BAYES_NOISE = 0.1
+BAYES_XI = 0.01
+BAYES_SEED = 1
+BAYES_CANDIDATE_POOL = 5000  # Større søgerum: EI evalueres på en tilfældig pulje af denne størrelse
+
+# Successive halving / Hyperband: korte kørsler til mange kandidater, lange til de bedste.
+# HALVING_MIN_DURATION_S er grænsen for den geometriske trin-række; trin kortere end
+# MIN_VALID_RUN_DURATION_S forlænges dog til den, da kortere kørsler scorer 0.
+# Med AUTO_DURATION_SEC (15s) er der ikke plads til et kortere gyldigt trin, så
+# halving/hyperband bruger HALVING_DURATION_S som standard-varighed: trinene bliver
+# 10s, 15s og 45s, og det fulde standard-gitter koster ca. 45% af et 45s grid.
+HALVING_MIN_DURATION_S = 5.0
+HALVING_DURATION_S = 45.0
+HALVING_ETA = 3
+HALVING_BUDGET_S = None  # Maks. robot-sekunder for hele kampagnen (None = ingen grænse)
+HYPERBAND_SEED = 1
+
+# Adaptiv forfining ("refine"): efter hvert gennemløb halveres skridtet i en boks
+# omkring de REFINE_TOP_K bedste, og kun de nye punkter køres
+REFINE_TOP_K = 3
+REFINE_MAX_PASSES = 4
+REFINE_BUDGET_S = 3600.0  # Samlet robot-tid i sekunder (None = kun begrænset af REFINE_MAX_PASSES)
+
+# Lokal søgning ("local"): støjtolerant Nelder-Mead der starter i best_config.
+# Et punkt køres kun igen når en simplex-beslutning ikke er statistisk sikker.
+LOCAL_INITIAL_STEP = 0.15     # Start-simplexens størrelse som andel af hver parameters interval
+LOCAL_MAX_EVALUATIONS = 60    # Inkl. gentagelser
+LOCAL_MAX_RUNS = 3            # Maks. kørsler af ét punkt ved usikre beslutninger
+LOCAL_MIN_IMPROVEMENT = 5.0   # Stop når simplexens scores ligger inden for dette, eller den bedste
+LOCAL_PATIENCE = 6            # middel-score er forbedret mindre end dette over så mange iterationer
+LOCAL_MIN_SIZE = 0.02         # Stop når simplexen er mindre end denne andel af intervallerne
+LOCAL_CONFIDENCE = 0.8        # Nelder-Mead tåler enkelte forkerte beslutninger - lavere krav end REPEAT_CONFIDENCE
+
+# Gentagelser: når søgningen er færdig, køres de bedste kandidater igen indtil
+# rækkefølgen i top-k er statistisk afgjort eller budgettet er brugt
+REPEAT_TOP_K = 3             # 0 = ingen gentagelser
+REPEAT_MAX_RUNS = 5          # Maks. kørsler pr. kandidat
+REPEAT_BUDGET_RUNS = 15      # Maks. ekstra kørsler i alt
+REPEAT_CONFIDENCE = 0.95
+REPEAT_PRIOR_STD = 30.0      # Antaget score-spredning indtil den kan estimeres fra gentagelser
+REPEAT_PRIOR_WEIGHT = 2.0    # Den fælles varians' vægt (frihedsgrader) i hver kandidats varians
+
+# Multi-objektiv (Pareto) tuning: metrikkerne vægtes ikke sammen, men holdes som
+# en vektor pr. job. (metrik, referenceværdi) - alle mål minimeres, og værdier
+# over referencen tæller som "ingen gevinst" i hypervolumen.
+PARETO_OBJECTIVES = [
+    ("amplitude_rms", 15.0),       # Pitch RMS [grader] (reference = MAX_OSCILLATION_CUTOFF_DEG)
+    ("avg_frequency", 10.0),       # Oscillationsfrekvens [Hz]
+    ("degradation_factor", 5.0),   # Forværring fra første til sidste vindue
+    ("position_rmse_m", 1.0),      # Positions-RMSE [m]
+]
+PARETO_MAX_EVALUATIONS = 40
+PARETO_KAPPA = 1.0      # Optimisme i GP-prædiktionen (middelværdi - kappa * spredning)
+PARETO_MIN_SCORE = 0.0  # Jobs med score <= denne (væltet/for kort) får referencepunktet
+
+# Tidlig afbrydelse: stop en auto-tune kørsel når den øvre grænse for dens score
+# er under EARLY_ABORT_FRACTION af den hidtil bedste score
+EARLY_ABORT_ENABLED = True
+EARLY_ABORT_FRACTION = 0.9
+EARLY_ABORT_MIN_TIME_S = 2.0
+
+# Flere robotter: én seriel port pr. robot (bruges af multi_robot_tune.py)
+MULTI_ROBOT_PORTS = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+# Hver robot kører DEFAULT_PID_PARAMS som reference for hver N'te job, så dens
+# score-bias i forhold til de andre robotter kan estimeres og trækkes fra
+MULTI_ROBOT_REFERENCE_INTERVAL = 10
+MULTI_ROBOT_CONNECT_TIMEOUT_S = 10.0
+PARAM_VERIFY_TIMEOUT_S = 10.0  # SerialThread prøver selv 3 gange á PARAM_VERIFY_ATTEMPT_TIMEOUT_S
+SCORE_RESULT_TIMEOUT_S = 3.0  # Watchdog for robottens score efter score_stop
+FAILED_SCORE = -1000            # Straf-score ved fejl, timeout eller manglende verifikation
+FAILED_JOB_RETRY_DELAY_S = 0.5  # Pause før næste job efter fejlet verifikation eller manglende score
+RECONNECT_POLL_S = 0.5          # Uden forbindelse venter auto-tune på robotten i stedet for at score jobs...
+RECONNECT_TIMEOUT_S = 60.0      # ...og stopper (kan genoptages) hvis den ikke kommer igen
+
+# Dødtid mellem auto-tune jobs: parametre uploades mens robotten falder til ro,
+# og næste kørsel starter først når pitch og rate har været under grænserne i
+# STILL_SAMPLES samples i træk (i stedet for faste pauser)
+PARAM_COMMAND_GAP_S = 0.02          # Pause mellem parameter-kommandoer
+PARAM_PRINT_DELAY_S = 0.1           # Pause før "print" (robotten behandler kommandoer i rækkefølge)
+PARAM_VERIFY_ATTEMPT_TIMEOUT_S = 2.0
+STILL_PITCH_DEG = 2.0
+STILL_RATE_DPS = 5.0
+STILL_SAMPLES = 20
+STILL_TIMEOUT_S = 30.0  # Start alligevel (med advarsel) hvis robotten ikke falder til ro
 
 # --- Communication Tags (skal matche ESP32 output) ---
 TAG_CSV = "TAG_CSV:"
 TAG_FALLEN = "TAG_FALLEN"
 TAG_INFO = "TAG_INFO:"
 TAG_ERROR = "TAG_ERROR:"
+TAG_SCORE_RESULT = "TAG_SCORE_RESULT:"
 
 # --- File Paths ---
 DATA_DIR = "data"
+SPECTRA_CACHE_DIR = os.path.join(DATA_DIR, "spectra")
+SYSID_CACHE_DIR = os.path.join(DATA_DIR, "sysid")  # Binære kopier af de detaljerede logs (læses memory-mapped)
+PLANT_PARAMETER_FILE = "plant_parameters.json"      # Identificerede model-parametre til simulation/wheeled_plant.py
 PID_SETTINGS_FILE = "pid_settings.json"
+AUTOTUNE_RESULTS_FILE = "autotune_results.csv"
+# Metrik-vektoren pr. auto-tune job (nøgle fra ScoreCalculator -> CSV-kolonne)
+AUTOTUNE_METRIC_COLUMNS = {
+    "valid_time": "ValidTime_s",
+    "amplitude_rms": "AmplitudeRMS_deg",
+    "avg_frequency": "Frequency_Hz",
+    "degradation_factor": "Degradation",
+    "position_rmse_m": "PositionRMSE_m",
+}
+AUTOTUNE_RESULT_COLUMNS = ["Timestamp", "KP", "KI", "KD", "INIT_BALANCE", "POWER_GAIN", "Score",
+                           "Duration_s", "Elapsed_s", "Aborted", "Failed", "Robot", "RawScore",
+                           *AUTOTUNE_METRIC_COLUMNS.values()]
+AUTOTUNE_SUMMARY_FILE = os.path.join(DATA_DIR, "autotune_summary.csv")  # Middel-score og standardfejl pr. parameter-tupel
+PARETO_FRONT_FILE = os.path.join(DATA_DIR, "pareto_front.csv")  # Alle jobs med Pareto-rang - kan plottes med plot_3d_*.py --max-rank 1
+AUTOTUNE_CAMPAIGN_FILE = os.path.join(DATA_DIR, "autotune_campaign.json")
+AUTOTUNE_MATCH_TOLERANCE = 5e-4  # Parametre logges med 4 decimaler
 
 
 # --- PID Persistence Functions (Simplificeret) ---
@@ -3,8 +3,18 @@
 CSV logging funktionalitet for robot performance data
 """
 import os
+import csv
 import datetime
 from tkinter import messagebox
+from config.settings import AUTOTUNE_RESULT_COLUMNS, AUTOTUNE_METRIC_COLUMNS, FAILED_SCORE
+
+# Kolonner i autotune-filerne der ikke er parametre
+AUTOTUNE_NON_PARAM_COLUMNS = {"Timestamp", "Score", "Elapsed_s", "Aborted", "Failed", "Robot", "RawScore",
+                              "Rank", "StdErr", "Runs", *AUTOTUNE_METRIC_COLUMNS.values()}
+
+SESSION_SUMMARY_COLUMNS = ["LogTimestamp", "SessionID", "KP", "KI", "KD", "NumRuns", "AvgScore", "MaxScore",
+                           "StdScore", "CI_Low", "CI_High", "BootCI_Low", "BootCI_High",
+                           "AvgValidTime_s", "AvgAmplitudeRMS_deg", "AvgFrequency_Hz", "AvgDegradation"]
 
 class DataLogger:
     """Håndterer logging af data til CSV filer."""
@@ -18,20 +28,20 @@ class DataLogger:
         file_exists = os.path.exists(filename)
         try:
             with open(filename, 'a', newline='') as f:
-                header = "Time_ms,Pitch,PitchRate,BalanceCmd,PTerm,ITerm,DTerm,ScaledOutput\n"
+                header = "Time_ms,Pitch,PitchRate,BalanceCmd,PTerm,ITerm,DTerm,ScaledOutput,Displacement\n"
                 if not file_exists or os.path.getsize(filename) == 0:
                     f.write(header)
                 
                 for data_point in run_data_list:
-                    # Forventer nu et fast tuple-format med 9 elementer
-                    # (esp_ms, rel_s, pitch, rate, cmd, p, i, d, scaled)
-                    # Vi logger kun de 8 relevante kolonner
+                    # Forventer nu et fast tuple-format med 10 elementer
+                    # (esp_ms, rel_s, pitch, rate, cmd, p, i, d, scaled, displacement)
+                    # Vi logger alle kolonner undtagen den relative tid
                     f.write(
                         f"{data_point[0]:.0f},"
                         f"{data_point[2]:.3f},{data_point[3]:.3f},"
                         f"{data_point[4]:.3f},{data_point[5]:.3f},"
                         f"{data_point[6]:.3f},{data_point[7]:.3f},"
-                        f"{data_point[8]:.3f}\n"
+                        f"{data_point[8]:.3f},{data_point[9]:.4f}\n"
                     )
             print(f"ROBOT INFO: Detaljeret kørsel logget til {filename}")
             return True
@@ -39,32 +49,269 @@ class DataLogger:
             messagebox.showerror("Filfejl", f"Kunne ikke skrive til detaljeret logfil:\n{e}")
             return False
 
+    @staticmethod
+    def read_detailed_runs(filename, run_gap_ms=1000):
+        """
+        Læs en detaljeret logfil tilbage og del den op i kørsler.
+
+        Flere kørsler appendes til samme fil, så en ny kørsel genkendes på at
+        Time_ms springer baglæns eller mere end `run_gap_ms` frem.
+        Ældre filer uden Displacement-kolonne får position 0.0.
+
+        Returns:
+            list: Liste af kørsler i samme tuple-format som `current_run_data`
+                  (esp_ms, rel_s, pitch, rate, cmd, p, i, d, scaled, displacement)
+        """
+        runs = []
+        current_run = []
+        for new_run, sample in DataLogger.iter_detailed_samples(filename, run_gap_ms):
+            if new_run and current_run:
+                runs.append(current_run)
+                current_run = []
+            current_run.append(sample)
+        if current_run:
+            runs.append(current_run)
+        return runs
+
+    @staticmethod
+    def iter_detailed_samples(filename, run_gap_ms=1000):
+        """
+        Som read_detailed_runs, men sample for sample uden at holde filen i hukommelsen.
+
+        Yields:
+            tuple: (ny kørsel, sample) - flaget er True for første sample i hver kørsel
+        """
+        run_start_ms = None
+        last_ms = None
+        try:
+            with open(filename, 'r', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if not header:
+                    return
+                has_displacement = "Displacement" in header
+
+                for row in reader:
+                    try:
+                        values = [float(v) for v in row]
+                    except ValueError:
+                        continue
+                    if len(values) < 8:
+                        continue
+
+                    esp_ms = values[0]
+                    if last_ms is not None and (esp_ms < last_ms or esp_ms - last_ms > run_gap_ms):
+                        run_start_ms = None
+                    new_run = run_start_ms is None
+                    if new_run:
+                        run_start_ms = esp_ms
+                    last_ms = esp_ms
+
+                    displacement = values[8] if has_displacement and len(values) > 8 else 0.0
+                    yield new_run, (esp_ms, (esp_ms - run_start_ms) / 1000.0) + tuple(values[1:8]) + (displacement,)
+        except IOError as e:
+            print(f"ROBOT ERROR: Kunne ikke læse detaljeret logfil {filename}: {e}")
+
+    @staticmethod
+    def append_csv_row(filename, columns, row):
+        """
+        Tilføj en række til en CSV-fil med header.
+
+        Hvis filen allerede findes med en ældre header der mangler nogle af
+        kolonnerne (eller rækkens nøgler), skrives den om med foreningen af
+        kolonnerne først - eksisterende rækker får tomme felter i de nye
+        kolonner. Ingen værdier smides væk, og plot-scripts læser kolonnerne
+        efter navn.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        wanted = list(columns) + [key for key in row if key not in columns]
+
+        header = None
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            with open(filename, 'r', newline='') as f:
+                header = next(csv.reader(f), None)
+
+        if header is not None:
+            missing = [column for column in wanted if column not in header]
+            if missing:
+                DataLogger._migrate_csv_header(filename, header + missing)
+                print(f"DataLogger: {filename} udvidet med kolonnerne {', '.join(missing)}")
+                header = header + missing
+
+        with open(filename, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=header or wanted, extrasaction='ignore', restval='')
+            if header is None:
+                writer.writeheader()
+            writer.writerow(row)
+
+    @staticmethod
+    def _migrate_csv_header(filename, columns):
+        """Skriv filen om med en ny header; filen erstattes først når den nye er skrevet færdig"""
+        with open(filename, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+        temporary = filename + ".tmp"
+        DataLogger.write_csv_rows(temporary, columns, rows)
+        os.replace(temporary, filename)
+
+    @staticmethod
+    def _autotune_row(pid_params, score, metrics=None):
+        """CSV-række (kolonnenavn -> tekst) for et auto-tune job"""
+        row = {
+            "Timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "KP": f"{pid_params.get('kp', 0):.4f}",
+            "KI": f"{pid_params.get('ki', 0):.4f}",
+            "KD": f"{pid_params.get('kd', 0):.4f}",
+            "Score": f"{score:.2f}",
+        }
+        # Øvrige tunede parametre (f.eks. init_balance, power_gain) får deres egen kolonne
+        for name, value in pid_params.items():
+            if name not in ('kp', 'ki', 'kd', 'duration_s'):
+                row[name.upper()] = f"{value:.4f}"
+        if 'duration_s' in pid_params:
+            row["Duration_s"] = f"{pid_params['duration_s']:.1f}"
+        for name, column in AUTOTUNE_METRIC_COLUMNS.items():
+            if metrics and name in metrics:
+                row[column] = f"{metrics[name]:.4f}"
+        return row
+
+    @staticmethod
+    def write_autotune_result(filename, pid_params, score, extra=None, metrics=None):
+        """Log resultatet af en enkelt auto-tune kørsel (metrics: ScoreCalculator.calculate_run_metrics)."""
+        row = DataLogger._autotune_row(pid_params, score, metrics)
+        if extra:
+            row.update(extra)
+        try:
+            DataLogger.append_csv_row(filename, AUTOTUNE_RESULT_COLUMNS, row)
+            return True
+        except IOError as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke skrive til logfil {filename}: {e}")
+            return False
+
+    @staticmethod
+    def _is_failed_row(row, score):
+        """Failed-kolonnen, eller for rækker skrevet før den fandtes: straf-score uden kørselstid"""
+        failed = row.get("Failed")
+        if failed:
+            return failed == "1"
+        return score == FAILED_SCORE and row.get("Elapsed_s") == ""
+
+    @staticmethod
+    def read_autotune_results(filename):
+        """
+        Læs tidligere auto-tune resultater.
+
+        Returns:
+            list: Liste af (parametre, score) hvor parametre er en dict med små
+                  bogstaver (kp, ki, kd, ...) og evt. 'duration_s'
+        """
+        results = []
+        if not os.path.exists(filename):
+            return results
+        try:
+            with open(filename, 'r', newline='') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        score = float(row["Score"])
+                        params = {key.lower(): float(value) for key, value in row.items()
+                                  if key not in AUTOTUNE_NON_PARAM_COLUMNS and value not in (None, "")}
+                    except (KeyError, ValueError):
+                        continue
+                    # Afbrudte kørsler har kun en delvis score, og fejlede jobs (verifikation,
+                    # watchdog, robot-fejl) gav ingen score - ingen af dem tæller som testet.
+                    # En rigtig score på FAILED_SCORE (robotten væltede med det samme) gælder.
+                    if row.get("Aborted") == "1" or DataLogger._is_failed_row(row, score):
+                        continue
+                    results.append((params, score))
+        except IOError as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke læse logfil {filename}: {e}")
+        return results
+
+    @staticmethod
+    def write_csv_rows(filename, columns, rows):
+        """Overskriv en CSV-fil med header og rækker (dicts). Manglende værdier skrives tomme."""
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore', restval='')
+            writer.writeheader()
+            writer.writerows(rows)
+
+    @staticmethod
+    def write_pareto_front(filename, rows):
+        """
+        Skriv alle jobs fra en ParetoFront med deres rang (1 = Pareto-fronten).
+
+        Filen overskrives hver gang og har samme kolonner som autotune-resultaterne,
+        så plot_3d_results.py/plot_3d_plane.py kan vise den direkte.
+        """
+        columns = [column for column in AUTOTUNE_RESULT_COLUMNS
+                   if column not in ("Elapsed_s", "Aborted", "Failed", "Robot", "RawScore")] + ["Rank"]
+        csv_rows = []
+        for job, score, metrics, rank in rows:
+            row = DataLogger._autotune_row(job, score, metrics)
+            row["Rank"] = rank
+            csv_rows.append(row)
+        try:
+            DataLogger.write_csv_rows(filename, columns, csv_rows)
+            return True
+        except IOError as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke skrive Pareto-front til {filename}: {e}")
+            return False
+
+    @staticmethod
+    def write_autotune_summary(filename, statistics):
+        """
+        Skriv middel-score og standardfejl pr. parameter-tupel (RepeatScheduler.statistics).
+
+        Score-kolonnen er middel-scoren, så filen kan plottes som autotune-resultaterne.
+        """
+        columns = ["Timestamp", "KP", "KI", "KD", "INIT_BALANCE", "POWER_GAIN", "Duration_s",
+                   "Score", "StdErr", "Runs"]
+        csv_rows = []
+        for stat in statistics:
+            row = DataLogger._autotune_row(stat['job'], stat['mean'])
+            row["StdErr"] = f"{stat['sem']:.2f}"
+            row["Runs"] = stat['runs']
+            csv_rows.append(row)
+        try:
+            DataLogger.write_csv_rows(filename, columns, csv_rows)
+            return True
+        except IOError as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke skrive opsummering til {filename}: {e}")
+            return False
+
     @staticmethod
     def write_session_summary(filename, session_id, pid_params, session_stats):
-        """Log session sammendrag til CSV."""
-        file_exists = os.path.exists(filename)
+        """
+        Log session sammendrag til CSV.
+
+        Filer fra før CI-kolonnerne får dem tilføjet af append_csv_row, så
+        rækkerne altid står under den rigtige header.
+        """
+        def format_metric(value, precision=3):
+            return f"{value:.{precision}f}" if isinstance(value, (int, float)) and abs(value) != float('inf') else "N/A"
+
+        row = {
+            "LogTimestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "SessionID": session_id,
+            "KP": f"{pid_params.get('kp',0):.4f}",
+            "KI": f"{pid_params.get('ki',0):.4f}",
+            "KD": f"{pid_params.get('kd',0):.4f}",
+            "NumRuns": session_stats.get('num_runs', 0),
+            "AvgScore": format_metric(session_stats.get('avg_score', 0), 2),
+            "MaxScore": format_metric(session_stats.get('max_score', 0), 2),
+            "StdScore": format_metric(session_stats.get('std_score', 0), 2),
+            "CI_Low": format_metric(session_stats.get('ci_low', 0), 2),
+            "CI_High": format_metric(session_stats.get('ci_high', 0), 2),
+            "BootCI_Low": format_metric(session_stats.get('ci_boot_low', 0), 2),
+            "BootCI_High": format_metric(session_stats.get('ci_boot_high', 0), 2),
+            "AvgValidTime_s": format_metric(session_stats.get('avg_valid_time', 0), 2),
+            "AvgAmplitudeRMS_deg": format_metric(session_stats.get('avg_amplitude_rms', 0)),
+            "AvgFrequency_Hz": format_metric(session_stats.get('avg_frequency', 0), 2),
+            "AvgDegradation": format_metric(session_stats.get('avg_degradation', 0)),
+        }
         try:
-            with open(filename, 'a', newline='') as f:
-                header = ("LogTimestamp,SessionID,KP,KI,KD,NumRuns,AvgScore,MaxScore,"
-                          "AvgValidTime_s,AvgAmplitudeRMS_deg,AvgFrequency_Hz,AvgDegradation\n")
-                if not file_exists or os.path.getsize(filename) == 0:
-                    f.write(header)
-                
-                log_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                def format_metric(value, precision=3):
-                    return f"{value:.{precision}f}" if isinstance(value, (int, float)) and value != float('inf') else "N/A"
-
-                data_row = (
-                    f"{log_time},{session_id},"
-                    f"{pid_params.get('kp',0):.4f},{pid_params.get('ki',0):.4f},{pid_params.get('kd',0):.4f},"
-                    f"{session_stats.get('num_runs',0)},{format_metric(session_stats.get('avg_score',0), 2)},"
-                    f"{format_metric(session_stats.get('max_score',0), 2)},{format_metric(session_stats.get('avg_valid_time',0), 2)},"
-                    f"{format_metric(session_stats.get('avg_amplitude_rms',0))},"
-                    f"{format_metric(session_stats.get('avg_frequency',0), 2)},"
-                    f"{format_metric(session_stats.get('avg_degradation',0))}\n"
-                )
-                f.write(data_row)
+            DataLogger.append_csv_row(filename, SESSION_SUMMARY_COLUMNS, row)
             print(f"ROBOT INFO: Session resultat logget til {filename}")
             return True
         except IOError as e:
@@ -4,6 +4,7 @@ Håndtering af test sessioner og filnavngivning
 """
 
 import os
+import re
 import datetime
 from config.settings import DATA_DIR
 from analysis.score_calculator import ScoreCalculator
@@ -31,6 +32,8 @@ class SessionManager:
             'timestamp': None,
             'stats': None
         }
+        # Bedste score fra andre sessioner - referencen for den sekventielle stop-regel
+        self.reference_best_score = None
         
         self._ensure_data_directory()
         self._create_session_files()
@@ -79,6 +82,32 @@ class SessionManager:
             
         return base_str
 
+    @staticmethod
+    def parse_pid_string(filename):
+        """
+        Udled PID parametre fra et session-filnavn (modsat _format_pid_string)
+
+        Returns:
+            dict: PID parametre eller None hvis filnavnet ikke matcher
+        """
+        match = re.search(
+            r'KP(-?[0-9.]+)_KI(-?[0-9.]+)_KD(-?[0-9.]+)(?:_I(-?[0-9.]+))?(?:_G(-?[0-9.]+))?',
+            os.path.basename(filename)
+        )
+        if not match:
+            return None
+
+        pid_params = {
+            'kp': float(match.group(1)),
+            'ki': float(match.group(2)),
+            'kd': float(match.group(3))
+        }
+        if match.group(4) is not None:
+            pid_params['init_balance'] = float(match.group(4))
+        if match.group(5) is not None:
+            pid_params['power_gain'] = float(match.group(5))
+        return pid_params
+
     def start_new_session(self, new_pid_params):
         """
         Start en ny session med nye PID parametre
@@ -99,6 +128,7 @@ class SessionManager:
         self.session_start_time = datetime.datetime.now()
         self.current_pid_params = self._ensure_all_params(new_pid_params.copy())
         self.session_run_details = []
+        self.reference_best_score = self._best_avg_score_or_none()
         
         # Opret nye filnavne
         self._create_session_files()
@@ -128,15 +158,39 @@ class SessionManager:
         if not self.session_run_details:
             return {
                 'num_runs': 0,
-                'avg_score': None
+                'avg_score': None,
+                'ci_low': None,
+                'ci_high': None,
+                'decision': 'continue'
             }
         
         scores = [details[0] for details in self.session_run_details]
+        intervals = ScoreCalculator.calculate_score_intervals(scores)
         return {
             'num_runs': len(self.session_run_details),
-            'avg_score': sum(scores) / len(scores) if scores else None
+            'avg_score': sum(scores) / len(scores) if scores else None,
+            'ci_low': intervals['t_low'],
+            'ci_high': intervals['t_high'],
+            'decision': self.get_repeat_decision()
         }
 
+    def get_repeat_decision(self):
+        """
+        Afgør om der skal køres flere gentagelser med de nuværende parametre
+
+        Returns:
+            str: 'continue', 'better', 'worse', 'max_runs' eller 'no_reference'
+        """
+        scores = [details[0] for details in self.session_run_details]
+        return ScoreCalculator.sequential_decision(scores, self.reference_best_score)
+
+    def _best_avg_score_or_none(self):
+        """Returner den bedste gennemsnitsscore eller None hvis der ikke er nogen"""
+        avg_score = self.best_config.get('avg_score')
+        if avg_score is None or avg_score == float('-inf'):
+            return None
+        return avg_score
+
     def get_current_session_info(self):
         """Få info om nuværende session"""
         return {
@@ -210,6 +264,7 @@ class SessionManager:
         """
         if best_config_data:
             self.best_config = best_config_data.copy()
+            self.reference_best_score = self._best_avg_score_or_none()
             print(f"ROBOT INFO: Bedste konfiguration indlæst fra fil")
             if self.best_config.get('pid_params'):
                 pid = self.best_config['pid_params']
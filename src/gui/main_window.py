@@ -7,7 +7,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
 from collections import deque
-import re # <-- TILFØJ DENNE IMPORT
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import datetime
@@ -22,8 +21,40 @@ from communication.serial_handler import SerialThread
 from datalogger.session_manager import SessionManager
 from datalogger.data_logger import DataLogger
 from analysis.score_calculator import ScoreCalculator
+from analysis.step_response import StepResponseAnalyzer
+from analysis.frequency_response import FrequencyResponseEstimator
+from analysis.live_metrics import LiveMetrics
 from gui.status_widgets import StatusWidgets
 from tuning.auto_tuner import AutoTuner
+from tuning.strategies import STRATEGIES, NelderMeadStrategy
+from tuning.search_space import GRID_ORDERS
+from tuning.campaign import Campaign
+from tuning.engine import AutoTuneEngine
+
+# Testtilstande: visningsnavn -> intern nøgle
+TEST_MODES = {
+    "Fri balance": "free",
+    "Forstyrrelse (kommando)": "disturbance",
+    "Forstyrrelse (skub)": "push",
+    "Chirp (Bode)": "chirp",
+    "PRBS (Bode)": "prbs",
+}
+
+
+class TkScheduler:
+    """Tk's event-loop med det scheduler-interface AutoTuneEngine forventer"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def after(self, delay_ms, callback):
+        return self.root.after(delay_ms, callback)
+
+    def cancel(self, timer_id):
+        self.root.after_cancel(timer_id)
+
+    def call_soon(self, callback):
+        self.root.after_idle(callback)
 
 
 class RobotPerformanceApp:
@@ -53,12 +84,22 @@ class RobotPerformanceApp:
         self.run_start_time_esp_ms = 0
         self.first_data_line_in_run_received = False
         
-        # State for Auto-Tuner
-        self.is_auto_tuning = False
-        self.autotuner = None
+        # State for forstyrrelsestest
+        self.test_mode = "free"
+        self.disturbance_event_times = []
+        self.disturbance_timer_id = None
+        
+        # State for chirp/PRBS excitation
+        self.current_run_id = None
+        self.excitation_signal = None
+        self.excitation_log = []
+        self.excitation_timer_id = None
+        
+        # Auto-tune forløbet ligger i AutoTuneEngine - GUI'en er kun en visning
         self.countdown_timer_id = None
-        self.autostop_timer_id = None
-        self.score_watchdog_timer_id = None
+        
+        # Live metrikker opdateres pr. sample i _add_run_sample
+        self.live_metrics = LiveMetrics()
         
         # Plot data
         self.plot_time_data = deque()
@@ -71,6 +112,8 @@ class RobotPerformanceApp:
             self._dispatch_serial_data_to_gui, 
             self._update_serial_status_gui
         )
+        self.engine = AutoTuneEngine(self.serial_thread, TkScheduler(self.root))
+        self.engine.add_listener(self._on_engine_event)
         self.serial_thread.start()
         self.root.after(100, self._periodic_gui_update)
         self.root.after(2000, self._try_load_pid_from_robot)
@@ -147,6 +190,9 @@ class RobotPerformanceApp:
         control_frame = ttk.LabelFrame(parent, text="Manuel Test Kontrol")
         control_frame.grid(row=2, column=0, padx=0, pady=(0,10), sticky="ew")
         
+        self.test_mode_var = tk.StringVar(value=next(iter(TEST_MODES)))
+        ttk.Combobox(control_frame, textvariable=self.test_mode_var, values=list(TEST_MODES), state="readonly").pack(pady=5, padx=5, fill="x")
+        
         self.start_stop_button = ttk.Button(control_frame, text="Start Testkørsel", command=self._toggle_test_run)
         self.start_stop_button.pack(pady=5, padx=5, fill="x")
         
@@ -176,14 +222,43 @@ class RobotPerformanceApp:
         ttk.Label(autotune_frame, text="KI Slut:").grid(row=2, column=2, sticky="w", padx=5, pady=2); self.ki_end_var = tk.DoubleVar(value=AUTO_KI_END); ttk.Entry(autotune_frame, textvariable=self.ki_end_var, width=8).grid(row=2, column=3)
         ttk.Label(autotune_frame, text="KI Skridt:").grid(row=2, column=4, sticky="w", padx=5, pady=2); self.ki_step_var = tk.DoubleVar(value=AUTO_KI_STEP); ttk.Entry(autotune_frame, textvariable=self.ki_step_var, width=8).grid(row=2, column=5)
 
-        # Række 4: Varighed og Knap
-        ttk.Label(autotune_frame, text="Varighed (s):").grid(row=3, column=0, sticky="w", padx=5, pady=2); self.duration_var = tk.IntVar(value=AUTO_DURATION_SEC); ttk.Entry(autotune_frame, textvariable=self.duration_var, width=8).grid(row=3, column=1)
-        
+        # Række 4-5: Valgfrie dimensioner (init_balance og power_gain) - kun med hvis afkrydset
+        self.tune_extra_vars = {}
+        extra_rows = [("init_balance", "Init", AUTO_INIT_BALANCE_START, AUTO_INIT_BALANCE_END, AUTO_INIT_BALANCE_STEP),
+                      ("power_gain", "Power", AUTO_POWER_GAIN_START, AUTO_POWER_GAIN_END, AUTO_POWER_GAIN_STEP)]
+        for row, (name, label, start, end, step) in enumerate(extra_rows, start=3):
+            enabled_var, start_var, end_var, step_var = tk.BooleanVar(value=False), tk.DoubleVar(value=start), tk.DoubleVar(value=end), tk.DoubleVar(value=step)
+            ttk.Label(autotune_frame, text=f"{label} Start:").grid(row=row, column=0, sticky="w", padx=5, pady=2); ttk.Entry(autotune_frame, textvariable=start_var, width=8).grid(row=row, column=1)
+            ttk.Label(autotune_frame, text=f"{label} Slut:").grid(row=row, column=2, sticky="w", padx=5, pady=2); ttk.Entry(autotune_frame, textvariable=end_var, width=8).grid(row=row, column=3)
+            ttk.Label(autotune_frame, text=f"{label} Skridt:").grid(row=row, column=4, sticky="w", padx=5, pady=2); ttk.Entry(autotune_frame, textvariable=step_var, width=8).grid(row=row, column=5)
+            ttk.Checkbutton(autotune_frame, text="Tun", variable=enabled_var).grid(row=row, column=6, sticky="w", padx=5)
+            self.tune_extra_vars[name] = (enabled_var, start_var, end_var, step_var)
+
+        # Rækkerne under de valgfrie dimensioner: varighed, strategi, rækkefølge og knap
+        row = 3 + len(extra_rows)
+        ttk.Label(autotune_frame, text="Varighed (s):").grid(row=row, column=0, sticky="w", padx=5, pady=2); self.duration_var = tk.IntVar(value=AUTO_DURATION_SEC); ttk.Entry(autotune_frame, textvariable=self.duration_var, width=8).grid(row=row, column=1)
+        ttk.Label(autotune_frame, text="Strategi:").grid(row=row, column=2, sticky="w", padx=5, pady=2); self.strategy_var = tk.StringVar(value=AUTO_STRATEGY); strategy_box = ttk.Combobox(autotune_frame, textvariable=self.strategy_var, values=list(STRATEGIES), state="readonly", width=8); strategy_box.grid(row=row, column=3)
+        self._strategy_default_duration = int(STRATEGIES[AUTO_STRATEGY].default_duration_s); self.duration_var.set(self._strategy_default_duration)
+        strategy_box.bind("<<ComboboxSelected>>", self._on_strategy_selected)
+        self.retest_var = tk.BooleanVar(value=False); ttk.Checkbutton(autotune_frame, text="Gentest kendte", variable=self.retest_var).grid(row=row, column=4, columnspan=2, sticky="w", padx=5)
+        
+        ttk.Label(autotune_frame, text="Rækkefølge:").grid(row=row + 1, column=0, sticky="w", padx=5, pady=2); self.grid_order_var = tk.StringVar(value=AUTO_GRID_ORDER); ttk.Combobox(autotune_frame, textvariable=self.grid_order_var, values=list(GRID_ORDERS), state="readonly", width=12).grid(row=row + 1, column=1, columnspan=2, sticky="w")
+
         self.start_autotune_button = ttk.Button(autotune_frame, text="Start Automatisk Tuning", command=self.toggle_auto_tuning)
-        self.start_autotune_button.grid(row=4, column=0, columnspan=6, pady=5, padx=5, sticky="ew")
+        self.start_autotune_button.grid(row=row + 2, column=0, columnspan=7, pady=5, padx=5, sticky="ew")
 
         self.autotune_status_label = ttk.Label(autotune_frame, text="Status: Standby")
-        self.autotune_status_label.grid(row=5, column=0, columnspan=6, pady=2, padx=5, sticky="w")
+        self.autotune_status_label.grid(row=row + 3, column=0, columnspan=7, pady=2, padx=5, sticky="w")
+
+    def _on_strategy_selected(self, event=None):
+        """Skift til strategiens standard-varighed, medmindre brugeren har valgt en anden"""
+        try:
+            unchanged = self.duration_var.get() == self._strategy_default_duration
+        except tk.TclError:
+            unchanged = False
+        self._strategy_default_duration = int(STRATEGIES[self.strategy_var.get()].default_duration_s)
+        if unchanged:
+            self.duration_var.set(self._strategy_default_duration)
 
     def _setup_plot(self, parent):
         self.fig = Figure(figsize=(8, 6), dpi=100)
@@ -199,98 +274,109 @@ class RobotPerformanceApp:
         self.canvas.draw()
     
     # ===================================================================
-    #   AUTO-TUNING LOGIK (Uændret)
+    #   AUTO-TUNING (visning af AutoTuneEngine)
     # ===================================================================
+
+    @property
+    def is_auto_tuning(self):
+        return self.engine.is_active
     
     def toggle_auto_tuning(self):
         """Starter eller stopper den automatiske tuning proces."""
         if self.is_auto_tuning:
-            self.is_auto_tuning = False
-            if self.is_running_test: self._stop_current_run("Auto-tuning afbrudt")
-            self.start_autotune_button.config(text="Start Automatisk Tuning")
-            self.autotune_status_label.config(text="Status: Afbrudt af bruger")
-            print("--- AUTOMATISK TUNING AFBRUDT ---")
+            self.engine.stop("Auto-tuning afbrudt")
         else:
+            space = [
+                {'name': 'kp', 'type': 'range', 'start': self.kp_start_var.get(), 'end': self.kp_end_var.get(), 'step': self.kp_step_var.get()},
+                {'name': 'kd', 'type': 'range', 'start': self.kd_start_var.get(), 'end': self.kd_end_var.get(), 'step': self.kd_step_var.get()},
+                {'name': 'ki', 'type': 'range', 'start': self.ki_start_var.get(), 'end': self.ki_end_var.get(), 'step': self.ki_step_var.get()}
+            ]
+            for name, (enabled_var, start_var, end_var, step_var) in self.tune_extra_vars.items():
+                if enabled_var.get():
+                    space.append({'name': name, 'type': 'range', 'start': start_var.get(), 'end': end_var.get(), 'step': step_var.get()})
             tune_params = {
-                'kp_start': self.kp_start_var.get(), 'kp_end': self.kp_end_var.get(), 'kp_step': self.kp_step_var.get(),
-                'kd_start': self.kd_start_var.get(), 'kd_end': self.kd_end_var.get(), 'kd_step': self.kd_step_var.get(),
-                'ki_start': self.ki_start_var.get(), 'ki_end': self.ki_end_var.get(), 'ki_step': self.ki_step_var.get()
+                'space': space,
+                'duration_s': self.duration_var.get(),
+                'grid_order': self.grid_order_var.get()
             }
+            if self.strategy_var.get() == NelderMeadStrategy.name:
+                # Lokal søgning starter i sessionernes bedste konfiguration (ellers parameterfelterne)
+                best_config = self.session_manager.get_best_config()
+                try:
+                    start = best_config['pid_params'] if best_config else self._read_param_fields()
+                except tk.TclError:
+                    messagebox.showerror("Fejl", "Ugyldig værdi i et parameterfelt.")
+                    return
+                tune_params['strategy_options'] = {'start': dict(start)}
+            resume = False
+            if Campaign.is_unfinished(AUTOTUNE_CAMPAIGN_FILE):
+                resume = messagebox.askyesnocancel("Auto-Tune", "Der findes en ufærdig auto-tune kampagne.\n"
+                                                   "Vil du genoptage den? (Nej starter en ny kampagne)")
+                if resume is None:
+                    return
+
+            history = self.data_logger.read_autotune_results(AUTOTUNE_RESULTS_FILE)
             try:
-                self.autotuner = AutoTuner(tune_params)
-                if self.autotuner.total_jobs == 0:
+                if resume:
+                    autotuner = AutoTuner.from_campaign(AUTOTUNE_CAMPAIGN_FILE, history=history,
+                                                             retest=self.retest_var.get())
+                else:
+                    autotuner = AutoTuner(tune_params, strategy=self.strategy_var.get(),
+                                               campaign_file=AUTOTUNE_CAMPAIGN_FILE, history=history,
+                                               retest=self.retest_var.get())
+                if autotuner.total_jobs == 0:
                     messagebox.showwarning("Auto-Tune", "Ingen test-jobs at køre. Tjek start/slut/skridt værdier.")
                     return
-            except ValueError:
-                messagebox.showerror("Fejl", "Ugyldige værdier for auto-tuning (f.eks. start > slut eller skridt <= 0).")
+            except ValueError as e:
+                messagebox.showerror("Fejl", f"Ugyldige værdier for auto-tuning: {e}")
                 return
 
-            self.is_auto_tuning = True
+            try:
+                base_params = self._read_param_fields()
+            except tk.TclError:
+                messagebox.showerror("Fejl", "Ugyldig værdi i et parameterfelt.")
+                return
             self.start_autotune_button.config(text="Stop Automatisk Tuning")
-            print("--- STARTER AUTOMATISK TUNING ---")
-            self._autotune_tick()
-
-    def _autotune_tick(self):
-        """Hoved 'state machine' for auto-tuneren med robust verifikation."""
-        if not self.is_auto_tuning or self.is_running_test:
-            return
-
-        next_pid_params = self.autotuner.get_next_job()
-
-        if next_pid_params is None:
-            self.toggle_auto_tuning()
+            self.engine.start(autotuner, base_params)
+
+    def _on_engine_event(self, event, data):
+        """Opdaterer GUI'en ud fra AutoTuneEngine's hændelser."""
+        if event == 'job':
+            self.autotune_status_label.config(text=f"Status: {data['status']}")
+            # Parameterfelterne viser det job der testes
+            param_vars = {'kp': self.kp_var, 'ki': self.ki_var, 'kd': self.kd_var,
+                          'init_balance': self.init_balance_var, 'power_gain': self.power_gain_var}
+            for name, value in data['job'].items():
+                if name in param_vars:
+                    param_vars[name].set(value)
+        elif event == 'run_started':
+            self.ax.set_title(f"Auto-Tune: Tester {AutoTuner.format_job(data['job'])}", color='darkred')
+            self._reset_run_view()
+            self.is_running_test = True
+            self._start_test_mode()
+            self._update_countdown_timer(data['duration_s'])
+        elif event == 'sample':
+            self._add_run_sample(data['data'])
+        elif event == 'run_stopped':
+            self._end_run_view()
+            self.status_widgets.update_run_status(f"Test stoppet: {data['reason']}. Venter på score...")
+        elif event == 'result' and data['elapsed_s'] is not None:
+            if self.test_mode in ("disturbance", "push"):
+                self._analyze_disturbances()
+            elif self.test_mode in ("chirp", "prbs"):
+                self._analyze_frequency_response()
+        elif event == 'status':
+            self.status_widgets.update_run_status(data['message'])
+        elif event == 'stopped':
+            self.start_autotune_button.config(text="Start Automatisk Tuning")
+            self.autotune_status_label.config(text="Status: Afbrudt af bruger")
+        elif event == 'finished':
+            self.start_autotune_button.config(text="Start Automatisk Tuning")
             self.autotune_status_label.config(text="Status: Færdig!")
-            print("--- AUTOMATISK TUNING FÆRDIG ---")
-            messagebox.showinfo("Auto-Tune Færdig", f"Gennemført {self.autotuner.total_jobs} tests.")
-            return
-        
-        progress = self.autotuner.get_progress()
-        status_msg = f"Tester {progress}: KP={next_pid_params['kp']:.2f}, KD={next_pid_params['kd']:.2f}, KI={next_pid_params['ki']:.2f}"
-        self.autotune_status_label.config(text=f"Status: {status_msg}")
-        print(status_msg)
-
-        self.kp_var.set(next_pid_params['kp'])
-        self.ki_var.set(next_pid_params['ki'])
-        self.kd_var.set(next_pid_params['kd'])
-        
-        # Her er den eksisterende logik perfekt: den anvender parametre, venter på verifikation,
-        # og starter så testen. Resultatet bliver fanget af den nye _handle_score_result,
-        # som så kalder _autotune_tick igen.
-        def on_params_verified(success, message):
-            """Denne funktion kaldes, NÅR verifikationen er færdig."""
-            if not self.is_auto_tuning: return
-
-            if not success:
-                print(f"FEJL: Kunne ikke verificere parametre for {next_pid_params}. Skipper test. Fejl: {message}")
-                self.log_autotune_result(next_pid_params, -1000) # Log en fejl-score
-                self.root.after(500, self._autotune_tick) # Prøv næste job efter en kort pause
-                return
-            
-            # Hvis vi når hertil, er parametrene verificeret!
-            print("SUCCESS: Parametre verificeret. Starter test...")
-            self._start_automated_test_run()
-
-        # Start kæden: Bed om at anvende parametre og giv 'on_params_verified' som "opskrift" på, hvad der skal ske bagefter.
-        self._apply_pid_parameters_with_callback(on_params_verified)
-
-    def _start_automated_test_run(self):
-        """Hjælpefunktion til at starte en automatiseret test."""
-        if not self.is_auto_tuning: return 
-
-        duration_s = self.duration_var.get()
-        title_text = (f"Auto-Tune: Tester "
-                      f"KP={self.kp_var.get():.2f}, "
-                      f"KD={self.kd_var.get():.2f}, "
-                      f"KI={self.ki_var.get():.2f}")
-        self.ax.set_title(title_text, color='darkred')
-        self.canvas.draw_idle()
-        self._update_countdown_timer(duration_s)
+            best = data['best_job']
+            best_text = f"\nBedste: {AutoTuner.format_job(best)} (Score {data['best_score']:.2f})" if best else ""
+            messagebox.showinfo("Auto-Tune Færdig", f"Gennemført {data['jobs']} tests.{best_text}\n{data['summary']}")
 
-        self._start_test_run()
-        
-        duration_ms = duration_s * 1000
-        self.autostop_timer_id = self.root.after(duration_ms, lambda: self._stop_current_run("Auto-test færdig"))
-        
     def _update_countdown_timer(self, seconds_left):
         """Opdaterer nedtællings-labelen hvert sekund."""
         if seconds_left > 0 and self.is_running_test:
@@ -299,20 +385,6 @@ class RobotPerformanceApp:
         else:
             self.countdown_timer_id = None
             
-    def log_autotune_result(self, pid_params, score):
-        """Logger resultatet af en enkelt auto-tune kørsel til en CSV fil."""
-        filename = "autotune_results.csv"
-        os.makedirs(os.path.dirname(os.path.abspath(filename)) if os.path.dirname(os.path.abspath(filename)) else '.', exist_ok=True)
-        file_exists = os.path.exists(filename)
-        try:
-            with open(filename, 'a', newline='') as f:
-                if not file_exists or os.path.getsize(filename) == 0: f.write("Timestamp,KP,KI,KD,Score\n")
-                log_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                data_row = (f"{log_time},{pid_params.get('kp',0):.4f},{pid_params.get('ki',0):.4f},{pid_params.get('kd',0):.4f},{score:.2f}\n")
-                f.write(data_row)
-        except IOError as e:
-            print(f"AUTO-TUNE ERROR: Kunne ikke skrive til logfil {filename}: {e}")
-
     # ===================================================================
     #   KERNE LOGIK OG HÅNDTERING (ÆNDRET)
     # ===================================================================
@@ -324,8 +396,10 @@ class RobotPerformanceApp:
         self.root.after_idle(lambda: self.status_widgets.update_serial_status(message))
 
     def _process_incoming_line(self, line):
-        # NYT: Håndter den nye score-resultat-tag
-        if line.startswith("TAG_SCORE_RESULT:"):
+        # Under auto-tuning ejer motoren score, CSV og vælte-signaler
+        if self.engine.handle_line(line):
+            return
+        if line.startswith(TAG_SCORE_RESULT):
             self._handle_score_result(line)
         elif line.startswith(TAG_CSV):
             self._handle_csv_data(line)
@@ -343,28 +417,18 @@ class RobotPerformanceApp:
     
     # NY METODE: Håndterer resultatet fra robotten
     def _handle_score_result(self, line):
-        # Når vi modtager en score, skal watchdog-timeren annulleres.
-        if self.score_watchdog_timer_id:
-            self.root.after_cancel(self.score_watchdog_timer_id)
-            self.score_watchdog_timer_id = None
-
-        """Parse TAG_SCORE_RESULT og håndter data."""
+        """Parse TAG_SCORE_RESULT og håndter data for en manuel kørsel."""
         print(f"PYTHON RECEIVED SCORE: {line}")
         try:
-            # Gør parsing mere robust over for variationer i output
-            content = line.replace("TAG_SCORE_RESULT:", "").strip()
-            
+            data = SerialThread.parse_score_result(line)
+
             # Håndter fejl-case fra robotten
-            if "status=fail" in content or "status=error" in content:
-                print(f"Score-beregning fejlede på robot: {content}")
+            if data is None:
+                print(f"Score-beregning fejlede på robot: {line}")
                 score = -1000 # Tildel en straf-score
                 valid_time = 0
                 metrics = {}
             else:
-                # Brug regex til at finde alle key=value par
-                pairs = re.findall(r'([a-zA-Z_]+)\s*=\s*([0-9.-]+)', content)
-                data = {key: float(value) for key, value in pairs}
-                
                 score = data.get('score', 0)
                 valid_time = data.get('valid_time', 0)
                 
@@ -377,83 +441,149 @@ class RobotPerformanceApp:
                     'degradation_factor': 0
                 }
 
+            if self.test_mode in ("disturbance", "push"):
+                metrics['step_response'] = self._analyze_disturbances()
+            elif self.test_mode in ("chirp", "prbs"):
+                metrics['frequency_response'] = self._analyze_frequency_response()
+
             # Saml resultaterne i det format, session manageren forventer
             # (score, valid_time, total_duration, oscillation_metrics)
             # Vi bruger valid_time som en erstatning for total_duration
             run_results = (score, valid_time, valid_time, metrics)
 
-            # Denne logik er flyttet fra _stop_current_run
-            if self.is_auto_tuning:
-                current_job_params = self.autotuner.jobs[self.autotuner.current_job_index - 1]
-                self.log_autotune_result(current_job_params, score)
-                self.root.after(1000, self._autotune_tick) # Fortsæt til næste auto-tune job
-            else: # Manuel kørsel logik
-                self.status_widgets.update_run_status("Resultat modtaget fra robot.")
-                self.status_widgets.update_run_results(score, valid_time)
-                if valid_time >= MIN_VALID_RUN_DURATION_S:
-                    self.session_manager.add_run_result(run_results)
-                    # Vi kan stadig logge de detaljerede data, vi har modtaget
-                    self.data_logger.write_detailed_run_data(
-                        self.session_manager.get_detailed_log_filename(), 
-                        self.current_run_data
+            self.status_widgets.update_run_status("Resultat modtaget fra robot.")
+            self.status_widgets.update_run_results(score, valid_time)
+            if valid_time >= MIN_VALID_RUN_DURATION_S:
+                self.session_manager.add_run_result(run_results)
+                # Vi kan stadig logge de detaljerede data, vi har modtaget
+                self.data_logger.write_detailed_run_data(
+                    self.session_manager.get_detailed_log_filename(), 
+                    self.current_run_data
+                )
+                self.status_widgets.update_session_info(self.session_manager)
+
+                # Sekventiel stop-regel: flere gentagelser giver ikke mere information
+                decision = self.session_manager.get_repeat_decision()
+                if decision == 'better':
+                    self.status_widgets.show_success("Kandidaten er signifikant bedre - flere kørsler unødvendige.")
+                elif decision == 'worse':
+                    self.status_widgets.show_warning("Kandidaten er signifikant dårligere - skift parametre.")
+                elif decision == 'max_runs':
+                    self.status_widgets.show_warning("Maks. antal gentagelser nået uden klar forskel.")
+                elif decision == 'no_reference':
+                    self.status_widgets.update_run_status(
+                        "Spredningen er kendt - ingen tidligere bedste config at sammenligne med."
                     )
-                    self.status_widgets.update_session_info(self.session_manager)
-                else:
-                     self.status_widgets.update_run_status(
-                         f"Resultat modtaget. For kort ({valid_time:.2f}s) til logning."
-                     )
+            else:
+                 self.status_widgets.update_run_status(
+                     f"Resultat modtaget. For kort ({valid_time:.2f}s) til logning."
+                 )
 
         except Exception as e:
             print(f"FEJL ved parsing af score-resultat: {e}\nLinje var: {line}")
-            if self.is_auto_tuning:
-                # Giv en straf-score og fortsæt
-                current_job_params = self.autotuner.jobs[self.autotuner.current_job_index - 1]
-                self.log_autotune_result(current_job_params, -1000)
-                self.root.after(1000, self._autotune_tick)
 
 
-    def _on_score_timeout(self):
-        """Kaldes af watchdog-timeren, hvis et score-resultat ikke modtages i tide."""
-        self.score_watchdog_timer_id = None
-        if not self.is_auto_tuning:
+    def _send_disturbance_pulse(self):
+        """Sender en kort puls på init_balance og planlægger den næste forstyrrelse."""
+        self.disturbance_timer_id = None
+        if not self.is_running_test or not self.serial_thread.is_connected():
+            return
+        try:
+            base_init = self.init_balance_var.get()
+        except tk.TclError:
             return
 
-        print("WATCHDOG: Timeout - modtog ikke score fra robot. Fortsætter til næste test.")
-        self.status_widgets.update_run_status("Timeout! Starter næste test...")
+        # Forstyrrelsen tidsstemples med robottens tid for den seneste sample
+        event_time = self.current_run_data[-1][1] if self.current_run_data else 0.0
+        self.disturbance_event_times.append(event_time)
+        self.serial_thread.send_command(f"init={base_init + DISTURBANCE_STEP_DEG}")
+        self.root.after(DISTURBANCE_PULSE_MS, lambda: self.serial_thread.send_command(f"init={base_init}"))
+        self.disturbance_timer_id = self.root.after(int(DISTURBANCE_INTERVAL_S * 1000), self._send_disturbance_pulse)
+
+    def _analyze_disturbances(self):
+        """Beregner step-respons metrikker for kørslens forstyrrelser."""
+        if not self.current_run_data:
+            return {'num_events': 0, 'events': []}
+        timestamps = [d[1] for d in self.current_run_data]
+        pitch_rates = [d[3] for d in self.current_run_data]
+        detected = StepResponseAnalyzer.detect_events(timestamps, pitch_rates)
+        if self.test_mode == "disturbance":
+            events = StepResponseAnalyzer.merge_events(self.disturbance_event_times, detected)
+        else:
+            events = detected
+
+        step_metrics = StepResponseAnalyzer.analyze(self.current_run_data, events)
+        if step_metrics['num_events']:
+            print(f"STEP-RESPONS: {step_metrics['num_events']} forstyrrelser, "
+                  f"overshoot {step_metrics['avg_overshoot_pct']:.1f}%, "
+                  f"indsvingning {step_metrics['avg_settling_time_s']:.2f}s, "
+                  f"position {step_metrics['avg_recovery_displacement_m']:.3f}m, "
+                  f"maks. output {step_metrics['peak_scaled_output']:.1f}")
+        else:
+            print("STEP-RESPONS: Ingen forstyrrelser fundet i kørslen.")
+        return step_metrics
 
-        # Log en straf-score for det job, der fejlede
-        if self.autotuner.current_job_index > 0:
-            failed_job_params = self.autotuner.jobs[self.autotuner.current_job_index - 1]
-            self.log_autotune_result(failed_job_params, -1000)
+    def _send_excitation_step(self, step_index):
+        """Sender næste værdi af chirp/PRBS-signalet som offset på init_balance."""
+        self.excitation_timer_id = None
+        if not self.is_running_test or not self.serial_thread.is_connected():
+            return
+        _, values = self.excitation_signal
+        if step_index >= len(values):
+            self._restore_init_balance()
+            return
+        try:
+            base_init = self.init_balance_var.get()
+        except tk.TclError:
+            return
+
+        event_time = self.current_run_data[-1][1] if self.current_run_data else 0.0
+        self.excitation_log.append((event_time, values[step_index]))
+        self.serial_thread.send_command(f"init={base_init + values[step_index]:.3f}")
+        self.excitation_timer_id = self.root.after(EXCITATION_UPDATE_MS, lambda: self._send_excitation_step(step_index + 1))
 
-        # Tving næste test i gang
-        self.root.after(500, self._autotune_tick)
+    def _restore_init_balance(self):
+        """Sætter init_balance tilbage til værdien fra parameterfeltet."""
+        try:
+            if self.serial_thread.is_connected():
+                self.serial_thread.send_command(f"init={self.init_balance_var.get()}")
+        except tk.TclError:
+            pass
+
+    def _analyze_frequency_response(self):
+        """Estimerer frekvensrespons og stabilitetsmarginer for en excitationskørsel."""
+        margins = FrequencyResponseEstimator.analyze_run(self.current_run_id, self.current_run_data, self.excitation_log)
+        if margins is None:
+            print("FREKVENSRESPONS: For lidt data til estimering.")
+            return {}
+        print(f"FREKVENSRESPONS ({margins['run_id']}): "
+              f"Gain margin {margins['gain_margin_db']:.1f} dB @ {margins['phase_crossover_hz']:.2f} Hz, "
+              f"Fasemargin {margins['phase_margin_deg']:.1f} grader @ {margins['gain_crossover_hz']:.2f} Hz")
+        return margins
 
     def _handle_csv_data(self, line):
-        # Denne funktion er nu primært for live-grafen. Logikken er uændret.
+        # Manuelle kørsler - under auto-tuning kommer samples via motorens 'sample' hændelse
         if not self.is_running_test: return
-        try:
-            csv_data_part = line[len(TAG_CSV):].strip()
-            parts = csv_data_part.split(',')
-            if len(parts) != NUM_EXPECTED_CSV_COLUMNS: return
+        data_tuple = SerialThread.parse_csv_line(line)
+        if data_tuple is None: return
+        time_ms_esp, pitch = data_tuple[0], data_tuple[1]
 
-            data_tuple = tuple(map(float, parts))
-            time_ms_esp, pitch = data_tuple[0], data_tuple[1]
+        if not self.first_data_line_in_run_received:
+            self.run_start_time_esp_ms = time_ms_esp
+            self.first_data_line_in_run_received = True
 
-            if not hasattr(self, 'first_data_line_in_run_received') or not self.first_data_line_in_run_received:
-                self.run_start_time_esp_ms = time_ms_esp
-                self.first_data_line_in_run_received = True
+        current_time_s_relative = (time_ms_esp - self.run_start_time_esp_ms) / 1000.0
+        self._add_run_sample((time_ms_esp, current_time_s_relative) + data_tuple[1:])
 
-            current_time_s_relative = (time_ms_esp - self.run_start_time_esp_ms) / 1000.0
-            full_data_tuple = (time_ms_esp, current_time_s_relative) + data_tuple[1:]
-            self.current_run_data.append(full_data_tuple)
-            
-            self.plot_time_data.append(current_time_s_relative)
-            self.plot_pitch_data.append(pitch)
+        if abs(pitch) > FALLEN_PITCH_THRESHOLD_DEG:
+            self._stop_current_run("Væltet (Pitch Threshold)")
 
-            if abs(pitch) > FALLEN_PITCH_THRESHOLD_DEG:
-                self._stop_current_run("Væltet (Pitch Threshold)")
-        except (ValueError, IndexError): pass
+    def _add_run_sample(self, full_data_tuple):
+        """Gemmer en sample til analyse, live metrikker og grafen."""
+        self.current_run_data.append(full_data_tuple)
+        self.live_metrics.update(full_data_tuple)
+        self.plot_time_data.append(full_data_tuple[1])
+        self.plot_pitch_data.append(full_data_tuple[2])
 
     def _apply_pid_parameters(self):
         # Uændret - den eksisterende logik er fin
@@ -484,16 +614,19 @@ class RobotPerformanceApp:
         self.apply_pid_params_button.config(state="disabled", text="Sender...")
         self._apply_pid_parameters_with_callback(on_manual_verify_complete)
 
+    def _read_param_fields(self):
+        """Parametrene fra parameterfelterne (kaster tk.TclError ved ugyldige værdier)."""
+        return {
+            "kp": self.kp_var.get(), 
+            "ki": self.ki_var.get(), 
+            "kd": self.kd_var.get(), 
+            "init_balance": self.init_balance_var.get(),
+            "power_gain": self.power_gain_var.get()
+        }
+
     def _apply_pid_parameters_with_callback(self, on_complete):
-        # Opdateret til at inkludere init_balance
         try:
-            new_pid_params = {
-                "kp": self.kp_var.get(), 
-                "ki": self.ki_var.get(), 
-                "kd": self.kd_var.get(), 
-                "init_balance": self.init_balance_var.get(),
-                "power_gain": self.power_gain_var.get()
-            }
+            new_pid_params = self._read_param_fields()
             if self.serial_thread.is_connected():
                 self.serial_thread.send_parameters_with_verification(new_pid_params, on_complete)
             else:
@@ -512,65 +645,81 @@ class RobotPerformanceApp:
 
     # ÆNDRET: Start testkørsel med nye kommandoer
     def _start_test_run(self):
-        """Starter en testkørsel med de nye `score_start` og `csv_on` kommandoer."""
+        """Starter en manuel testkørsel med `score_start` og `csv_on` kommandoerne."""
         if not self.serial_thread.is_connected():
-            if not self.is_auto_tuning: messagebox.showerror("Fejl", "Ingen seriel forbindelse.")
+            messagebox.showerror("Fejl", "Ingen seriel forbindelse.")
             return
 
-        self.current_run_data = []
-        self.plot_time_data.clear()
-        self.plot_pitch_data.clear()
-        self.line.set_data([], [])
-        self.canvas.draw_idle()
-
+        self._reset_run_view()
         self.is_running_test = True
         self.first_data_line_in_run_received = False
-        
-        if not self.is_auto_tuning:
-            self.start_stop_button.config(text="Stop Testkørsel")
-            self.status_widgets.update_run_status("Testkørsel aktiv...")
+        self._start_test_mode()
+        self.start_stop_button.config(text="Stop Testkørsel")
+        self.status_widgets.update_run_status("Testkørsel aktiv...")
         
         # Send de nye kommandoer
         self.serial_thread.send_command("score_start") # Start scoring på ESP32
         self.serial_thread.send_command("csv_on")      # Start CSV-stream til live-graf
 
+    def _reset_run_view(self):
+        """Nulstiller kørselsdata, live metrikker og grafen før en ny kørsel."""
+        self.current_run_data = []
+        self.live_metrics.reset()
+        self.plot_time_data.clear()
+        self.plot_pitch_data.clear()
+        self.line.set_data([], [])
+        self.canvas.draw_idle()
+
+    def _start_test_mode(self):
+        """Starter forstyrrelser/excitation for den valgte testtype (også under auto-tuning)."""
+        self.disturbance_event_times = []
+        self.test_mode = TEST_MODES.get(self.test_mode_var.get(), "free")
+        self.current_run_id = f"S{self.session_manager.session_id:03d}_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+        if self.test_mode == "disturbance":
+            self.disturbance_timer_id = self.root.after(int(DISTURBANCE_FIRST_EVENT_S * 1000), self._send_disturbance_pulse)
+        elif self.test_mode in ("chirp", "prbs"):
+            self.excitation_log = []
+            update_s = EXCITATION_UPDATE_MS / 1000.0
+            if self.test_mode == "chirp":
+                self.excitation_signal = FrequencyResponseEstimator.chirp_signal(EXCITATION_DURATION_S, update_s)
+            else:
+                self.excitation_signal = FrequencyResponseEstimator.prbs_signal(EXCITATION_DURATION_S, update_s)
+            self.excitation_timer_id = self.root.after(EXCITATION_UPDATE_MS, lambda: self._send_excitation_step(0))
+
     # ÆNDRET: Stop testkørsel med nye kommandoer og fjern lokal scoreberegning
     def _stop_current_run(self, reason="Ukendt"):
-        """Stopper den nuværende testkørsel og beder robotten om resultatet."""
-        if self.autostop_timer_id:
-            self.root.after_cancel(self.autostop_timer_id)
-            self.autostop_timer_id = None
-        if self.countdown_timer_id:
-            self.root.after_cancel(self.countdown_timer_id)
-            self.countdown_timer_id = None
-
+        """Stopper den nuværende manuelle testkørsel og beder robotten om resultatet."""
         if not self.is_running_test: return
-        self.is_running_test = False
-        
-        self.ax.set_title("Pitch (grader)", color='black')
-        self.canvas.draw_idle()
+        self._end_run_view()
         
         if self.serial_thread.is_connected():  
             self.serial_thread.send_command("score_stop") # Bed ESP32 om at stoppe og sende score
             self.serial_thread.send_command("csv_off")    # Stop CSV-stream
 
-        # FJERNET: Lokal scoreberegning er ikke længere nødvendig.
-        # Al resultat-logik er flyttet til `_handle_score_result`,
+        # Al resultat-logik ligger i `_handle_score_result`,
         # som bliver kaldt, når robotten sender sit svar.
+        self.start_stop_button.config(text="Start Testkørsel")
+        self.status_widgets.update_run_status(f"Test stoppet: {reason}. Venter på score fra robot...")
 
-        # Opdater GUI til at vise, at vi venter på svar.
-        if not self.is_auto_tuning:
-            self.start_stop_button.config(text="Start Testkørsel")
-            self.status_widgets.update_run_status(f"Test stoppet: {reason}. Venter på score fra robot...")
-        else:
-            # For auto-tuning, start en watchdog. Hvis vi ikke får svar inden for 3 sekunder,
-            # tvinger vi processen videre.
-            self.status_widgets.update_run_status(f"Test stoppet: {reason}. Venter på score...")
-            self.score_watchdog_timer_id = self.root.after(3000, self._on_score_timeout)
+    def _end_run_view(self):
+        """Stopper GUI'ens timere for kørslen og nulstiller titlen."""
+        if self.countdown_timer_id:
+            self.root.after_cancel(self.countdown_timer_id)
+            self.countdown_timer_id = None
+        if self.disturbance_timer_id:
+            self.root.after_cancel(self.disturbance_timer_id)
+            self.disturbance_timer_id = None
+        if self.excitation_timer_id:
+            self.root.after_cancel(self.excitation_timer_id)
+            self.excitation_timer_id = None
+            self._restore_init_balance()
+        self.is_running_test = False
+        self.ax.set_title("Pitch (grader)", color='black')
+        self.canvas.draw_idle()
 
     def on_closing(self):
         if messagebox.askokcancel("Luk", "Vil du afslutte programmet?"):
-            self.is_auto_tuning = False
+            self.engine.stop("Program lukket")
             if self.is_running_test: self._stop_current_run("Program lukket")
             
             try:
@@ -596,6 +745,8 @@ class RobotPerformanceApp:
                 min_time = self.plot_time_data[0] if len(self.plot_time_data) >= max_plot_points else 0
                 self.ax.set_xlim(min_time, max(max_time + 1, PLOT_HISTORY_SECONDS))
             self.canvas.draw_idle()
+        if self.is_running_test:
+            self.status_widgets.update_live_metrics(self.live_metrics.snapshot())
         self.root.after(100, self._periodic_gui_update)
         
     def _log_session_results(self, session_data, session_id, pid_params):
@@ -5,6 +5,7 @@ Status og information widgets for GUI
 
 import tkinter as tk
 from tkinter import ttk
+from config.settings import SESSION_CI_CONFIDENCE
 
 
 class StatusWidgets:
@@ -59,35 +60,60 @@ class StatusWidgets:
         )
         self.session_avg_score_label.grid(row=4, column=0, sticky="w", padx=5, pady=2)
         
+        self.session_ci_label = ttk.Label(
+            self.status_frame, 
+            text=f"Session {SESSION_CI_CONFIDENCE:.0%} CI: -"
+        )
+        self.session_ci_label.grid(row=5, column=0, sticky="w", padx=5, pady=2)
+        
         self.session_runs_count_label = ttk.Label(
             self.status_frame, 
             text="Kørsler i session: 0"
         )
-        self.session_runs_count_label.grid(row=5, column=0, sticky="w", padx=5, pady=2)
+        self.session_runs_count_label.grid(row=6, column=0, sticky="w", padx=5, pady=2)
         
         self.session_info_label = ttk.Label(
             self.status_frame, 
             text="Session #1"
         )
-        self.session_info_label.grid(row=6, column=0, sticky="w", padx=5, pady=2)
+        self.session_info_label.grid(row=7, column=0, sticky="w", padx=5, pady=2)
         
         self.session_pid_label = ttk.Label(
             self.status_frame, 
             text="Session PID: KP=3.30, KI=0.00, KD=0.20"
         )
-        self.session_pid_label.grid(row=7, column=0, sticky="w", padx=5, pady=2)
+        self.session_pid_label.grid(row=8, column=0, sticky="w", padx=5, pady=2)
         
         self.best_config_label = ttk.Label(
             self.status_frame, 
             text="Bedste Config: Ingen data"
         )
-        self.best_config_label.grid(row=8, column=0, sticky="w", padx=5, pady=2)
+        self.best_config_label.grid(row=9, column=0, sticky="w", padx=5, pady=2)
         
         self.best_config_details_label = ttk.Label(
             self.status_frame, 
             text=""
         )
-        self.best_config_details_label.grid(row=9, column=0, sticky="w", padx=5, pady=2)
+        self.best_config_details_label.grid(row=10, column=0, sticky="w", padx=5, pady=2)
+        
+        self._setup_live_metrics_panel()
+
+    def _setup_live_metrics_panel(self):
+        """Setup panel med live metrikker, der opdateres under kørslen"""
+        self.live_metrics_frame = ttk.LabelFrame(self.status_frame, text="Live Metrikker")
+        self.live_metrics_frame.grid(row=11, column=0, sticky="ew", padx=5, pady=(5, 2))
+        
+        self.live_rms_label = ttk.Label(self.live_metrics_frame, text="Pitch RMS: -")
+        self.live_rms_label.grid(row=0, column=0, sticky="w", padx=5, pady=1)
+        
+        self.live_frequency_label = ttk.Label(self.live_metrics_frame, text="Oscillation: -")
+        self.live_frequency_label.grid(row=1, column=0, sticky="w", padx=5, pady=1)
+        
+        self.live_iterm_label = ttk.Label(self.live_metrics_frame, text="ITerm Windup: -")
+        self.live_iterm_label.grid(row=2, column=0, sticky="w", padx=5, pady=1)
+        
+        self.live_saturation_label = ttk.Label(self.live_metrics_frame, text="Aktuator Mætning: -")
+        self.live_saturation_label.grid(row=3, column=0, sticky="w", padx=5, pady=1)
 
     # ... resten af metoderne i StatusWidgets er uændrede ...
     def _initialize_status(self):
@@ -115,7 +141,20 @@ class StatusWidgets:
             self.session_avg_score_label.config(text=f"Session Gns. Score: {session_stats['avg_score']:.2f}")
         else:
             self.session_avg_score_label.config(text="Session Gns. Score: -")
+        self._update_session_ci_display(session_stats)
         self._update_best_config_display(session_manager)
+    def update_live_metrics(self, snapshot):
+        self.live_rms_label.config(text=f"Pitch RMS: {snapshot['rms_deg']:.2f}°")
+        if snapshot['dominant_freq_hz'] is not None:
+            self.live_frequency_label.config(
+                text=f"Oscillation: {snapshot['dominant_freq_hz']:.2f} Hz ({snapshot['dominant_amplitude_deg']:.2f}°)"
+            )
+        else:
+            self.live_frequency_label.config(text="Oscillation: - (fylder vindue)")
+        self.live_iterm_label.config(
+            text=f"ITerm Windup: {snapshot['iterm_level']:.0%} (maks. {snapshot['peak_iterm_level']:.0%})"
+        )
+        self.live_saturation_label.config(text=f"Aktuator Mætning: {snapshot['saturation_ratio']:.0%}")
     def get_status_summary(self):
         return { 'serial_status': self.serial_status_label.cget("text"), 'run_status': self.run_status_label.cget("text"), 'current_score': self.current_run_score_label.cget("text"), 'session_info': self.session_info_label.cget("text"), 'best_config': self.best_config_label.cget("text") }
     def reset_run_results(self):
@@ -135,6 +174,20 @@ class StatusWidgets:
         self.run_status_label.config(foreground="green")
         self.update_run_status(f"SUCCESS: {message}")
         self.run_status_label.after(3000, lambda: self.run_status_label.config(foreground=original_color))
+    def _update_session_ci_display(self, session_stats):
+        ci_low, ci_high = session_stats.get('ci_low'), session_stats.get('ci_high')
+        if ci_low is None or ci_high is None or ci_low == float('-inf'):
+            self.session_ci_label.config(text=f"Session {SESSION_CI_CONFIDENCE:.0%} CI: - (mindst 2 kørsler)")
+            return
+        decision_texts = {
+            'continue': "kør flere gentagelser",
+            'better': "STOP - bedre end bedste config",
+            'worse': "STOP - dårligere end bedste config",
+            'max_runs': "STOP - maks. antal kørsler nået",
+            'no_reference': "STOP - spredning kendt (ingen reference)"
+        }
+        decision = decision_texts.get(session_stats.get('decision'), "")
+        self.session_ci_label.config(text=f"Session {SESSION_CI_CONFIDENCE:.0%} CI: [{ci_low:.1f}, {ci_high:.1f}] -> {decision}")
     def _update_best_config_display(self, session_manager):
         best_config = session_manager.get_best_config()
         if best_config is None:
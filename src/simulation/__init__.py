@@ -0,0 +1,7 @@
+# simulation/__init__.py
+"""
+Simulation module for offline evaluation of PID parameters
+"""
+
+from simulation.balance_sim import BatchBalanceSimulator
+from simulation.wheeled_plant import WheeledPendulumSimulator
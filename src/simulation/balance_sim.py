@@ -0,0 +1,202 @@
+# simulation/balance_sim.py
+"""
+Vektoriseret simulering af den balancerende robot for mange PID-konfigurationer
+
+Udbygning af robotsim.py: i stedet for ét pendul med moment-styring simuleres
+et inverteret pendul på hjul, hvor regulator-outputtet giver hjulenes
+acceleration. Alle tilstande er arrays med én værdi pr. konfiguration, så en
+hel batch af gains skridtes frem samtidig med NumPy.
+"""
+
+import numpy as np
+from config.settings import (
+    SIM_DT,
+    SIM_LOOP_TIME_S,
+    SIM_DURATION_S,
+    SIM_PENDULUM_LENGTH_M,
+    SIM_ACCEL_PER_OUTPUT,
+    SIM_MOTOR_TIME_CONSTANT_S,
+    SIM_INITIAL_PITCH_DEG,
+    SIM_BALANCE_OFFSET_DEG,
+    SIM_SENSOR_NOISE_DEG,
+    SIM_SEED,
+    ACTUATOR_OUTPUT_LIMIT,
+    ITERM_WINDUP_LIMIT,
+    MAX_OSCILLATION_CUTOFF_DEG,
+    OSCILLATION_WINDOW_SIZE_S
+)
+from analysis.score_calculator import ScoreCalculator
+
+G = 9.81
+
+
+class BatchBalanceSimulator:
+    """
+    Inverteret pendul på hjul med PID på pitch (grader), vektoriseret over konfigurationer
+
+    Dynamik:  theta'' = (g*sin(theta) - a*cos(theta)) / l,   x'' = a
+    hvor hjul-accelerationen a følger regulator-outputtet gennem en første-ordens
+    motorforsinkelse. Regulatoren kører med perioden loop_time_s og dens output
+    bruges først i den næste periode (beregnings- og kommunikationsforsinkelse).
+    """
+
+    def __init__(self, dt=SIM_DT, loop_time_s=SIM_LOOP_TIME_S, duration_s=SIM_DURATION_S,
+                 pendulum_length_m=SIM_PENDULUM_LENGTH_M, accel_per_output=SIM_ACCEL_PER_OUTPUT,
+                 motor_time_constant_s=SIM_MOTOR_TIME_CONSTANT_S, initial_pitch_deg=SIM_INITIAL_PITCH_DEG,
+                 balance_offset_deg=SIM_BALANCE_OFFSET_DEG, sensor_noise_deg=SIM_SENSOR_NOISE_DEG, seed=SIM_SEED):
+        self.dt = dt
+        self.substeps = max(1, int(round(loop_time_s / dt)))
+        self.loop_time_s = self.substeps * dt
+        self.num_loops = int(round(duration_s / self.loop_time_s))
+        self.pendulum_length_m = pendulum_length_m
+        self.accel_per_output = accel_per_output
+        self.motor_time_constant_s = motor_time_constant_s
+        self.initial_pitch_deg = initial_pitch_deg
+        self.balance_offset_deg = balance_offset_deg
+        self.sensor_noise_deg = sensor_noise_deg
+        self.seed = seed
+
+    def simulate(self, kp, ki, kd, init_balance=0.0, power_gain=0.0):
+        """
+        Simulér alle konfigurationer. Argumenterne er skalarer eller arrays af samme længde.
+
+        power_gain modelleres som en skalering af outputtet (1 + power_gain); den
+        præcise betydning i firmwaren er ikke dokumenteret her.
+
+        Returns:
+            dict: 'time_s' (loops,), 'pitch_deg' og 'position_m' (loops, configs)
+        """
+        kp, ki, kd, init_balance, power_gain = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (kp, ki, kd, init_balance, power_gain))
+        )
+        n = kp.size
+        rng = np.random.default_rng(self.seed)
+
+        theta = np.full(n, np.radians(self.initial_pitch_deg))
+        omega = np.zeros(n)
+        position = np.zeros(n)
+        velocity = np.zeros(n)
+        accel = np.zeros(n)
+        integral = np.zeros(n)
+        pending_output = np.zeros(n)
+        offset = np.radians(self.balance_offset_deg)
+        motor_blend = min(1.0, self.dt / max(self.motor_time_constant_s, 1e-9))
+        # I-leddets begrænsning svarer til firmwarens ITerm-clamp (i output-enheder)
+        integral_limit = np.where(ki > 0, ITERM_WINDUP_LIMIT / np.maximum(ki, 1e-12), np.inf)
+
+        pitch_log = np.empty((self.num_loops, n), dtype=np.float32)
+        position_log = np.empty((self.num_loops, n), dtype=np.float32)
+
+        for loop in range(self.num_loops):
+            # Regulator (sample-and-hold): målt pitch og rate i grader
+            noise = rng.normal(0.0, self.sensor_noise_deg, n) if self.sensor_noise_deg > 0 else 0.0
+            pitch_deg = np.degrees(theta) + noise
+            rate_dps = np.degrees(omega)
+            error = pitch_deg - init_balance
+            integral = np.clip(integral + error * self.loop_time_s, -integral_limit, integral_limit)
+            output = kp * error + ki * integral + kd * rate_dps
+            output = np.clip(output * (1.0 + power_gain), -ACTUATOR_OUTPUT_LIMIT, ACTUATOR_OUTPUT_LIMIT)
+
+            # Outputtet fra forrige periode virker nu (én periodes forsinkelse)
+            command, pending_output = pending_output, output
+            target_accel = self.accel_per_output * command
+
+            for _ in range(self.substeps):
+                accel += (target_accel - accel) * motor_blend
+                alpha = (G * np.sin(theta - offset) - accel * np.cos(theta)) / self.pendulum_length_m
+                omega += alpha * self.dt
+                theta += omega * self.dt
+                velocity += accel * self.dt
+                position += velocity * self.dt
+
+            # Væltede konfigurationer fastholdes, så de ikke løber løbsk numerisk
+            fallen = np.abs(theta) > np.pi / 2
+            theta[fallen] = np.sign(theta[fallen]) * np.pi / 2
+            omega[fallen] = 0.0
+
+            pitch_log[loop] = np.degrees(theta)
+            position_log[loop] = position
+
+        time_s = np.arange(1, self.num_loops + 1) * self.loop_time_s
+        return {'time_s': time_s, 'pitch_deg': pitch_log, 'position_m': position_log}
+
+    def metrics(self, result):
+        """
+        Beregn ScoreCalculator's metrikker for hver konfiguration (vektoriseret)
+
+        Følger calculate_run_metrics/_analyze_oscillations: den valide periode
+        slutter ved første sample over MAX_OSCILLATION_CUTOFF_DEG, frekvensen
+        findes ud fra toppe i |pitch| over 0.5 grader (som signal.find_peaks),
+        og degraderingen sammenligner RMS i første og sidste vindue. Eneste
+        afvigelse er flade toppe (plateauer), som tælles ved deres første sample.
+        """
+        time_s = result['time_s']
+        pitch = result['pitch_deg']
+        position = result['position_m']
+        steps, n = pitch.shape
+        columns = np.arange(n)
+        # Samme sample-periode som ScoreCalculator (middel af tidsstemplernes differenser)
+        sample_dt = float(np.mean(np.diff(time_s))) if steps > 1 else self.loop_time_s
+
+        over = np.abs(pitch) > MAX_OSCILLATION_CUTOFF_DEG
+        valid_end = np.where(over.any(axis=0), np.argmax(over, axis=0), steps)
+        valid_time = np.where(valid_end > 0, time_s[np.maximum(valid_end - 1, 0)], 0.0)
+        mask = np.arange(steps)[:, None] < valid_end[None, :]
+        counts = np.maximum(valid_end, 1)
+        # _analyze_oscillations kræver mindst 10 samples
+        analyzed = valid_end >= 10
+
+        squared = np.cumsum(np.where(mask, np.square(pitch, dtype=float), 0.0), axis=0)
+        squared = np.concatenate([np.zeros((1, n)), squared])
+        amplitude_rms = np.where(analyzed, np.sqrt(squared[valid_end, columns] / counts), np.inf)
+        position_squares = np.sum(np.where(mask, np.square(position, dtype=float), 0.0), axis=0)
+        position_rmse = np.where(analyzed, np.sqrt(position_squares / counts), np.inf)
+
+        # Toppe i |pitch| inden for den valide periode (endepunkterne kan ikke være toppe)
+        magnitude = np.abs(pitch)
+        middle = magnitude[1:-1]
+        peaks = (middle > magnitude[:-2]) & (middle >= magnitude[2:]) & (middle >= 0.5)
+        peaks &= np.arange(1, steps - 1)[:, None] < (valid_end - 1)[None, :]
+        peak_count = peaks.sum(axis=0)
+        first_peak = np.argmax(peaks, axis=0)
+        last_peak = peaks.shape[0] - 1 - np.argmax(peaks[::-1], axis=0)
+        peak_span = np.maximum(last_peak - first_peak, 1) * sample_dt
+        avg_frequency = np.where(analyzed & (peak_count > 1), (peak_count - 1) / peak_span, 0.0)
+
+        # Degradering: RMS i sidste vs. første vindue af den valide periode
+        window = int(OSCILLATION_WINDOW_SIZE_S / sample_dt)
+        min_samples = int(2 * OSCILLATION_WINDOW_SIZE_S / 0.015)
+        window_end = np.minimum(window, valid_end)
+        start_rms = np.sqrt(squared[window_end, columns] / np.maximum(window_end, 1))
+        last_start = np.maximum(valid_end - window, 0)
+        end_rms = np.sqrt((squared[valid_end, columns] - squared[last_start, columns])
+                          / np.maximum(valid_end - last_start, 1))
+        degradation = np.maximum((end_rms - start_rms) / np.maximum(start_rms, 0.1), 0.0)
+        degradation = np.where(analyzed & (valid_end >= min_samples) & (window >= 10), degradation, 0.0)
+
+        score = ScoreCalculator.calculate_batch_scores(valid_time, amplitude_rms, avg_frequency, degradation,
+                                                       position_rmse, valid_samples=valid_end)
+        return {
+            'score': score,
+            'valid_time': valid_time,
+            'amplitude_rms': amplitude_rms,
+            'avg_frequency': avg_frequency,
+            'degradation_factor': degradation,
+            'position_rmse_m': position_rmse,
+            'stable': valid_end == steps
+        }
+
+    @staticmethod
+    def run_data(result, index):
+        """
+        Én konfigurations trajektorie i samme format som TAG_CSV-kørsler
+        (tid_ms, tid_s, pitch, ..., position), så den kan gives direkte til
+        ScoreCalculator.calculate_run_score/calculate_run_metrics.
+        """
+        return [(time_s * 1000.0, time_s, float(pitch), float(position))
+                for time_s, pitch, position in zip(result['time_s'], result['pitch_deg'][:, index],
+                                                   result['position_m'][:, index])]
+
+    def evaluate(self, kp, ki, kd, init_balance=0.0, power_gain=0.0):
+        """Simulér og returnér kun metrikkerne (trajektorierne kasseres)"""
+        return self.metrics(self.simulate(kp, ki, kd, init_balance, power_gain))
@@ -0,0 +1,150 @@
+# simulation/discretization.py
+"""
+Diskretiseringsstudie: hvor meget kan hurtigere loops og lettere filtrering give?
+
+Firmwaren kører med LOOP_TIME_MS 50 og ALPHA 0.1. For hver kombination af
+regulator-periode, filter-alpha og IMU-forsinkelse findes den bedste score
+WheeledPendulumSimulator kan opnå, når gains søges for netop den kombination.
+
+Én simulator pr. regulator-periode (perioden bestemmer antallet af
+integrations-skridt); filter-alpha, forsinkelse og gains lægges i ét fladt
+array (kombination x gain-sample), som simuleres vektoriseret i batches af
+SIM_BATCH_SIZE. Gain-samples er fælles for alle kombinationer, så de
+sammenlignes på lige vilkår.
+
+Den bedste af mange støjfyldte kørsler er optimistisk. De DISC_CONFIRM_TOP
+bedste gains pr. kombination genkøres derfor med DISC_CONFIRM_SEEDS nye
+støj-seeds, og den rapporterede score er det bedste gennemsnit.
+"""
+
+import numpy as np
+from config.settings import (
+    DISC_LOOP_TIMES_S,
+    DISC_FILTER_ALPHAS,
+    DISC_SENSOR_DELAYS_S,
+    DISC_GAIN_SAMPLES,
+    DISC_KP_RANGE,
+    DISC_KI_RANGE,
+    DISC_KD_RANGE,
+    DISC_CONFIRM_TOP,
+    DISC_CONFIRM_SEEDS,
+    PLANT_DT,
+    SIM_BATCH_SIZE,
+    SIM_SEED
+)
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+GAIN_NAMES = ("kp", "ki", "kd")
+
+
+class DiscretizationStudy:
+    """Bedste opnåelige score pr. (regulator-periode, filter-alpha, IMU-forsinkelse)"""
+
+    def __init__(self, loop_times_s=DISC_LOOP_TIMES_S, filter_alphas=DISC_FILTER_ALPHAS,
+                 sensor_delays_s=DISC_SENSOR_DELAYS_S, gain_samples=DISC_GAIN_SAMPLES, kp_range=DISC_KP_RANGE,
+                 ki_range=DISC_KI_RANGE, kd_range=DISC_KD_RANGE, confirm_top=DISC_CONFIRM_TOP,
+                 confirm_seeds=DISC_CONFIRM_SEEDS, simulator_options=None, batch_size=SIM_BATCH_SIZE, seed=SIM_SEED):
+        if not (loop_times_s and filter_alphas and sensor_delays_s) or gain_samples < 1:
+            raise ValueError("Studiet kræver mindst én periode, alpha, forsinkelse og gain-sample")
+        if min(loop_times_s) <= 0 or not all(0 < alpha <= 1 for alpha in filter_alphas) or min(sensor_delays_s) < 0:
+            raise ValueError("Perioder skal være positive, alpha i (0, 1] og forsinkelser ikke-negative")
+        self.loop_times_s = tuple(loop_times_s)
+        self.filter_alphas = tuple(filter_alphas)
+        self.sensor_delays_s = tuple(sensor_delays_s)
+        self.gain_samples = gain_samples
+        self.ranges = {'kp': kp_range, 'ki': ki_range, 'kd': kd_range}
+        self.confirm_top = max(1, min(confirm_top, gain_samples))
+        self.confirm_seeds = max(1, confirm_seeds)
+        # Periode, filter og forsinkelse er det der undersøges - resten af modellen kan være identificeret
+        self.simulator_options = {name: value for name, value in dict(simulator_options or {}).items()
+                                  if name not in ('loop_time_s', 'filter_alpha', 'sensor_delay_s', 'seed')}
+        self.batch_size = batch_size
+        self.seed = seed
+
+    @property
+    def num_combinations(self):
+        return len(self.loop_times_s) * len(self.filter_alphas) * len(self.sensor_delays_s)
+
+    def sample_gains(self):
+        """Tilfældige gains (ét array pr. navn) og støj-seeds til bekræftelsen"""
+        rng = np.random.default_rng(self.seed)
+        gains = {name: rng.uniform(*self.ranges[name], self.gain_samples) for name in GAIN_NAMES}
+        confirm_seeds = [int(seed) for seed in rng.integers(0, 2 ** 31, self.confirm_seeds)]
+        return gains, confirm_seeds
+
+    def _simulator(self, loop_time_s, plant, seed):
+        # Integrations-skridtet må ikke være længere end regulator-perioden
+        dt = min(self.simulator_options.get('dt', PLANT_DT), loop_time_s)
+        return WheeledPendulumSimulator(**dict(self.simulator_options, dt=dt, loop_time_s=loop_time_s,
+                                               seed=seed, **plant))
+
+    def _evaluate(self, loop_time_s, gains, plant, seed):
+        """Score og stabil-flag for flade arrays af gains og model-parametre, i batches"""
+        total = gains['kp'].size
+        scores, stable = [], []
+        for number, start in enumerate(range(0, total, self.batch_size)):
+            chunk = slice(start, start + self.batch_size)
+            simulator = self._simulator(loop_time_s, {name: values[chunk] for name, values in plant.items()},
+                                        seed + number)
+            metrics = simulator.evaluate(*(gains[name][chunk] for name in GAIN_NAMES))
+            scores.append(metrics['score'])
+            stable.append(metrics['stable'])
+        return np.concatenate(scores), np.concatenate(stable)
+
+    def run_loop_time(self, loop_time_s, gains, confirm_seeds):
+        """
+        Alle filter- og forsinkelses-kombinationer for én regulator-periode.
+
+        Returns:
+            list: dicts med loop_time_s, filter_alpha, sensor_delay_s, score (bekræftet middel),
+                  screen_score (bedste i søgningen), kp, ki, kd og stable_fraction (andel
+                  af gain-samples der står hele kørslen)
+        """
+        alphas, delays = (np.array(values, dtype=float).ravel() for values in
+                          np.meshgrid(self.filter_alphas, self.sensor_delays_s, indexing='ij'))
+        combinations, samples = alphas.size, self.gain_samples
+        # Fladt array: index = kombination * samples + gain-sample
+        plant = {'filter_alpha': np.repeat(alphas, samples), 'sensor_delay_s': np.repeat(delays, samples)}
+        flat_gains = {name: np.tile(values, combinations) for name, values in gains.items()}
+        scores, stable = self._evaluate(loop_time_s, flat_gains, plant, self.seed)
+        scores = scores.reshape(combinations, samples)
+        stable = stable.reshape(combinations, samples)
+
+        # Genkør de bedste gains pr. kombination med ny støj
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :self.confirm_top]
+        top_gains = {name: values[top].ravel() for name, values in gains.items()}
+        top_plant = {name: np.repeat(values, self.confirm_top) for name, values in
+                     (('filter_alpha', alphas), ('sensor_delay_s', delays))}
+        confirmed = np.mean([self._evaluate(loop_time_s, top_gains, top_plant, seed)[0]
+                             for seed in confirm_seeds], axis=0).reshape(combinations, self.confirm_top)
+        best = np.argmax(confirmed, axis=1)
+
+        actual_loop_time = self._simulator(loop_time_s, {}, self.seed).loop_time_s
+        rows = []
+        for c in range(combinations):
+            index = top[c, best[c]]
+            row = {'loop_time_s': actual_loop_time, 'filter_alpha': float(alphas[c]),
+                   'sensor_delay_s': float(delays[c]), 'score': float(confirmed[c, best[c]]),
+                   'screen_score': float(scores[c].max()), 'stable_fraction': float(stable[c].mean())}
+            row.update({name: float(gains[name][index]) for name in GAIN_NAMES})
+            rows.append(row)
+        return rows
+
+    def run(self, progress=None):
+        """
+        Hele studiet.
+
+        Args:
+            progress: valgfri callback(loop_time_s, rows) efter hver regulator-periode
+
+        Returns:
+            list: rækkerne fra run_loop_time for alle perioder
+        """
+        gains, confirm_seeds = self.sample_gains()
+        rows = []
+        for loop_time_s in self.loop_times_s:
+            loop_rows = self.run_loop_time(loop_time_s, gains, confirm_seeds)
+            rows.extend(loop_rows)
+            if progress:
+                progress(loop_time_s, loop_rows)
+        return rows
@@ -0,0 +1,85 @@
+# simulation/motor_tables.py
+"""
+Motor-karakteristik fra ESP32-FeedForward-tables
+
+RPM -> PWM opslagstabellerne er målt af kalibreringsprogrammet og kopieret
+fra "Exempel" i ESP32-FeedForward-tables/Readme.txt (index = hjul-RPM,
+0..MAX_RPM). Firmwaren slår den ønskede RPM op og sender PWM-værdien til
+motoren; simuleringen bruger samme tabel og den inverterede måling
+(PWM -> RPM) som motorens stationære hastighed.
+"""
+
+import numpy as np
+
+# Fra Motor.h
+MOTOR_MAX_RPM = 238
+MOTOR_DEADZONE_PWM = 21
+MOTOR_PWM_MAX = 255
+
+RPM_TO_PWM_MOTOR_1 = (
+    0, 12, 16, 13, 18, 15, 16, 18, 19, 20, 21, 22, 23, 24, 25, 26,
+    27, 28, 29, 31, 30, 32, 34, 35, 35, 36, 37, 39, 38, 40, 42, 42,
+    44, 42, 45, 46, 47, 48, 49, 50, 48, 52, 49, 54, 50, 54, 56, 57,
+    53, 58, 59, 60, 61, 62, 58, 61, 63, 65, 66, 67, 63, 64, 69, 65,
+    67, 72, 73, 73, 74, 75, 76, 77, 78, 79, 80, 75, 80, 82, 84, 78,
+    84, 86, 87, 88, 89, 90, 91, 92, 93, 95, 95, 97, 91, 96, 98, 100,
+    101, 102, 104, 105, 106, 107, 108, 109, 110, 111, 112, 114, 115, 116, 117, 119,
+    119, 120, 121, 123, 124, 125, 126, 128, 129, 130, 132, 133, 134, 135, 137, 138,
+    139, 140, 141, 142, 144, 145, 146, 148, 149, 150, 151, 152, 153, 154, 156, 156,
+    157, 159, 160, 161, 162, 165, 165, 166, 167, 168, 169, 171, 171, 172, 174, 175,
+    175, 177, 178, 179, 180, 181, 182, 183, 184, 185, 187, 187, 188, 189, 190, 192,
+    192, 193, 195, 195, 197, 198, 199, 199, 200, 202, 203, 204, 204, 206, 206, 207,
+    209, 210, 211, 211, 212, 214, 214, 216, 217, 218, 219, 219, 220, 222, 223, 223,
+    225, 225, 227, 228, 229, 230, 230, 231, 232, 233, 235, 236, 237, 238, 239, 239,
+    241, 242, 241, 243, 245, 246, 246, 248, 249, 250, 252, 253, 255, 255, 255,
+)
+
+RPM_TO_PWM_MOTOR_2 = (
+    0, 22, 19, 14, 21, 21, 17, 19, 18, 20, 21, 23, 23, 24, 25, 27,
+    28, 29, 30, 31, 31, 32, 34, 35, 36, 37, 38, 40, 37, 41, 43, 43,
+    44, 43, 44, 45, 47, 48, 49, 50, 52, 52, 53, 48, 55, 50, 56, 57,
+    57, 58, 59, 57, 60, 61, 62, 60, 63, 64, 65, 66, 66, 68, 69, 64,
+    69, 72, 67, 72, 73, 75, 76, 73, 74, 76, 78, 80, 81, 82, 78, 79,
+    81, 85, 86, 86, 87, 88, 89, 90, 91, 94, 94, 94, 95, 96, 97, 98,
+    99, 101, 102, 103, 104, 105, 106, 107, 108, 109, 110, 112, 109, 110, 114, 116,
+    117, 118, 119, 120, 121, 122, 123, 125, 124, 126, 127, 129, 130, 131, 133, 132,
+    133, 136, 137, 138, 139, 140, 141, 143, 144, 145, 146, 147, 148, 149, 151, 151,
+    152, 154, 156, 154, 158, 161, 161, 159, 162, 163, 164, 166, 167, 168, 169, 170,
+    171, 172, 173, 175, 174, 176, 178, 179, 180, 181, 182, 182, 183, 186, 186, 187,
+    188, 190, 191, 192, 193, 193, 194, 196, 197, 197, 199, 199, 201, 202, 203, 203,
+    204, 206, 207, 208, 209, 210, 210, 211, 212, 214, 213, 215, 217, 218, 218, 219,
+    221, 221, 223, 223, 224, 226, 225, 227, 229, 230, 230, 231, 232, 233, 234, 235,
+    236, 237, 239, 238, 241, 240, 242, 243, 244, 245, 246, 247, 248, 249, 251,
+)
+
+MOTOR_TABLES = (RPM_TO_PWM_MOTOR_1, RPM_TO_PWM_MOTOR_2)
+
+
+def steady_state_rpm(pwm, table):
+    """
+    Stationær RPM ved en given PWM, fundet ved at invertere en RPM -> PWM tabel.
+
+    Tabellen er målt med støj og er ikke monoton; den gøres monoton med et
+    løbende maksimum før interpolationen. PWM under tabellens første
+    (laveste) indgang giver 0 RPM.
+    """
+    table = np.asarray(table, dtype=float)
+    pwm_points = np.maximum.accumulate(table[1:])
+    rpm_points = np.arange(1, table.size, dtype=float)
+    # np.interp kræver stigende x: ved ens PWM-værdier bruges den højeste RPM
+    pwm_points, last = np.unique(pwm_points[::-1], return_index=True)
+    rpm_points = rpm_points[::-1][last]
+    return np.interp(pwm, pwm_points, rpm_points, left=0.0)
+
+
+def command_response(table, deadzone_pwm=MOTOR_DEADZONE_PWM):
+    """
+    Stationær RPM for hver heltals-RPM kommando 0..MAX_RPM.
+
+    Kæden er den samme som på robotten: kommandoen slås op i tabellen (PWM
+    er et heltal), PWM under dødzonen får ikke motoren til at dreje, og
+    resten giver den målte hastighed. Resultatet er et array der kan
+    indekseres direkte med den afrundede kommando.
+    """
+    pwm = np.clip(np.asarray(table, dtype=float), 0, MOTOR_PWM_MAX)
+    return np.where(pwm >= deadzone_pwm, steady_state_rpm(pwm, table), 0.0)
@@ -0,0 +1,117 @@
+# simulation/robustness.py
+"""
+Monte Carlo robusthed af PID-kandidater
+
+En kandidat der scorer godt på den nominelle model kan være skrøbelig over
+for batterispænding, masse eller IMU-forsinkelse. Hver kandidat simuleres
+derfor på de samme ROBUST_SAMPLES tilfældigt forstyrrede udgaver af
+WheeledPendulumSimulator (fælles tilfældige tal, så kandidaterne
+sammenlignes på lige vilkår), og score-fordelingen opsummeres.
+
+Kombinationerne (kandidat, forstyrrelse) lægges i ét fladt array og deles i
+batches af SIM_BATCH_SIZE, som simuleres vektoriseret i en ProcessPoolExecutor.
+Forstyrrelserne trækkes i hovedprocessen og støjen seedes pr. batch, så
+resultatet ikke afhænger af antallet af processer.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config.settings import (
+    ROBUST_PERTURBATIONS,
+    ROBUST_SAMPLES,
+    ROBUST_WORKERS,
+    SIM_BATCH_SIZE,
+    SIM_SEED
+)
+from simulation.wheeled_plant import WheeledPendulumSimulator, PLANT_PARAMS
+
+# Parametre som simulatoren forstår (som i tuning/prescreen.py)
+SIMULATED_PARAMS = ("kp", "ki", "kd", "init_balance", "power_gain")
+
+
+def _simulate_batch(options, gains, plant, seed):
+    """Simulér én batch i en worker-proces. Returnerer (score, stabil) arrays."""
+    simulator = WheeledPendulumSimulator(**dict(options, **plant, seed=seed))
+    metrics = simulator.evaluate(*(gains[name] for name in SIMULATED_PARAMS))
+    return metrics['score'], metrics['stable']
+
+
+class RobustnessEvaluator:
+    """Score-fordeling pr. kandidat over tilfældige model-forstyrrelser"""
+
+    def __init__(self, simulator_options=None, perturbations=ROBUST_PERTURBATIONS, samples=ROBUST_SAMPLES,
+                 workers=ROBUST_WORKERS, batch_size=SIM_BATCH_SIZE, seed=SIM_SEED):
+        self.simulator_options = dict(simulator_options or {})
+        self.perturbations = dict(perturbations)
+        self.samples = samples
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.seed = seed
+        self.nominal = WheeledPendulumSimulator(**self.simulator_options)
+        unknown = set(self.perturbations) - set(PLANT_PARAMS)
+        if unknown:
+            raise ValueError(f"Ukendte model-parametre i forstyrrelserne: {sorted(unknown)}")
+
+    def sample_perturbations(self):
+        """Trækker de forstyrrede modeller: dict med ét array (samples,) pr. forstyrret parameter"""
+        rng = np.random.default_rng(self.seed)
+        nominal = self.nominal.plant_parameters(self.samples)
+        plants = {}
+        for name, (kind, low, high) in sorted(self.perturbations.items()):
+            draw = rng.uniform(low, high, self.samples)
+            if kind == 'scale':
+                plants[name] = nominal[name] * draw
+            elif kind == 'add':
+                plants[name] = nominal[name] + draw
+            else:
+                raise ValueError(f"Ukendt forstyrrelsestype for {name}: {kind}")
+        return plants
+
+    @staticmethod
+    def _gains(candidates):
+        return {name: np.array([float(job.get(name, 0.0)) for job in candidates]) for name in SIMULATED_PARAMS}
+
+    def _batches(self, candidates, plants):
+        """(gains, plant, seed) pr. batch af det flade (kandidat, forstyrrelse) array"""
+        gains = {name: np.repeat(values, self.samples) for name, values in self._gains(candidates).items()}
+        plants = {name: np.tile(values, len(candidates)) for name, values in plants.items()}
+        total = len(candidates) * self.samples
+        for number, start in enumerate(range(0, total, self.batch_size)):
+            chunk = slice(start, start + self.batch_size)
+            yield ({name: values[chunk] for name, values in gains.items()},
+                   {name: values[chunk] for name, values in plants.items()}, self.seed + 1 + number)
+
+    def evaluate(self, candidates):
+        """
+        Simulér alle kandidater på alle forstyrrede modeller.
+
+        Args:
+            candidates: liste af job-dicts (kp, ki, kd og evt. init_balance, power_gain)
+
+        Returns:
+            list: dicts med job, nominal, mean, std, p5 og failure_rate (andel der vælter)
+                  i samme rækkefølge som candidates
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return []
+        plants = self.sample_perturbations()
+        batches = list(self._batches(candidates, plants))
+
+        if self.workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                futures = [pool.submit(_simulate_batch, self.simulator_options, gains, plant, seed)
+                           for gains, plant, seed in batches]
+                results = [future.result() for future in futures]
+        else:
+            results = [_simulate_batch(self.simulator_options, gains, plant, seed) for gains, plant, seed in batches]
+
+        scores = np.concatenate([score for score, _ in results]).reshape(len(candidates), self.samples)
+        stable = np.concatenate([flag for _, flag in results]).reshape(len(candidates), self.samples)
+        nominal = self.nominal.evaluate(*self._gains(candidates).values())['score']
+
+        return [{'job': job, 'nominal': float(nominal[i]), 'mean': float(scores[i].mean()),
+                 'std': float(scores[i].std()), 'p5': float(np.percentile(scores[i], 5)),
+                 'failure_rate': float(1.0 - stable[i].mean())}
+                for i, job in enumerate(candidates)]
@@ -0,0 +1,219 @@
+# simulation/simulated_robot.py
+"""
+Simuleret balancerobot bag en pseudo-terminal (pty)
+
+Robotten taler samme serielle protokol som firmwaren, så GUI'en,
+autotune_cli.py og multi_robot_tune.py kan forbindes til pty'ens port i
+stedet for /dev/ttyUSB0 og teste hele auto-tune forløbet uden hardware:
+
+    kp=, ki=, kd=, init=, gain=   sæt parametre (virker med det samme)
+    print                          svar med "KP: .. KI: .. KD: .. InitBal: .. Gain: .."
+    save                           (ingen NVS - kvitteres kun)
+    csv_on / csv_off               TAG_CSV-strøm med én linje pr. regulator-periode
+    score_start / score_stop       scoring; score_stop svarer med TAG_SCORE_RESULT
+
+Modellen er WheeledPendulumSimulator med én konfiguration, skridtet frem én
+regulator-periode ad gangen i en baggrundstråd. Med speed > 1 kører den
+simulerede tid hurtigere end virkeligheden; værten skal så skalere sine egne
+timere med samme faktor (EventLoop(time_scale=speed)), da kørslernes længde
+og watchdogs styres derfra.
+
+Når pitch overstiger FALLEN_PITCH_THRESHOLD_DEG sendes TAG_FALLEN, og
+robotten ligger ned i SIMROBOT_RECOVERY_S før den rejses op igen og
+balancerer videre (som når den fysiske robot rejses op mellem kørsler).
+"""
+
+import os
+import select
+import threading
+import time
+import tty
+import numpy as np
+from config.settings import (
+    DEFAULT_PID_PARAMS,
+    FALLEN_PITCH_THRESHOLD_DEG,
+    SIMROBOT_SPEED,
+    SIMROBOT_RECOVERY_S,
+    SIMROBOT_MAX_LAG_S,
+    TAG_CSV,
+    TAG_FALLEN,
+    TAG_INFO,
+    TAG_ERROR,
+    TAG_SCORE_RESULT
+)
+from simulation.wheeled_plant import WheeledPendulumSimulator
+
+# Kommando-navne -> parametre (omvendt af SerialThread._send_parameter_commands)
+PARAMETER_COMMANDS = {"kp": "kp", "ki": "ki", "kd": "kd", "init": "init_balance", "gain": "power_gain"}
+
+
+class SimulatedRobot(threading.Thread):
+    """
+    Tråd der simulerer robotten i (skaleret) realtid og taler firmwarens protokol på en pty
+
+    Porten (self.port) åbnes som en almindelig seriel port; baudraten er ligegyldig.
+    """
+
+    def __init__(self, simulator=None, params=None, speed=SIMROBOT_SPEED, recovery_s=SIMROBOT_RECOVERY_S,
+                 max_lag_s=SIMROBOT_MAX_LAG_S):
+        super().__init__(daemon=True)
+        if speed <= 0:
+            raise ValueError(f"Hastigheden skal være positiv: {speed}")
+        self.simulator = simulator or WheeledPendulumSimulator()
+        self.params = dict(DEFAULT_PID_PARAMS, **(params or {}))
+        self.speed = speed
+        self.recovery_s = recovery_s
+        self.max_lag_s = max_lag_s
+        self._stop_event = threading.Event()
+
+        # Værten åbner slave-siden; robotten læser og skriver på master-siden
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)  # Ingen ekko eller linjeskift-oversættelse
+        os.set_blocking(self.master_fd, False)
+        self.port = os.ttyname(self.slave_fd)
+        self._input = b""
+
+        self.state = self.simulator.initial_state(1)
+        self.loops = 0
+        self.fallen_at_s = None
+        self.csv_enabled = False
+        self.scoring = False
+        self.score_start_s = 0.0
+        self.position_origin = 0.0
+        self.score_data = []  # (tid_s relativt til score_start, pitch, forskydning)
+
+    @property
+    def time_s(self):
+        """Simuleret tid siden start"""
+        return self.loops * self.simulator.loop_time_s
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        wall_start = time.monotonic()
+        lag_reported = False
+        try:
+            while not self._stop_event.is_set():
+                deadline = wall_start + self.time_s / self.speed
+                lag = time.monotonic() - deadline
+                if lag > self.max_lag_s:
+                    # Maskinen kan ikke følge med - fortsæt fra nu i stedet for at indhente
+                    if not lag_reported:
+                        print(f"SIMULERING: Kan ikke følge med {self.speed:g}x realtid - kører så hurtigt som muligt.")
+                        lag_reported = True
+                    wall_start += lag
+                    deadline += lag
+                self._poll(deadline)
+                self._control_loop()
+        finally:
+            os.close(self.master_fd)
+            os.close(self.slave_fd)
+
+    # --- Seriel side ---------------------------------------------------------
+
+    def _poll(self, deadline):
+        """Behandl indkomne kommandoer indtil deadline (time.monotonic)"""
+        while True:
+            timeout = deadline - time.monotonic()
+            readable = select.select([self.master_fd], [], [], max(timeout, 0.0))[0]
+            if readable:
+                self._read_commands()
+            if timeout <= 0 or not readable:
+                return
+
+    def _read_commands(self):
+        try:
+            self._input += os.read(self.master_fd, 4096)
+        except (BlockingIOError, OSError):
+            return
+        *lines, self._input = self._input.split(b"\n")
+        for line in lines:
+            command = line.decode('utf-8', errors='ignore').strip()
+            if command:
+                self._handle_command(command)
+
+    def _write(self, line):
+        """Send én linje; uden en læsende vært smides den væk ligesom på en rigtig UART"""
+        try:
+            os.write(self.master_fd, (line + "\n").encode('utf-8'))
+        except (BlockingIOError, OSError):
+            pass
+
+    def _handle_command(self, command):
+        name, _, value = command.partition("=")
+        name = name.strip().lower()
+        if value and name in PARAMETER_COMMANDS:
+            try:
+                self.params[PARAMETER_COMMANDS[name]] = float(value)
+            except ValueError:
+                self._write(f"{TAG_ERROR} Ugyldig værdi: {command}")
+        elif name == "print":
+            p = self.params
+            self._write(f"KP: {p['kp']:.4f} KI: {p['ki']:.4f} KD: {p['kd']:.4f} "
+                        f"InitBal: {p['init_balance']:.4f} Gain: {p['power_gain']:.4f}")
+        elif name == "save":
+            self._write(f"{TAG_INFO} Parametre gemt (simuleret)")
+        elif name in ("csv_on", "csv_off"):
+            self.csv_enabled = name == "csv_on"
+        elif name == "score_start":
+            self.scoring = True
+            self.score_start_s = self.time_s
+            self.position_origin += self._displacement()
+            self.score_data = []
+        elif name == "score_stop":
+            self.scoring = False
+            self._write(self._score_result())
+        else:
+            self._write(f"{TAG_ERROR} Ukendt kommando: {command}")
+
+    # --- Simulering -----------------------------------------------------------
+
+    def _control_loop(self):
+        """Én regulator-periode med de aktuelle parametre, CSV-linje og scoring"""
+        self.loops += 1
+        p = self.params
+        if self.fallen_at_s is not None:
+            if self.time_s - self.fallen_at_s < self.recovery_s:
+                # Robotten ligger ned med motorerne slukket
+                if self.csv_enabled:
+                    self._write_csv(np.sign(self.state['theta'][0]) * 90.0, 0.0, (0.0,) * 5, self._displacement())
+                return
+            self.state = self.simulator.initial_state(1, rng=self.state['rng'])
+            self.position_origin = 0.0
+            self.fallen_at_s = None
+
+        sample = self.simulator.step(self.state, p['kp'], p['ki'], p['kd'], p['init_balance'], p['power_gain'])
+        displacement = self._displacement()
+        pitch = float(sample['pitch_deg'][0])
+        terms = tuple(float(sample[name][0]) for name in ('balance_cmd', 'p_term', 'i_term', 'd_term', 'output'))
+        if self.csv_enabled:
+            self._write_csv(pitch, float(sample['filtered_rate'][0]), terms, displacement)
+        if self.scoring:
+            self.score_data.append((self.time_s - self.score_start_s, pitch, displacement))
+
+        if abs(pitch) > FALLEN_PITCH_THRESHOLD_DEG:
+            self.fallen_at_s = self.time_s
+            self.scoring = False
+            self._write(TAG_FALLEN)
+
+    def _displacement(self):
+        return float(self.state['position'][0]) - self.position_origin
+
+    def _write_csv(self, pitch, rate, terms, displacement):
+        # Kolonnerne i CSV_EXPECTED_COLUMNS_NAMES
+        values = ",".join(f"{value:.3f}" for value in (pitch, rate) + terms)
+        self._write(f"{TAG_CSV}{int(round(self.time_s * 1000))},{values},{displacement:.4f}")
+
+    def _score_result(self):
+        """TAG_SCORE_RESULT for den seneste scoring, beregnet som BatchBalanceSimulator.metrics"""
+        if not self.score_data:
+            return f"{TAG_SCORE_RESULT} status=fail"
+        time_s, pitch, position = (np.array(column) for column in zip(*self.score_data))
+        metrics = self.simulator.metrics({'time_s': time_s, 'pitch_deg': pitch[:, None],
+                                          'position_m': position[:, None]})
+        values = {'score': metrics['score'][0], 'valid_time': metrics['valid_time'][0],
+                  'rms_amp': metrics['amplitude_rms'][0], 'pos_rmse': metrics['position_rmse_m'][0]}
+        # For korte kørsler har uendelige metrikker, som protokollen ikke kan bære
+        return TAG_SCORE_RESULT + " " + ", ".join(f"{key}={value:.4f}" for key, value in values.items()
+                                                  if np.isfinite(value))
@@ -0,0 +1,258 @@
+# simulation/wheeled_plant.py
+"""
+Diskret model af den tohjulede robot med firmwarens regulator-kæde
+
+I modsætning til robotsim.py (moment-styret pendul uden vogn) og
+BatchBalanceSimulator (output = hjul-acceleration) følger modellen
+robottens faktiske signalvej:
+
+    IMU (støj, forsinkelse) -> LOWPASSFILTER på pitch-raten -> PID hver LOOP_TIME_MS
+    -> RPM-kommando -> RPM -> PWM tabel (heltal, dødzone) -> motor -> hjul -> vogn + pendul
+
+Alle tilstande er arrays med én værdi pr. konfiguration. Også de fysiske
+parametre (pendullængde, motor-forstærkning, tidskonstant, filter-alpha,
+forsinkelse, offset) kan gives som arrays, så den samme batch kan bruges til
+både gain-søgning og robusthedsanalyse.
+"""
+
+import json
+import os
+import numpy as np
+from config.settings import (
+    PLANT_DT,
+    PLANT_LOOP_TIME_S,
+    PLANT_FILTER_ALPHA,
+    PLANT_SENSOR_DELAY_S,
+    PLANT_RATE_NOISE_DPS,
+    PLANT_RPM_PER_OUTPUT,
+    PLANT_WHEEL_RADIUS_M,
+    PLANT_MOTOR_TIME_CONSTANT_S,
+    PLANT_MOTOR_GAIN,
+    PLANT_PENDULUM_LENGTH_M,
+    SIM_DURATION_S,
+    SIM_INITIAL_PITCH_DEG,
+    SIM_BALANCE_OFFSET_DEG,
+    SIM_SENSOR_NOISE_DEG,
+    SIM_SEED,
+    ACTUATOR_OUTPUT_LIMIT,
+    ITERM_WINDUP_LIMIT
+)
+from simulation.balance_sim import BatchBalanceSimulator, G
+from simulation.motor_tables import MOTOR_TABLES, MOTOR_DEADZONE_PWM, command_response
+
+RPM_TO_MPS = 2.0 * np.pi / 60.0
+
+# Model-parametre der kan gives som arrays (én værdi pr. konfiguration)
+PLANT_PARAMS = ('pendulum_length_m', 'filter_alpha', 'sensor_delay_s', 'sensor_noise_deg', 'rate_noise_dps',
+                'rpm_per_output', 'wheel_radius_m', 'motor_time_constant_s', 'motor_gain', 'initial_pitch_deg',
+                'balance_offset_deg')
+
+
+class WheeledPendulumSimulator(BatchBalanceSimulator):
+    """
+    Inverteret pendul på en hastighedsstyret vogn, vektoriseret over konfigurationer
+
+    Dynamik:  theta'' = (g*sin(theta - offset) - a*cos(theta)) / l
+    hvor vognens acceleration a er ændringen i hjulenes hastighed. Hvert hjul
+    nærmer sig motorens stationære hastighed for den aktuelle PWM med en
+    første-ordens forsinkelse; vognens hastighed er middel af de to hjul.
+
+    Regulatoren sampler kun hver loop_time_s og holder outputtet til næste
+    sample (sample-and-hold). Den loggede pitch er den målte (støj og
+    forsinkelse), ligesom fusedPitch i robottens CSV-strøm.
+    """
+
+    def __init__(self, dt=PLANT_DT, loop_time_s=PLANT_LOOP_TIME_S, duration_s=SIM_DURATION_S,
+                 pendulum_length_m=PLANT_PENDULUM_LENGTH_M, filter_alpha=PLANT_FILTER_ALPHA,
+                 sensor_delay_s=PLANT_SENSOR_DELAY_S, sensor_noise_deg=SIM_SENSOR_NOISE_DEG,
+                 rate_noise_dps=PLANT_RATE_NOISE_DPS, rpm_per_output=PLANT_RPM_PER_OUTPUT,
+                 wheel_radius_m=PLANT_WHEEL_RADIUS_M, motor_time_constant_s=PLANT_MOTOR_TIME_CONSTANT_S,
+                 motor_gain=PLANT_MOTOR_GAIN, deadzone_pwm=MOTOR_DEADZONE_PWM, motor_tables=MOTOR_TABLES,
+                 initial_pitch_deg=SIM_INITIAL_PITCH_DEG, balance_offset_deg=SIM_BALANCE_OFFSET_DEG, seed=SIM_SEED):
+        self.dt = dt
+        self.substeps = max(1, int(round(loop_time_s / dt)))
+        self.loop_time_s = self.substeps * dt
+        self.num_loops = int(round(duration_s / self.loop_time_s))
+        self.pendulum_length_m = pendulum_length_m
+        self.filter_alpha = filter_alpha
+        self.sensor_delay_s = sensor_delay_s
+        self.sensor_noise_deg = sensor_noise_deg
+        self.rate_noise_dps = rate_noise_dps
+        self.rpm_per_output = rpm_per_output
+        self.wheel_radius_m = wheel_radius_m
+        self.motor_time_constant_s = motor_time_constant_s
+        self.motor_gain = motor_gain
+        self.initial_pitch_deg = initial_pitch_deg
+        self.balance_offset_deg = balance_offset_deg
+        self.seed = seed
+        # Stationær hjul-RPM for hver heltals-kommando, én række pr. motor
+        self.responses = np.array([command_response(table, deadzone_pwm) for table in motor_tables])
+
+    @staticmethod
+    def load_parameters(filename):
+        """
+        Model-parametre fra en fil skrevet af system-identifikationen
+        (analysis/system_identification.py). Ukendte nøgler ignoreres.
+
+        Returns:
+            dict: konstruktør-argumenter, tom hvis filen ikke findes
+        """
+        if not filename or not os.path.exists(filename):
+            return {}
+        with open(filename, 'r') as f:
+            plant = json.load(f).get('plant', {})
+        return {name: float(value) for name, value in plant.items() if name in PLANT_PARAMS + ('loop_time_s',)}
+
+    @classmethod
+    def calibrated_parameters(cls, filename, allow_uncalibrated=False):
+        """
+        Som load_parameters, men uden en identificeret model gives ValueError.
+
+        Standard-værdierne (PLANT_*) gengiver ikke robotten: på den hastighedsstyrede
+        vogn kommer stivheden fra I-leddet, så robottens kendte gains (KI omkring 0.1)
+        vælter, og de gains modellen finder, kan ikke overføres. allow_uncalibrated
+        tillader standard-modellen alligevel (til test af værktøjerne).
+        """
+        options = cls.load_parameters(filename)
+        if not options and not allow_uncalibrated:
+            raise ValueError(f"Ingen identificeret model i {filename}. Kør identify_plant.py på robottens "
+                             f"logs først - standard-modellen er ikke kalibreret mod robotten.")
+        return options
+
+    @classmethod
+    def from_parameter_file(cls, filename, allow_uncalibrated=False, **overrides):
+        """Simulator med de identificerede parametre; overrides har forrang"""
+        return cls(**dict(cls.calibrated_parameters(filename, allow_uncalibrated), **overrides))
+
+    def plant_parameters(self, n):
+        """Modellens fysiske parametre broadcastet til n konfigurationer"""
+        return {name: np.broadcast_to(np.asarray(getattr(self, name), dtype=float), (n,)).copy()
+                for name in PLANT_PARAMS}
+
+    def initial_state(self, n, rng=None):
+        """
+        Starttilstand for n konfigurationer (oprejst med initial_pitch_deg, alt andet i hvile).
+
+        Args:
+            n: antal konfigurationer
+            rng: støjkilde der fortsættes (f.eks. når en væltet robot rejses op); ellers seedes en ny
+
+        Returns:
+            dict: tilstandene og de afledte model-konstanter, som step opdaterer
+        """
+        p = self.plant_parameters(n)
+        theta = np.radians(p['initial_pitch_deg'])
+        # Ringbuffer med de sande tilstande, så IMU'en kan læse en forsinket værdi pr. konfiguration
+        delay_steps = np.round(p['sensor_delay_s'] / self.dt).astype(int)
+        history_length = int(delay_steps.max()) + 1
+        return {
+            'p': p,
+            'rng': rng if rng is not None else np.random.default_rng(self.seed),
+            'columns': np.arange(n),
+            'theta': theta,
+            'omega': np.zeros(n),
+            'position': np.zeros(n),
+            'velocity': np.zeros(n),
+            'wheel_rpm': np.zeros((len(self.responses), n)),
+            'integral': np.zeros(n),
+            'filtered_rate': np.zeros(n),
+            'offset': np.radians(p['balance_offset_deg']),
+            'motor_blend': np.minimum(1.0, self.dt / np.maximum(p['motor_time_constant_s'], 1e-9)),
+            'mps_per_rpm': RPM_TO_MPS * p['wheel_radius_m'],
+            'delay_steps': delay_steps,
+            'history_length': history_length,
+            'theta_history': np.repeat(theta[None, :], history_length, axis=0),
+            'omega_history': np.zeros((history_length, n)),
+            'step': 0
+        }
+
+    def step(self, state, kp, ki, kd, init_balance=0.0, power_gain=0.0):
+        """
+        Én regulator-periode: IMU-måling, filter og PID, motor-kæden og derefter
+        loop_time_s fysik med det holdte output. Tilstanden opdateres på stedet.
+
+        Returns:
+            dict: det regulatoren så og beregnede i perioden - pitch_deg og rate_dps (målt),
+                  filtered_rate, p_term, i_term, d_term, balance_cmd og output (skaleret og begrænset)
+        """
+        p = state['p']
+        n = state['columns'].size
+        rng = state['rng']
+        integral_limit = np.where(ki > 0, ITERM_WINDUP_LIMIT / np.maximum(ki, 1e-12), np.inf)
+        max_command = self.responses.shape[1] - 1
+
+        # Regulator: målt pitch og filtreret rate i grader
+        delayed = (state['step'] - state['delay_steps']) % state['history_length']
+        pitch_deg = (np.degrees(state['theta_history'][delayed, state['columns']])
+                     + p['sensor_noise_deg'] * rng.standard_normal(n))
+        rate_dps = (np.degrees(state['omega_history'][delayed, state['columns']])
+                    + p['rate_noise_dps'] * rng.standard_normal(n))
+        filtered_rate = p['filter_alpha'] * rate_dps + (1.0 - p['filter_alpha']) * state['filtered_rate']
+        error = pitch_deg - init_balance
+        integral = np.clip(state['integral'] + error * self.loop_time_s, -integral_limit, integral_limit)
+        p_term, i_term, d_term = kp * error, ki * integral, kd * filtered_rate
+        balance_cmd = p_term + i_term + d_term
+        output = np.clip(balance_cmd * (1.0 + power_gain), -ACTUATOR_OUTPUT_LIMIT, ACTUATOR_OUTPUT_LIMIT)
+        state['filtered_rate'] = filtered_rate
+        state['integral'] = integral
+
+        # Motor-kæden: heltals RPM-kommando -> PWM -> stationær hjul-RPM (holdes til næste sample)
+        command = output * p['rpm_per_output']
+        index = np.minimum(np.rint(np.abs(command)).astype(int), max_command)
+        target_rpm = np.sign(command) * self.responses[:, index] * p['motor_gain']
+
+        theta, omega, position = state['theta'], state['omega'], state['position']
+        wheel_rpm, velocity = state['wheel_rpm'], state['velocity']
+        for _ in range(self.substeps):
+            wheel_rpm += (target_rpm - wheel_rpm) * state['motor_blend']
+            new_velocity = wheel_rpm.mean(axis=0) * state['mps_per_rpm']
+            accel = (new_velocity - velocity) / self.dt
+            velocity = new_velocity
+            alpha = (G * np.sin(theta - state['offset']) - accel * np.cos(theta)) / p['pendulum_length_m']
+            omega += alpha * self.dt
+            theta += omega * self.dt
+            position += velocity * self.dt
+
+            state['step'] += 1
+            state['theta_history'][state['step'] % state['history_length']] = theta
+            state['omega_history'][state['step'] % state['history_length']] = omega
+        state['velocity'] = velocity
+
+        # Væltede konfigurationer fastholdes, så de ikke løber løbsk numerisk
+        fallen = np.abs(theta) > np.pi / 2
+        theta[fallen] = np.sign(theta[fallen]) * np.pi / 2
+        omega[fallen] = 0.0
+
+        return {'pitch_deg': pitch_deg, 'rate_dps': rate_dps, 'filtered_rate': filtered_rate, 'p_term': p_term,
+                'i_term': i_term, 'd_term': d_term, 'balance_cmd': balance_cmd, 'output': output}
+
+    def simulate(self, kp, ki, kd, init_balance=0.0, power_gain=0.0):
+        """
+        Simulér alle konfigurationer. Argumenterne er skalarer eller arrays af samme længde.
+
+        Returns:
+            dict: 'time_s' (loops,), 'pitch_deg', 'rate_dps', 'position_m' og 'output' (loops, configs)
+        """
+        # Gains og model-parametre broadcastes sammen, så én gain kan køres på mange modeller og omvendt
+        plant_shapes = [np.shape(getattr(self, name)) for name in PLANT_PARAMS]
+        kp, ki, kd, init_balance, power_gain = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (kp, ki, kd, init_balance, power_gain)),
+            *(np.empty(shape) for shape in plant_shapes)
+        )[:5]
+        state = self.initial_state(kp.size)
+
+        pitch_log = np.empty((self.num_loops, kp.size), dtype=np.float32)
+        rate_log = np.empty((self.num_loops, kp.size), dtype=np.float32)
+        position_log = np.empty((self.num_loops, kp.size), dtype=np.float32)
+        output_log = np.empty((self.num_loops, kp.size), dtype=np.float32)
+
+        for loop in range(self.num_loops):
+            sample = self.step(state, kp, ki, kd, init_balance, power_gain)
+            pitch_log[loop] = sample['pitch_deg']
+            rate_log[loop] = sample['rate_dps']
+            position_log[loop] = state['position']
+            output_log[loop] = sample['output']
+
+        time_s = np.arange(1, self.num_loops + 1) * self.loop_time_s
+        return {'time_s': time_s, 'pitch_deg': pitch_log, 'rate_dps': rate_log, 'position_m': position_log,
+                'output': output_log}
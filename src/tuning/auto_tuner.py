@@ -1,39 +1,240 @@
 # src/tuning/auto_tuner.py
-import numpy as np
+from config.settings import (
+    AUTO_STRATEGY,
+    AUTO_DURATION_SEC,
+    AUTO_GRID_ORDER,
+    AUTOTUNE_MATCH_TOLERANCE,
+    AUTOTUNE_SUMMARY_FILE,
+    PARETO_FRONT_FILE,
+    REPEAT_TOP_K
+)
+from datalogger.data_logger import DataLogger
+from tuning.strategies import STRATEGIES
+from tuning.campaign import Campaign
+from tuning.search_space import SearchSpace
+from tuning.repeats import RepeatScheduler
 
 class AutoTuner:
-    def __init__(self, tune_params):
+    def __init__(self, tune_params, strategy=AUTO_STRATEGY, campaign_file=None, history=None, retest=False,
+                 pareto_file=PARETO_FRONT_FILE, summary_file=AUTOTUNE_SUMMARY_FILE):
         self.params = tune_params
-        self.jobs = []
+        self.pareto_file = pareto_file
+        self.summary_file = summary_file
+        self.strategy_name = strategy
+        self.campaign_file = campaign_file
+        self.campaign_results = []
+        # Tidligere resultater [(parametre, score)] - jobs der allerede er testet springes over
+        self.history = history or []
+        # Værdierne robotten kører med for parametre der ikke tunes - sættes af den der kører jobs
+        self.base_params = {}
+        self.retest = retest
+        self.num_cached = 0
+        self.in_flight = 0  # Jobs der er sendt ud men endnu ikke har fået en score
+        self._pending_job = None
+        self._strategy_done = False
+        self._pending_repeats = {}  # Nøgle -> antal gentagelser der er sendt ud
+        self._replaying = False
+        self.current_job = None
         self.current_job_index = 0
-        self.total_jobs = 0
-        self._generate_jobs()
-
-    def _generate_jobs(self):
-        """Laver en liste over alle PID-kombinationer, der skal testes."""
-        kp_range = np.arange(self.params['kp_start'], self.params['kp_end'] + self.params['kp_step'], self.params['kp_step'])
-        kd_range = np.arange(self.params['kd_start'], self.params['kd_end'] + self.params['kd_step'], self.params['kd_step'])
-        ki_range = np.arange(self.params['ki_start'], self.params['ki_end'] + self.params['ki_step'], self.params['ki_step'])
-        
-        # Tre nested loops for at generere alle kombinationer
-        for kp in kp_range:
-            for kd in kd_range:
-                for ki in ki_range:
-                    pid_params = {'kp': kp, 'ki': ki, 'kd': kd}
-                    self.jobs.append(pid_params)
-        
-        self.total_jobs = len(self.jobs)
-        print(f"AutoTuner: Genereret {self.total_jobs} test-jobs.")
+        self.results = []
+        self.best_score = float('-inf')
+        self.best_job = None
+        self.duration_s = tune_params.get('duration_s', AUTO_DURATION_SEC)
+        self.robot_time_s = 0.0
+        self.num_aborted = 0
+
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Ukendt søgestrategi: {strategy}")
+        self.space = SearchSpace.from_tune_params(tune_params)
+        # strategy_options: strategi-specifikke argumenter, f.eks. {'start': {...}} for "local"
+        self.strategy = STRATEGIES[strategy](self.space, max_duration_s=self.duration_s,
+                                             order=tune_params.get('grid_order', AUTO_GRID_ORDER),
+                                             **tune_params.get('strategy_options', {}))
+        # Gentagelser rangerer efter scoren og giver ikke mening for multi-objektive strategier
+        use_repeats = self.strategy.scalar_score and not self.strategy.handles_noise
+        top_k = tune_params.get('repeat_top_k', REPEAT_TOP_K) if use_repeats else 0
+        self.repeats = RepeatScheduler(top_k=top_k)
+        self.total_jobs = self.strategy.total_jobs + (self.repeats.budget_runs if self.repeats.enabled else 0)
+        print(f"AutoTuner: Strategi '{strategy}' med op til {self.total_jobs} test-jobs.")
+
+    @classmethod
+    def from_campaign(cls, filename, history=None, retest=False):
+        """
+        Genoptag en gemt kampagne. Strategien genopbygges ved at afspille de
+        gemte resultater, så den fortsætter præcis hvor den slap.
+        """
+        state = Campaign.load(filename)
+        if state is None:
+            raise ValueError(f"Ingen gyldig kampagne i {filename}")
+        tuner = cls(state['tune_params'], state['strategy'], campaign_file=filename, history=history, retest=retest)
+        tuner._replay(state['results'])
+        print(f"AutoTuner: Kampagne genoptaget efter {tuner.current_job_index} jobs.")
+        return tuner
+
+    def _replay(self, records):
+        """Fodrer strategien med gemte resultater uden at køre robotten."""
+        self._replaying = True
+        try:
+            for record in records:
+                job = self._propose()
+                if job is None or not Campaign.jobs_match(job, record['job'], AUTOTUNE_MATCH_TOLERANCE):
+                    print(f"AUTO-TUNE ERROR: Kampagnen afviger fra strategien efter {self.current_job_index} jobs. "
+                          f"Fortsætter derfra.")
+                    self._pending_job = job
+                    break
+                self.current_job_index += 1
+                self.in_flight += 1
+                self.report_result(job, record['score'], record.get('elapsed_s'),
+                                   record.get('aborted', False), record.get('cached', False), record.get('metrics'))
+        finally:
+            self._replaying = False
 
     def get_next_job(self):
-        """Returnerer det næste sæt PID-parametre eller None, hvis der ikke er flere."""
-        if self.current_job_index < self.total_jobs:
-            job = self.jobs[self.current_job_index]
+        """
+        Returnerer det næste sæt PID-parametre eller None, hvis der ikke er flere.
+        Jobs der allerede findes i historikken besvares direkte med den gemte score.
+        """
+        while True:
+            if self._pending_job is not None:
+                job, self._pending_job = self._pending_job, None
+            else:
+                job = self._propose()
+            if job is None:
+                self.current_job = None
+                if self.in_flight == 0:
+                    self._save_campaign(finished=True)
+                return None
+            self.current_job = job
             self.current_job_index += 1
-            return job
-        else:
-            return None
+            self.in_flight += 1
+
+            cached_score = None if self.retest or self.is_rerun(job) else self._lookup_history(job)
+            if cached_score is None:
+                return job
+            print(f"AutoTuner: Job {self.get_progress()} er allerede testet (score {cached_score:.2f}) - springes over.")
+            self.report_result(job, cached_score, elapsed_s=0.0, cached=True)
+
+    def _propose(self):
+        """
+        Næste job fra strategien, og når den er færdig, gentagelser af de
+        kandidater hvis placering i top-k endnu ikke er afgjort.
+        """
+        if not self._strategy_done:
+            job = self.strategy.propose()
+            if job is not None or self.in_flight > 0:
+                return job
+            self._strategy_done = True
+            self._save_summary()
+        job = self.repeats.next_repeat(busy=self._pending_repeats)
+        if job is not None:
+            key = self.strategy.job_key(job)
+            self._pending_repeats[key] = self._pending_repeats.get(key, 0) + 1
+            print(f"AutoTuner: Gentager {self.format_job(job)} - placering i top-{self.repeats.top_k} er ikke afgjort.")
+        return job
+
+    def is_repeat(self, job):
+        """True hvis jobbet er en gentagelse af en allerede kørt kandidat"""
+        return self._pending_repeats.get(self.strategy.job_key(job), 0) > 0
+
+    def is_full_duration(self, job):
+        """True hvis jobbet køres med kampagnens fulde varighed (ikke et kort halving-trin)"""
+        return abs(job.get('duration_s', self.duration_s) - self.duration_s) <= AUTOTUNE_MATCH_TOLERANCE
+
+    def is_rerun(self, job):
+        """True hvis jobbet allerede er kørt i denne kampagne (gentagelse fra AutoTuner eller strategien)"""
+        return self.is_repeat(job) or self.strategy.job_key(job) in self.repeats.candidates
+
+    def _lookup_history(self, job):
+        """
+        Score for et tidligere identisk job (float-tolerant), nyeste først, ellers None.
+
+        De tunede parametre skal findes i rækken. Rækkens øvrige parametre (f.eks.
+        init_balance fra en 5-D kampagne) skal svare til det robotten faktisk får
+        nu - ellers blev jobbet kørt med andre værdier og tæller ikke som testet.
+        """
+        duration = job.get('duration_s', self.duration_s)
+        sent = dict(self.base_params, **{name: job[name] for name in self.strategy.param_names})
+        for params, score in reversed(self.history):
+            if 'duration_s' in params and abs(params['duration_s'] - duration) > AUTOTUNE_MATCH_TOLERANCE:
+                continue
+            if not all(name in params for name in self.strategy.param_names):
+                continue
+            if all(name in sent and abs(value - float(sent[name])) <= AUTOTUNE_MATCH_TOLERANCE
+                   for name, value in params.items() if name != 'duration_s'):
+                return score
+        return None
+
+    def _save_campaign(self, finished=False):
+        if self.campaign_file and not self._replaying:
+            Campaign.save(self.campaign_file, self.strategy_name, self.params, self.campaign_results, finished)
+
+    def _save_summary(self):
+        """Middel-score og standardfejl pr. parameter-tupel (skrives når søgningen er færdig og efter gentagelser)"""
+        if self.summary_file and not self._replaying:
+            DataLogger.write_autotune_summary(self.summary_file, self.repeats.statistics())
+
+    def report_result(self, job, score, elapsed_s=None, aborted=False, cached=False, metrics=None):
+        """
+        Giver strategien scoren for et afsluttet job. elapsed_s er den faktiske kørselstid,
+        metrics den fulde metrik-vektor (ScoreCalculator.calculate_run_metrics) hvis den kendes.
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        key = self.strategy.job_key(job)
+        is_repeat = self.is_repeat(job)
+        if is_repeat:
+            self._pending_repeats[key] -= 1
+            if self._pending_repeats[key] == 0:
+                del self._pending_repeats[key]
+        self.results.append((job, score))
+        self.campaign_results.append({'job': job, 'score': score, 'elapsed_s': elapsed_s, 'aborted': aborted,
+                                      'cached': cached, 'metrics': metrics, 'repeat': is_repeat})
+        if aborted:
+            self.num_aborted += 1
+        if cached:
+            self.num_cached += 1
+        self.robot_time_s += job.get('duration_s', self.duration_s) if elapsed_s is None else elapsed_s
+        if not aborted and self.is_full_duration(job):
+            # En afbrudt kørsel har kun en delvis score, og et kort halving-trin er ikke
+            # sammenligneligt med fulde kørsler - ingen af dem tæller som kandidat
+            self.repeats.add(key, job, score)
+        best_job, best_mean = self.repeats.best()
+        if best_job is not None:
+            self.best_job, self.best_score = best_job, best_mean
+        if not is_repeat:
+            if metrics is not None and not aborted:
+                # En afbrudt kørsel har kun metrikker for en del af tiden
+                self.strategy.report_metrics(job, metrics)
+            self.strategy.report(job, score)
+        self._save_campaign()
+        if self._strategy_done:
+            self._save_summary()
+        if self.strategy.pareto_front is not None and self.pareto_file and not self._replaying:
+            DataLogger.write_pareto_front(self.pareto_file, self.strategy.pareto_front.rows())
+
+    def is_finished(self):
+        """True når strategien ikke har flere jobs og intet job er udestående."""
+        return self.current_job is None and self.in_flight == 0 and self.current_job_index > 0
+
+    def get_robot_time_summary(self):
+        """Returnerer brugt robot-tid sammenlignet med det fulde gitter."""
+        exhaustive = self.strategy.exhaustive_robot_time()
+        saved = 100.0 * (1.0 - self.robot_time_s / exhaustive) if exhaustive else 0.0
+        summary = f"Robot-tid: {self.robot_time_s:.0f}s (fuldt gitter: {exhaustive:.0f}s, sparet {saved:.0f}%)"
+        if self.num_aborted:
+            summary += f", {self.num_aborted} kørsler afbrudt tidligt"
+        if self.num_cached:
+            summary += f", {self.num_cached} jobs genbrugt fra historikken"
+        if self.strategy.summary():
+            summary += f", {self.strategy.summary()}"
+        if self.repeats.summary():
+            summary += f", {self.repeats.summary()}"
+        return summary
+
+    @staticmethod
+    def format_job(job):
+        """Kort tekst for et job, f.eks. KP=18.00, KD=0.20, KI=0.10"""
+        return ", ".join(f"{name.upper()}={value:.2f}" for name, value in job.items() if name != 'duration_s')
 
     def get_progress(self):
         """Returnerer en status-streng, f.eks. "5/125"."""
-        return f"{self.current_job_index}/{self.total_jobs}"
\ No newline at end of file
+        return f"{self.current_job_index}/{self.total_jobs}"
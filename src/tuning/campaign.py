@@ -0,0 +1,84 @@
+# src/tuning/campaign.py
+"""
+Checkpoint-fil for en auto-tune kampagne
+
+Filen gemmer søgerummet (tune_params), strategiens navn og alle afsluttede
+jobs med score i rækkefølge. Strategierne er deterministiske givet deres seed
+og de rapporterede scores, så strategiens tilstand genskabes ved at afspille
+de gemte resultater igen (propose/report) uden at køre robotten.
+"""
+
+import os
+import json
+import datetime
+import numpy as np
+
+
+class Campaign:
+    """Læsning og skrivning af kampagne-filer"""
+
+    @staticmethod
+    def _to_builtin(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, dict):
+            return {key: Campaign._to_builtin(val) for key, val in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [Campaign._to_builtin(val) for val in value]
+        return value
+
+    @staticmethod
+    def save(filename, strategy, tune_params, results, finished=False):
+        """
+        Gem kampagnen atomisk (skriv til en midlertidig fil og omdøb), så et
+        nedbrud under skrivning ikke efterlader en halv fil.
+
+        Args:
+            results: Liste af dicts med 'job', 'score', 'elapsed_s', 'aborted' og 'cached'
+        """
+        state = {
+            'strategy': strategy,
+            'tune_params': Campaign._to_builtin(tune_params),
+            'results': Campaign._to_builtin(results),
+            'finished': finished,
+            'updated': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        tmp_filename = filename + ".tmp"
+        try:
+            with open(tmp_filename, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_filename, filename)
+            return True
+        except (IOError, OSError) as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke gemme kampagne {filename}: {e}")
+            return False
+
+    @staticmethod
+    def load(filename):
+        """Returnér kampagnens tilstand som dict, eller None hvis filen mangler/er ugyldig"""
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'r') as f:
+                state = json.load(f)
+        except (IOError, ValueError) as e:
+            print(f"AUTO-TUNE ERROR: Kunne ikke læse kampagne {filename}: {e}")
+            return None
+        if not all(key in state for key in ('strategy', 'tune_params', 'results')):
+            print(f"AUTO-TUNE ERROR: Kampagne-filen {filename} mangler felter.")
+            return None
+        return state
+
+    @staticmethod
+    def is_unfinished(filename):
+        state = Campaign.load(filename)
+        return state is not None and not state.get('finished', False)
+
+    @staticmethod
+    def jobs_match(job_a, job_b, tolerance):
+        """Float-tolerant sammenligning af to jobs (samme nøgler, værdier inden for tolerance)"""
+        if set(job_a) != set(job_b):
+            return False
+        return all(abs(float(job_a[key]) - float(job_b[key])) <= tolerance for key in job_a)
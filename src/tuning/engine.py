@@ -0,0 +1,498 @@
+# src/tuning/engine.py
+"""
+GUI-uafhængig motor for automatisk tuning
+
+AutoTuneEngine indeholder hele auto-tune forløbet: hent næste job, send og
+verificér parametre, start kørslen, afbryd ved væltning/score-grænse/tid, vent
+på robottens score (med watchdog) og giv den videre til søgestrategien.
+
+Motoren drives af en scheduler med samme interface som Tk's root.after:
+    after(delay_ms, callback) -> id,  cancel(id),  call_soon(callback)
+I GUI'en er det Tk's event-loop; headless bruges EventLoop herunder. Alle
+callbacks fra seriel-tråden sendes via call_soon, så motorens tilstand kun
+ændres fra én tråd.
+
+Visninger (Tk, CLI) abonnerer på hændelser med add_listener(callback), der
+kaldes som callback(event, data) med en JSON-venlig dict.
+
+Dødtid mellem jobs holdes nede ved at uploade parametre (i en baggrundstråd)
+mens robotten falder til ro efter forrige kørsel. Kørslen starter så snart
+begge dele er klar, og tiden i hver fase logges pr. job ('timing' hændelsen).
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from config.settings import (
+    AUTOTUNE_RESULTS_FILE,
+    SCORE_RESULT_TIMEOUT_S,
+    FAILED_SCORE,
+    FAILED_JOB_RETRY_DELAY_S,
+    RECONNECT_POLL_S,
+    RECONNECT_TIMEOUT_S,
+    STILL_PITCH_DEG,
+    STILL_RATE_DPS,
+    STILL_SAMPLES,
+    STILL_TIMEOUT_S,
+    EARLY_ABORT_ENABLED,
+    EARLY_ABORT_FRACTION,
+    FALLEN_PITCH_THRESHOLD_DEG,
+    TAG_CSV,
+    TAG_FALLEN,
+    TAG_SCORE_RESULT
+)
+from communication.serial_handler import SerialThread
+from datalogger.data_logger import DataLogger
+from analysis.score_bound import ScoreUpperBound
+from analysis.score_calculator import ScoreCalculator
+from tuning.auto_tuner import AutoTuner
+
+# Faserne i et job, i rækkefølge. upload og settle overlapper; 'start' er den
+# samlede ventetid før målingen (= max af de to), 'gap' er tiden fra forrige
+# jobs score til dette job blev hentet.
+TIMING_PHASES = ("gap", "upload", "settle", "start", "run", "score")
+
+
+class EventLoop:
+    """
+    Minimal event-loop med timere til headless kørsel (samme interface som Tk's after)
+
+    time_scale > 1 afkorter alle timere med den faktor, så en simuleret robot
+    der kører hurtigere end realtid (SimulatedRobot(speed=time_scale)) får
+    kørsler af den rigtige simulerede længde.
+    """
+
+    def __init__(self, time_scale=1.0):
+        self.time_scale = time_scale
+        self._timers = []
+        self._cancelled = set()
+        self._calls = queue.Queue()
+        self._ids = itertools.count(1)
+        self._running = False
+
+    def after(self, delay_ms, callback):
+        timer_id = next(self._ids)
+        heapq.heappush(self._timers, (time.monotonic() + delay_ms / 1000.0 / self.time_scale, timer_id, callback))
+        return timer_id
+
+    def cancel(self, timer_id):
+        self._cancelled.add(timer_id)
+
+    def call_soon(self, callback):
+        """Trådsikker - bruges fra seriel-tråden"""
+        self._calls.put(callback)
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        """Kør indtil stop() kaldes"""
+        self._running = True
+        while self._running:
+            timeout = 0.1
+            if self._timers:
+                timeout = min(timeout, max(0.0, self._timers[0][0] - time.monotonic()))
+            try:
+                self._calls.get(timeout=timeout)()
+            except queue.Empty:
+                pass
+            while self._running and self._timers and self._timers[0][0] <= time.monotonic():
+                _, timer_id, callback = heapq.heappop(self._timers)
+                if timer_id in self._cancelled:
+                    self._cancelled.discard(timer_id)
+                    continue
+                callback()
+
+
+class StillDetector:
+    """Robotten er rolig når |pitch| og |rate| har været under grænserne i `samples` samples i træk"""
+
+    def __init__(self, pitch_deg=STILL_PITCH_DEG, rate_dps=STILL_RATE_DPS, samples=STILL_SAMPLES):
+        self.pitch_deg = pitch_deg
+        self.rate_dps = rate_dps
+        self.samples = samples
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def update(self, pitch, rate):
+        if abs(pitch) < self.pitch_deg and abs(rate) < self.rate_dps:
+            self.count += 1
+        else:
+            self.count = 0
+        return self.count >= self.samples
+
+
+class PhaseTimer:
+    """Tidsstempler for ét jobs faser og akkumulerede totaler over kampagnen"""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(TIMING_PHASES, 0.0)
+        self.num_jobs = 0
+        self.last_finish = None
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = time.monotonic()
+
+    def _span(self, start, end):
+        if start in self.marks and end in self.marks:
+            return max(0.0, self.marks[end] - self.marks[start])
+        return 0.0
+
+    def job_started(self):
+        self.marks = {}
+        self.mark('job')
+
+    def job_finished(self):
+        """Afslut jobbet og returnér dets fase-tider (sekunder)"""
+        self.mark('done')
+        phases = {
+            'gap': max(0.0, self.marks['job'] - self.last_finish) if self.last_finish is not None else 0.0,
+            'upload': self._span('job', 'uploaded'),
+            'settle': self._span('job', 'still'),
+            'start': self._span('job', 'run_start'),
+            'run': self._span('run_start', 'run_stop'),
+            'score': self._span('run_stop', 'done'),
+        }
+        self.last_finish = self.marks['done']
+        self.num_jobs += 1
+        for name, value in phases.items():
+            self.totals[name] += value
+        return phases
+
+    def summary(self):
+        """Tekst med gennemsnitlig tid pr. fase og andelen af tiden der faktisk måles"""
+        if not self.num_jobs:
+            return ""
+        n = self.num_jobs
+        dead = self.totals['gap'] + self.totals['start'] + self.totals['score']
+        measuring = 100.0 * self.totals['run'] / max(dead + self.totals['run'], 1e-9)
+        return (f"Tid pr. job: mellem jobs {self.totals['gap'] / n:.2f}s, upload {self.totals['upload'] / n:.2f}s, "
+                f"indsvingning {self.totals['settle'] / n:.2f}s, ventetid før start {self.totals['start'] / n:.2f}s, "
+                f"måling {self.totals['run'] / n:.1f}s, score {self.totals['score'] / n:.2f}s "
+                f"(måletid {measuring:.0f}% af total)")
+
+
+class AutoTuneEngine:
+    """Auto-tune forløbet for én robot, uafhængigt af GUI"""
+
+    def __init__(self, serial_thread, scheduler, results_file=AUTOTUNE_RESULTS_FILE):
+        self.serial_thread = serial_thread
+        self.scheduler = scheduler
+        self.results_file = results_file
+        self.listeners = []
+
+        self.autotuner = None
+        self.is_active = False
+        self.is_running_test = False
+        # Parametre der ikke tunes (f.eks. GUI'ens parameterfelter) - sendes sammen med hvert job
+        self.base_params = {}
+
+        self.current_run_data = []
+        self.run_start_time_esp_ms = 0
+        self.first_data_line_in_run_received = False
+        self.score_bound = None
+        self.early_aborted = False
+
+        # Forberedelse af næste kørsel: parametre uploades mens robotten falder til ro
+        self.is_preparing = False
+        self.params_ready = False
+        self.robot_still = False
+        self.still_detector = StillDetector()
+        self.timing = PhaseTimer()
+
+        self.autostop_timer_id = None
+        self.score_watchdog_timer_id = None
+        self.still_timeout_timer_id = None
+        self.reconnect_timer_id = None
+
+    # --- Hændelser -----------------------------------------------------------
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _emit(self, event, **data):
+        for callback in self.listeners:
+            callback(event, data)
+
+    def _cancel_timer(self, attr):
+        timer_id = getattr(self, attr)
+        if timer_id is not None:
+            self.scheduler.cancel(timer_id)
+            setattr(self, attr, None)
+
+    # --- Start/stop --------------------------------------------------------
+
+    def start(self, autotuner, base_params=None):
+        """Start tuning med en færdigbygget AutoTuner"""
+        self.autotuner = autotuner
+        self.base_params = dict(base_params or {})
+        autotuner.base_params = self.base_params
+        self.is_active = True
+        print("--- STARTER AUTOMATISK TUNING ---")
+        self._emit('started', strategy=autotuner.strategy_name, total_jobs=autotuner.total_jobs)
+        self._tick()
+
+    def stop(self, reason="Afbrudt af bruger"):
+        """Afbryd tuningen. Kampagnen er gemt løbende og kan genoptages."""
+        if not self.is_active:
+            return
+        self.is_active = False
+        if self.is_running_test:
+            self._stop_run(reason)
+        elif self.is_preparing:
+            self._end_preparation()
+            if self.serial_thread.is_connected():
+                self.serial_thread.send_command("csv_off")
+        self._cancel_timer('score_watchdog_timer_id')
+        self._cancel_timer('reconnect_timer_id')
+        print("--- AUTOMATISK TUNING AFBRUDT ---")
+        self._emit('stopped', reason=reason, jobs=self.autotuner.current_job_index)
+
+    def _tick(self):
+        """Hent og start næste job, eller afslut når strategien er færdig"""
+        if not self.is_active or self.is_running_test:
+            return
+
+        job = self.autotuner.get_next_job()
+        self.timing.job_started()
+        if job is None:
+            self.is_active = False
+            summary = self.autotuner.get_robot_time_summary()
+            print("--- AUTOMATISK TUNING FÆRDIG ---")
+            print(summary)
+            if self.timing.num_jobs:
+                print(self.timing.summary())
+            self._emit('finished', jobs=self.autotuner.current_job_index, best_job=self.autotuner.best_job,
+                       best_score=self.autotuner.best_score if self.autotuner.best_job else None, summary=summary,
+                       timing=self.timing.summary())
+            return
+
+        status_msg = f"Tester {self.autotuner.get_progress()}: {AutoTuner.format_job(job)}"
+        if 'duration_s' in job:
+            status_msg += f" ({job['duration_s']:.0f}s)"
+        print(status_msg)
+        self._emit('job', index=self.autotuner.current_job_index, total=self.autotuner.total_jobs,
+                   job=job, status=status_msg)
+
+        self._prepare_job(job)
+
+    def _prepare_job(self, job, waited_s=0.0):
+        """Upload parametrene og vent på at robotten er rolig. Uden forbindelse ventes der på robotten."""
+        self.reconnect_timer_id = None
+        if not self.is_active or job is not self.autotuner.current_job:
+            return
+        if not self.serial_thread.is_connected():
+            # Jobbet scores ikke - ellers ville en tabt forbindelse brænde hele kampagnen af med straf-scores
+            if waited_s >= RECONNECT_TIMEOUT_S:
+                print(f"AUTO-TUNE ERROR: Ingen forbindelse til robotten i {RECONNECT_TIMEOUT_S:.0f}s. Stopper.")
+                self.stop("Forbindelsen til robotten er tabt")
+                return
+            if waited_s == 0.0:
+                print("AUTO-TUNE: Ikke forbundet til robotten - venter på forbindelsen...")
+                self._emit('status', message="Ikke forbundet - venter på robotten")
+            self.reconnect_timer_id = self.scheduler.after(
+                int(RECONNECT_POLL_S * 1000), lambda: self._prepare_job(job, waited_s + RECONNECT_POLL_S))
+            return
+
+        # Kun de tunede parametre ændres - resten beholder værdierne i base_params
+        params = dict(self.base_params)
+        params.update({name: value for name, value in job.items() if name != 'duration_s'})
+
+        # Upload og indsvingning kører samtidig: CSV-streamen bruges til at se
+        # hvornår robotten er rolig, mens parametrene sendes fra en baggrundstråd
+        self.is_preparing = True
+        self.params_ready = False
+        self.robot_still = False
+        self.still_detector.reset()
+        self.serial_thread.send_command("csv_on")
+        self.still_timeout_timer_id = self.scheduler.after(int(STILL_TIMEOUT_S * 1000),
+                                                           lambda: self._on_still_timeout(job))
+        # Verifikationen melder tilbage fra seriel-tråden
+        on_verified = lambda success, message: self.scheduler.call_soon(
+            lambda: self._on_params_verified(job, success, message))
+        threading.Thread(target=self.serial_thread.send_parameters_with_verification,
+                         args=(params, on_verified), daemon=True).start()
+
+    def _end_preparation(self):
+        self.is_preparing = False
+        self._cancel_timer('still_timeout_timer_id')
+
+    def _on_params_verified(self, job, success, message):
+        if not self.is_active or job is not self.autotuner.current_job:
+            return
+        self.timing.mark('uploaded')
+        if not success:
+            print(f"FEJL: Kunne ikke verificere parametre for {job}. Skipper test. Fejl: {message}")
+            self._emit('status', message=f"Verifikation fejlede: {message}")
+            if self.is_preparing:
+                self._end_preparation()
+                if self.serial_thread.is_connected():
+                    self.serial_thread.send_command("csv_off")
+            if not self.serial_thread.is_connected():
+                # Forbindelsen forsvandt under upload - samme job prøves igen når robotten er tilbage
+                self._prepare_job(job)
+                return
+            self._finish_job(job, FAILED_SCORE, failed=True)
+            self.scheduler.after(int(FAILED_JOB_RETRY_DELAY_S * 1000), self._tick)
+            return
+        print("SUCCESS: Parametre verificeret.")
+        self.params_ready = True
+        self._maybe_start_run(job)
+
+    def _on_still_timeout(self, job):
+        self.still_timeout_timer_id = None
+        if not self.is_preparing or job is not self.autotuner.current_job:
+            return
+        print(f"ADVARSEL: Robotten faldt ikke til ro inden for {STILL_TIMEOUT_S:.0f}s - starter alligevel.")
+        self._emit('status', message="Robotten er ikke rolig - starter alligevel")
+        self._on_robot_still(job)
+
+    def _on_robot_still(self, job):
+        if not self.robot_still:
+            self.robot_still = True
+            self.timing.mark('still')
+        self._maybe_start_run(job)
+
+    def _maybe_start_run(self, job):
+        """Start kørslen når parametrene er bekræftet og robotten er rolig"""
+        if self.is_preparing and self.params_ready and self.robot_still:
+            self._end_preparation()
+            print("Parametre verificeret og robotten er rolig. Starter test...")
+            self._start_run(job)
+
+    # --- Kørsel ------------------------------------------------------------
+
+    def _start_run(self, job):
+        duration_s = int(round(job.get('duration_s', self.autotuner.duration_s)))
+        self.current_run_data = []
+        self.first_data_line_in_run_received = False
+        self.early_aborted = False
+        # Gentagelser afbrydes ikke - de køres netop for at få en fuld score mere
+        strategy = self.autotuner.strategy
+        use_bound = (EARLY_ABORT_ENABLED and strategy.scalar_score and strategy.early_abort
+                     and not self.autotuner.is_rerun(job))
+        self.score_bound = ScoreUpperBound(duration_s) if use_bound else None
+        self.is_running_test = True
+        self.timing.mark('run_start')
+        self._emit('run_started', job=job, duration_s=duration_s)
+
+        self.serial_thread.send_command("score_start")  # Start scoring på ESP32 (CSV-stream kører allerede)
+        self.autostop_timer_id = self.scheduler.after(duration_s * 1000, lambda: self._stop_run("Auto-test færdig"))
+
+    def _stop_run(self, reason):
+        """Stop kørslen og bed robotten om scoren (watchdog hvis den ikke kommer)"""
+        self._cancel_timer('autostop_timer_id')
+        if not self.is_running_test:
+            return
+        self.is_running_test = False
+        self.score_bound = None
+        self.timing.mark('run_stop')
+        if self.serial_thread.is_connected():
+            self.serial_thread.send_command("score_stop")  # Bed ESP32 om at stoppe og sende score
+            self.serial_thread.send_command("csv_off")     # Stop CSV-stream
+        self._emit('run_stopped', reason=reason)
+        if self.is_active:
+            self.score_watchdog_timer_id = self.scheduler.after(int(SCORE_RESULT_TIMEOUT_S * 1000),
+                                                                self._on_score_timeout)
+
+    def handle_line(self, line):
+        """
+        Behandl en linje fra robotten. Returnerer True hvis linjen hørte til
+        auto-tune forløbet, så visningen kan ignorere den.
+        """
+        if not self.is_active:
+            return False
+        if line.startswith(TAG_SCORE_RESULT):
+            self._handle_score_result(line)
+            return True
+        if line.startswith(TAG_CSV):
+            self._handle_csv_data(line)
+            return True
+        if line.startswith(TAG_FALLEN):
+            if self.is_running_test:
+                self._stop_run("Væltet (Signal fra Robot)")
+            return True
+        return False
+
+    def _handle_csv_data(self, line):
+        if not (self.is_running_test or self.is_preparing):
+            return
+        data_tuple = SerialThread.parse_csv_line(line)
+        if data_tuple is None:
+            return
+        if self.is_preparing:
+            # Før kørslen: vent på at pitch og rate har været små i STILL_SAMPLES samples
+            if self.still_detector.update(data_tuple[1], data_tuple[2]):
+                self._on_robot_still(self.autotuner.current_job)
+            return
+        time_ms_esp, pitch = data_tuple[0], data_tuple[1]
+        if not self.first_data_line_in_run_received:
+            self.run_start_time_esp_ms = time_ms_esp
+            self.first_data_line_in_run_received = True
+
+        current_time_s_relative = (time_ms_esp - self.run_start_time_esp_ms) / 1000.0
+        full_data_tuple = (time_ms_esp, current_time_s_relative) + data_tuple[1:]
+        self.current_run_data.append(full_data_tuple)
+        self._emit('sample', data=full_data_tuple)
+
+        # Afbryd kørsler der ikke længere kan nå tæt på den bedste score
+        if self.score_bound is not None:
+            self.score_bound.update(full_data_tuple)
+            if self.score_bound.is_hopeless(self.autotuner.best_score):
+                print(f"AUTO-TUNE: Øvre score-grænse {self.score_bound.upper_bound():.1f} efter "
+                      f"{current_time_s_relative:.1f}s er under {EARLY_ABORT_FRACTION:.0%} af bedste "
+                      f"({self.autotuner.best_score:.1f}). Afbryder.")
+                self.early_aborted = True
+                self._stop_run("Håbløs (score-grænse)")
+                return
+
+        if abs(pitch) > FALLEN_PITCH_THRESHOLD_DEG:
+            self._stop_run("Væltet (Pitch Threshold)")
+
+    def _handle_score_result(self, line):
+        self._cancel_timer('score_watchdog_timer_id')
+        job = self.autotuner.current_job
+        if job is None or self.is_running_test:
+            return
+        print(f"PYTHON RECEIVED SCORE: {line}")
+        data = SerialThread.parse_score_result(line)
+        if data is None:
+            print(f"Score-beregning fejlede på robot: {line}")
+            score = FAILED_SCORE
+        else:
+            score = data.get('score', 0)
+        elapsed_s = self.current_run_data[-1][1] if self.current_run_data else None
+        metrics = ScoreCalculator.calculate_run_metrics(self.current_run_data, data)
+        self._finish_job(job, score, elapsed_s, self.early_aborted, metrics, failed=data is None)
+        self.scheduler.after(0, self._tick)  # Næste job - upload overlapper med at robotten falder til ro
+
+    def _on_score_timeout(self):
+        """Watchdog: robotten sendte ingen score - giv straf-score og fortsæt"""
+        self.score_watchdog_timer_id = None
+        if not self.is_active:
+            return
+        print("WATCHDOG: Timeout - modtog ikke score fra robot. Fortsætter til næste test.")
+        self._emit('status', message="Timeout! Starter næste test...")
+        if self.autotuner.current_job is not None:
+            self._finish_job(self.autotuner.current_job, FAILED_SCORE, failed=True)
+        self.scheduler.after(int(FAILED_JOB_RETRY_DELAY_S * 1000), self._tick)
+
+    def _finish_job(self, job, score, elapsed_s=None, aborted=False, metrics=None, failed=False):
+        """Log resultatet og giv scoren videre til søgestrategien. failed: jobbet gav ingen rigtig score."""
+        extra = {"Aborted": int(aborted), "Failed": int(failed)}
+        if elapsed_s is not None:
+            extra["Elapsed_s"] = f"{elapsed_s:.1f}"
+        phases = self.timing.job_finished()
+        print("TIMING: " + ", ".join(f"{name} {value:.2f}s" for name, value in phases.items()))
+        self._emit('timing', index=self.autotuner.current_job_index,
+                   **{f"{name}_s": round(value, 3) for name, value in phases.items()})
+        DataLogger.write_autotune_result(self.results_file, job, score, extra, metrics)
+        self.autotuner.report_result(job, score, elapsed_s, aborted, metrics=metrics)
+        self._emit('result', index=self.autotuner.current_job_index, total=self.autotuner.total_jobs, job=job,
+                   score=score, elapsed_s=elapsed_s, aborted=aborted, best_job=self.autotuner.best_job,
+                   best_score=self.autotuner.best_score)
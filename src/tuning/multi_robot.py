@@ -0,0 +1,336 @@
+# src/tuning/multi_robot.py
+"""
+Parallel auto-tuning med flere identiske robotter
+
+Hver robot får sin egen RobotWorker (tråd + SerialThread) og henter jobs fra
+en fælles kø. Scheduleren holder højst ét job i gang pr. robot, så en kampagne
+går omtrent N gange hurtigere med N robotter.
+
+Robotterne er ikke helt ens (batteri, friktion, IMU-montering). Derfor kører
+hver robot med jævne mellemrum en reference-konfiguration (DEFAULT_PID_PARAMS).
+En robots bias er forskellen mellem dens gennemsnitlige reference-score og
+gennemsnittet over alle robotter, og den trækkes fra robottens øvrige scores
+før de gives til søgestrategien.
+"""
+
+import queue
+import threading
+import time
+from config.settings import (
+    BAUD_RATE,
+    FAILED_SCORE,
+    DEFAULT_PID_PARAMS,
+    TAG_CSV,
+    TAG_FALLEN,
+    TAG_SCORE_RESULT,
+    AUTOTUNE_RESULTS_FILE,
+    MULTI_ROBOT_REFERENCE_INTERVAL,
+    MULTI_ROBOT_CONNECT_TIMEOUT_S,
+    PARAM_VERIFY_TIMEOUT_S,
+    SCORE_RESULT_TIMEOUT_S,
+    RECONNECT_POLL_S,
+    RECONNECT_TIMEOUT_S
+)
+from communication.serial_handler import SerialThread
+from datalogger.data_logger import DataLogger
+from analysis.score_calculator import ScoreCalculator
+from tuning.auto_tuner import AutoTuner
+
+
+class RobotWorker(threading.Thread):
+    """
+    Kører jobs fra en fælles kø på én robot (headless, uden GUI)
+
+    Resultater lægges på result_queue som (robot_id, job, score, elapsed_s, is_reference, metrics).
+    score er None hvis parametrene ikke kunne verificeres eller robotten meldte fejl.
+
+    Mister robotten forbindelsen, lægges jobbet tilbage i køen, og der ventes op til
+    RECONNECT_TIMEOUT_S på robotten. Kommer den ikke igen, stopper workeren og melder
+    sig ud med (robot_id, None, None, 0.0, False, None).
+    """
+
+    def __init__(self, robot_id, port, job_queue, result_queue, base_params=None, baudrate=BAUD_RATE,
+                 reference_interval=MULTI_ROBOT_REFERENCE_INTERVAL, reference_duration_s=None):
+        super().__init__(daemon=True)
+        self.robot_id = robot_id
+        self.job_queue = job_queue
+        self.result_queue = result_queue
+        # Parametre der ikke tunes beholder disse værdier (svarer til GUI'ens parameterfelter)
+        self.base_params = dict(base_params or DEFAULT_PID_PARAMS)
+        self.reference_interval = reference_interval
+        self.reference_duration_s = reference_duration_s
+        # None = reference før første job; uden referencer tælles der blot
+        self.jobs_since_reference = None if reference_interval > 0 else 0
+        self._stop_event = threading.Event()
+        self._fallen = threading.Event()
+        self._score_received = threading.Event()
+        self._score_data = None
+        self._run_data = []
+        self._run_start_ms = None
+        self.serial_thread = SerialThread(port, baudrate, self._on_line, self._on_status)
+
+    def _on_status(self, message):
+        print(f"ROBOT {self.robot_id}: {message}")
+
+    def _on_line(self, line):
+        """Kaldes fra SerialThread - signalerer kun til worker-tråden"""
+        if line.startswith(TAG_CSV):
+            values = SerialThread.parse_csv_line(line)
+            if values is not None and not self._score_received.is_set():
+                if self._run_start_ms is None:
+                    self._run_start_ms = values[0]
+                self._run_data.append((values[0], (values[0] - self._run_start_ms) / 1000.0) + values[1:])
+        elif line.startswith(TAG_SCORE_RESULT):
+            self._score_data = SerialThread.parse_score_result(line)
+            self._score_received.set()
+        elif line.startswith(TAG_FALLEN):
+            self._fallen.set()
+
+    def wait_connected(self, timeout=MULTI_ROBOT_CONNECT_TIMEOUT_S):
+        end = time.time() + timeout
+        while time.time() < end:
+            if self.serial_thread.is_connected():
+                return True
+            if not self.serial_thread.is_alive():
+                return False
+            time.sleep(0.1)
+        return False
+
+    def start(self):
+        self.serial_thread.start()
+        super().start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.serial_thread.stop()
+
+    def _apply_parameters(self, job):
+        """Send parametrene og vent på robottens bekræftelse"""
+        params = dict(self.base_params)
+        params.update({name: value for name, value in job.items() if name != 'duration_s'})
+        verified = threading.Event()
+        outcome = {}
+
+        def on_verified(success, message):
+            outcome['success'], outcome['message'] = success, message
+            verified.set()
+
+        self.serial_thread.send_parameters_with_verification(params, on_verified)
+        if not verified.wait(PARAM_VERIFY_TIMEOUT_S) or not outcome['success']:
+            print(f"ROBOT {self.robot_id}: Kunne ikke verificere {AutoTuner.format_job(job)}: "
+                  f"{outcome.get('message', 'timeout')}")
+            return False
+        return True
+
+    def run_job(self, job, duration_s):
+        """Kør ét job på robotten. Returnerer (score eller None, elapsed_s, metrikker eller None)."""
+        if not self._apply_parameters(job):
+            return None, 0.0, None
+
+        self._fallen.clear()
+        self._score_received.clear()
+        self._score_data = None
+        self._run_data = []
+        self._run_start_ms = None
+        self.serial_thread.send_command("score_start")
+        self.serial_thread.send_command("csv_on")
+        start = time.time()
+        # Kørslen slutter efter duration_s, ved TAG_FALLEN eller når scheduleren stoppes
+        while not self._fallen.wait(0.1):
+            if self._stop_event.is_set() or time.time() - start >= duration_s:
+                break
+        elapsed_s = time.time() - start
+        self.serial_thread.send_command("score_stop")
+        self.serial_thread.send_command("csv_off")
+
+        if not self._score_received.wait(SCORE_RESULT_TIMEOUT_S):
+            print(f"ROBOT {self.robot_id}: Ingen score modtaget inden for {SCORE_RESULT_TIMEOUT_S:.0f}s.")
+            return None, elapsed_s, None
+        if self._score_data is None:
+            print(f"ROBOT {self.robot_id}: Score-beregning fejlede på robot.")
+            return None, elapsed_s, None
+        metrics = ScoreCalculator.calculate_run_metrics(list(self._run_data), self._score_data)
+        return self._score_data.get('score', 0), elapsed_s, metrics
+
+    def _run_reference_if_due(self):
+        if self.reference_interval <= 0:
+            return
+        if self.jobs_since_reference is not None and self.jobs_since_reference < self.reference_interval:
+            return
+        reference = {name: DEFAULT_PID_PARAMS[name] for name in ('kp', 'ki', 'kd')}
+        score, elapsed_s, metrics = self.run_job(reference, self.reference_duration_s)
+        if score is None and not self.serial_thread.is_connected():
+            return  # Referencen køres igen når robotten er tilbage
+        self.jobs_since_reference = 0
+        self.result_queue.put((self.robot_id, reference, score, elapsed_s, True, metrics))
+
+    def _wait_for_robot(self):
+        """Vent op til RECONNECT_TIMEOUT_S på forbindelsen. False hvis robotten ikke kom igen."""
+        if self.serial_thread.is_connected():
+            return True
+        print(f"ROBOT {self.robot_id}: Ikke forbundet - venter op til {RECONNECT_TIMEOUT_S:.0f}s på robotten...")
+        end = time.time() + RECONNECT_TIMEOUT_S
+        while time.time() < end and not self._stop_event.is_set():
+            if self.serial_thread.is_connected():
+                print(f"ROBOT {self.robot_id}: Forbindelsen er genoprettet.")
+                return True
+            time.sleep(RECONNECT_POLL_S)
+        return self.serial_thread.is_connected()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self.job_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job is None:
+                break
+            if not self._wait_for_robot():
+                # Jobbet scores ikke - en anden robot tager det
+                self.job_queue.put(job)
+                if not self._stop_event.is_set():
+                    print(f"AUTO-TUNE ERROR: Robot {self.robot_id} kom ikke igen og bruges ikke mere.")
+                self.result_queue.put((self.robot_id, None, None, 0.0, False, None))
+                return
+            try:
+                self._run_reference_if_due()
+                score, elapsed_s, metrics = self.run_job(job, job.get('duration_s', self.reference_duration_s))
+            except Exception as e:
+                # Scheduleren venter på et resultat for hvert job - en død tråd må ikke efterlade den hængende
+                print(f"AUTO-TUNE ERROR: Robot {self.robot_id} fejlede under {AutoTuner.format_job(job)}: {e}")
+                score, elapsed_s, metrics = None, 0.0, None
+            if score is None and not self.serial_thread.is_connected():
+                self.job_queue.put(job)  # Forbindelsen forsvandt - jobbet køres igen
+                continue
+            self.jobs_since_reference += 1
+            self.result_queue.put((self.robot_id, job, score, elapsed_s, False, metrics))
+
+
+class RobotBias:
+    """Estimat af hver robots score-bias ud fra dens reference-kørsler"""
+
+    def __init__(self):
+        self.reference_scores = {}
+
+    def add_reference(self, robot_id, score):
+        self.reference_scores.setdefault(robot_id, []).append(score)
+
+    def bias(self, robot_id):
+        """Robottens gennemsnitlige reference-score minus gennemsnittet over alle robotter (0 uden data)"""
+        if robot_id not in self.reference_scores or len(self.reference_scores) < 2:
+            return 0.0
+        means = {rid: sum(scores) / len(scores) for rid, scores in self.reference_scores.items()}
+        return means[robot_id] - sum(means.values()) / len(means)
+
+    def summary(self):
+        return ", ".join(f"{rid}: {self.bias(rid):+.1f} ({len(scores)} ref.)"
+                         for rid, scores in sorted(self.reference_scores.items()))
+
+
+class MultiRobotScheduler:
+    """Fordeler en AutoTuner's jobs på flere robotter og korrigerer for robot-bias"""
+
+    def __init__(self, autotuner, ports, base_params=None, baudrate=BAUD_RATE,
+                 reference_interval=MULTI_ROBOT_REFERENCE_INTERVAL, results_file=AUTOTUNE_RESULTS_FILE):
+        if not ports:
+            raise ValueError("Mindst én seriel port er påkrævet")
+        self.autotuner = autotuner
+        self.results_file = results_file
+        self.job_queue = queue.Queue()
+        self.result_queue = queue.Queue()
+        self.bias = RobotBias()
+        self.jobs_per_robot = {port: 0 for port in ports}
+        autotuner.base_params = dict(base_params or DEFAULT_PID_PARAMS)
+        self.workers = [RobotWorker(port, port, self.job_queue, self.result_queue, base_params, baudrate,
+                                    reference_interval, autotuner.duration_s)
+                        for port in ports]
+
+    def _connect(self):
+        for worker in self.workers:
+            worker.start()
+        connected = [worker for worker in self.workers if worker.wait_connected()]
+        for worker in self.workers:
+            if worker not in connected:
+                print(f"AUTO-TUNE ERROR: Robot {worker.robot_id} kunne ikke forbindes og bruges ikke.")
+                worker.stop()
+        self.workers = connected
+        return len(connected)
+
+    def _fill(self, outstanding):
+        """Læg jobs i køen indtil hver robot har ét. Returnerer (outstanding, strategi-færdig)."""
+        while outstanding < len(self.workers):
+            job = self.autotuner.get_next_job()
+            if job is None:
+                # Strategien venter enten på udestående scores eller er færdig
+                return outstanding, outstanding == 0
+            self.job_queue.put(job)
+            outstanding += 1
+        return outstanding, False
+
+    def _retire(self, robot_id):
+        """En worker har opgivet sin robot; dens job ligger allerede i køen igen"""
+        for worker in self.workers:
+            if worker.robot_id == robot_id:
+                worker.stop()
+        self.workers = [worker for worker in self.workers if worker.robot_id != robot_id]
+
+    def _handle_result(self, robot_id, job, raw_score, elapsed_s, is_reference, metrics):
+        if is_reference:
+            if raw_score is not None:
+                self.bias.add_reference(robot_id, raw_score)
+            print(f"AutoTuner: Reference på {robot_id}: "
+                  f"{'fejl' if raw_score is None else f'{raw_score:.2f}'} - bias {self.bias.summary()}")
+            return
+        self.jobs_per_robot[robot_id] += 1
+        failed = raw_score is None
+        if failed:
+            score = raw_score = FAILED_SCORE
+        else:
+            score = raw_score - self.bias.bias(robot_id)
+        print(f"AutoTuner: {robot_id} {AutoTuner.format_job(job)} -> {score:.2f} (rå {raw_score:.2f})")
+        DataLogger.write_autotune_result(self.results_file, job, score, {
+            "Elapsed_s": f"{elapsed_s:.1f}", "Aborted": 0, "Failed": int(failed),
+            "Robot": robot_id, "RawScore": f"{raw_score:.2f}"
+        }, metrics)
+        self.autotuner.report_result(job, score, elapsed_s, metrics=metrics)
+
+    def run(self):
+        """Kør hele kampagnen. Returnerer antal robotter der blev brugt (0 hvis ingen kunne forbindes)."""
+        if self._connect() == 0:
+            return 0
+        print(f"--- STARTER AUTOMATISK TUNING PÅ {len(self.workers)} ROBOTTER ---")
+        start = time.time()
+        outstanding = 0
+        try:
+            while True:
+                outstanding, finished = self._fill(outstanding)
+                if finished:
+                    break
+                result = self.result_queue.get()
+                if result[1] is None:
+                    self._retire(result[0])
+                    if not self.workers:
+                        print("AUTO-TUNE ERROR: Ingen robotter tilbage. Stopper - kampagnen kan genoptages.")
+                        break
+                    continue
+                if not result[4]:
+                    outstanding -= 1
+                self._handle_result(*result)
+        except KeyboardInterrupt:
+            print("AutoTuner: Afbrudt - kampagnen kan genoptages.")
+        finally:
+            for _ in self.workers:
+                self.job_queue.put(None)
+            for worker in self.workers:
+                worker.join(timeout=SCORE_RESULT_TIMEOUT_S + 1)
+                worker.stop()
+
+        wall_s = time.time() - start
+        print("--- AUTOMATISK TUNING FÆRDIG ---")
+        print(self.autotuner.get_robot_time_summary())
+        print(f"Væg-tid: {wall_s:.0f}s for {sum(self.jobs_per_robot.values())} jobs "
+              f"(robot-tid / væg-tid = {self.autotuner.robot_time_s / max(wall_s, 1e-9):.1f})")
+        print(f"Jobs pr. robot: {', '.join(f'{rid}: {n}' for rid, n in self.jobs_per_robot.items())}")
+        if self.bias.reference_scores:
+            print(f"Robot-bias: {self.bias.summary()}")
+        return len(self.workers)
@@ -0,0 +1,179 @@
+# src/tuning/pareto.py
+"""
+Pareto-front for multi-objektiv tuning
+
+Hvert job har en metrik-vektor (f.eks. pitch RMS, frekvens, degradering og
+positions-RMSE) hvor alle mål minimeres. I stedet for at vægte dem sammen til
+én score holdes alle ikke-dominerede jobs, så afvejningerne kan ses direkte.
+
+Fronterne vedligeholdes inkrementelt som i "efficient non-dominated sort"
+(ENS): et nyt punkt indsættes i den første front hvor intet punkt dominerer
+det, og de punkter det selv dominerer skubbes én front ned.
+"""
+
+import numpy as np
+from config.settings import PARETO_OBJECTIVES
+
+
+def dominates(point, others):
+    """Bool-array: dominerer `point` hver række i `others` (minimering)?"""
+    others = np.atleast_2d(others)
+    return np.all(point <= others, axis=1) & np.any(point < others, axis=1)
+
+
+def is_dominated(point, others):
+    """Domineres `point` af mindst én række i `others`?"""
+    others = np.atleast_2d(others)
+    return bool(np.any(np.all(others <= point, axis=1) & np.any(others < point, axis=1)))
+
+
+def non_dominated(points):
+    """De unikke, ikke-dominerede rækker af `points`"""
+    points = np.unique(np.atleast_2d(points), axis=0)
+    if len(points) < 2:
+        return points
+    less_equal = np.all(points[:, None, :] <= points[None, :, :], axis=2)
+    less = np.any(points[:, None, :] < points[None, :, :], axis=2)
+    dominated = np.any(less_equal & less, axis=0)
+    return points[~dominated]
+
+
+def hypervolume(points, reference):
+    """
+    Eksakt hypervolumen domineret af `points` og afgrænset af `reference`.
+
+    2-D beregnes med en sortering, højere dimensioner ved at skive langs den
+    sidste akse (HSO). Hver skive reduceres til sine ikke-dominerede punkter,
+    så fronter med nogle få dusin punkter i 3-4 dimensioner er hurtige.
+    """
+    reference = np.asarray(reference, dtype=float)
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    if points.size == 0:
+        return 0.0
+    points = points[np.all(points < reference, axis=1)]
+    if len(points) == 0:
+        return 0.0
+    dims = points.shape[1]
+    if dims == 1:
+        return float(reference[0] - points[:, 0].min())
+    if dims == 2:
+        points = points[np.lexsort((points[:, 1], points[:, 0]))]
+        upper = np.concatenate(([reference[1]], np.minimum.accumulate(points[:, 1])[:-1]))
+        heights = np.maximum(upper - points[:, 1], 0.0)
+        return float(np.sum((reference[0] - points[:, 0]) * heights))
+
+    points = non_dominated(points)
+    points = points[np.argsort(points[:, -1], kind='stable')]
+    volume = 0.0
+    for i in range(len(points)):
+        upper = points[i + 1, -1] if i + 1 < len(points) else reference[-1]
+        if upper > points[i, -1]:
+            volume += hypervolume(points[:i + 1, :-1], reference[:-1]) * (upper - points[i, -1])
+    return volume
+
+
+class ParetoFront:
+    """
+    Alle observerede jobs fordelt på ikke-dominerede fronter (rang 1 = Pareto-fronten)
+
+    objectives er en liste af (metrik-navn, referenceværdi). Manglende eller
+    ikke-endelige metrikker, og værdier over referencen, sættes til referencen,
+    så et job der vælter bidrager med nul hypervolumen.
+    """
+
+    def __init__(self, objectives=PARETO_OBJECTIVES):
+        self.names = [name for name, _ in objectives]
+        self.reference = np.array([reference for _, reference in objectives], dtype=float)
+        self.entries = []  # (job, score, metrics, vektor)
+        self.fronts = []   # Lister af indices i entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def vector(self, metrics=None):
+        """Metrik-vektoren for et job, klippet til referencepunktet"""
+        values = np.array([(metrics or {}).get(name, np.inf) for name in self.names], dtype=float)
+        values = np.where(np.isfinite(values), values, self.reference)
+        return np.minimum(values, self.reference)
+
+    def _vectors(self, indices):
+        return np.array([self.entries[i][3] for i in indices])
+
+    def add(self, job, score, metrics=None):
+        """Indsæt et job. Returnerer dets rang (1 = på Pareto-fronten)."""
+        vector = self.vector(metrics)
+        index = len(self.entries)
+        self.entries.append((job, score, metrics or {}, vector))
+
+        rank = 0
+        while rank < len(self.fronts) and is_dominated(vector, self._vectors(self.fronts[rank])):
+            rank += 1
+        inserted_rank = rank
+
+        moving = [index]
+        while moving:
+            if rank == len(self.fronts):
+                self.fronts.append(moving)
+                break
+            front = self.fronts[rank]
+            front_vectors = self._vectors(front)
+            is_demoted = np.zeros(len(front), dtype=bool)
+            for moving_vector in self._vectors(moving):
+                is_demoted |= dominates(moving_vector, front_vectors)
+            demoted = [i for i, flag in zip(front, is_demoted) if flag]
+            self.fronts[rank] = [i for i, flag in zip(front, is_demoted) if not flag] + moving
+            moving = demoted
+            rank += 1
+        return inserted_rank + 1
+
+    def front_vectors(self):
+        if not self.fronts:
+            return np.empty((0, len(self.names)))
+        return self._vectors(self.fronts[0])
+
+    def hypervolume(self):
+        return hypervolume(self.front_vectors(), self.reference)
+
+    def hypervolume_improvement(self, point):
+        """Hvor meget hypervolumen vokser hvis `point` tilføjes fronten"""
+        point = np.asarray(point, dtype=float)
+        if np.any(point >= self.reference):
+            return 0.0
+        box = float(np.prod(self.reference - point))
+        front = self.front_vectors()
+        if len(front) == 0:
+            return box
+        # Den del af punktets boks som fronten allerede dækker
+        covered = hypervolume(np.maximum(front, point), self.reference)
+        return max(box - covered, 0.0)
+
+    def best_improvement(self, points):
+        """
+        Index og værdi for punktet med størst hypervolumen-forbedring.
+
+        Boksens volumen til referencepunktet er en øvre grænse for forbedringen,
+        så punkterne gennemgås i faldende boks-volumen og søgningen stopper når
+        ingen resterende kan slå det bedste. Returnerer (None, 0.0) hvis intet
+        punkt forbedrer fronten.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        bounds = np.prod(np.maximum(self.reference - points, 0.0), axis=1)
+        front = self.front_vectors()
+        best_index, best_value = None, 0.0
+        for i in np.argsort(-bounds, kind='stable'):
+            if bounds[i] <= best_value:
+                break
+            if len(front) and np.any(np.all(front <= points[i], axis=1)):
+                continue  # Dækket af fronten - ingen forbedring
+            value = self.hypervolume_improvement(points[i])
+            if value > best_value:
+                best_index, best_value = int(i), value
+        return best_index, best_value
+
+    def rows(self):
+        """(job, score, metrics, rang) for alle jobs, Pareto-fronten først"""
+        return [(self.entries[i][0], self.entries[i][1], self.entries[i][2], rank + 1)
+                for rank, front in enumerate(self.fronts) for i in sorted(front)]
+
+    def summary(self):
+        return f"Pareto-front med {len(self.fronts[0]) if self.fronts else 0} af {len(self.entries)} jobs"
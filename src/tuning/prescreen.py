@@ -0,0 +1,78 @@
+# src/tuning/prescreen.py
+"""
+Simuleringsbaseret pre-screening af et søgerum før kørsler på robotten
+
+Alle kandidater (eller en tilfældig stikprøve af meget store søgerum) scores
+i batches med en BatchBalanceSimulator (i praksis den identificerede
+WheeledPendulumSimulator). Kandidater der vælter i simuleringen forkastes,
+og resten sorteres efter forventet score.
+"""
+
+import numpy as np
+from config.settings import (
+    SIM_BATCH_SIZE,
+    PRESCREEN_MIN_SCORE,
+    PRESCREEN_MAX_CANDIDATES,
+    PRESCREEN_MAX_SIMULATIONS,
+    SIM_SEED
+)
+from simulation.balance_sim import BatchBalanceSimulator
+
+# Parametre som simulatoren forstår; andre dimensioner får simulatorens standardværdi
+SIMULATED_PARAMS = ("kp", "ki", "kd", "init_balance", "power_gain")
+
+
+class SimulationPrescreen:
+    """Scorer et SearchSpace i simulering og udvælger de lovende kandidater"""
+
+    @staticmethod
+    def _candidate_indices(space, max_simulations, seed):
+        size = len(space)
+        if size <= max_simulations:
+            return np.arange(size, dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        print(f"SIMULERING: Søgerummet har {size} punkter - screener en stikprøve på {max_simulations}.")
+        return np.sort(rng.choice(size, size=max_simulations, replace=False))
+
+    @staticmethod
+    def score_space(space, simulator=None, batch_size=SIM_BATCH_SIZE, max_simulations=PRESCREEN_MAX_SIMULATIONS,
+                    seed=SIM_SEED):
+        """
+        Simulér kandidaterne i batches.
+
+        Returns:
+            tuple: (flade indices, forventet score, stabil-flag) som arrays
+        """
+        simulator = simulator or BatchBalanceSimulator()
+        indices = SimulationPrescreen._candidate_indices(space, max_simulations, seed)
+        scores = np.empty(indices.size)
+        stable = np.empty(indices.size, dtype=bool)
+
+        for start in range(0, indices.size, batch_size):
+            batch = indices[start:start + batch_size]
+            grid = np.unravel_index(batch, space.sizes)
+            params = {name: dim.values[grid[axis]] for axis, (name, dim) in enumerate(zip(space.names, space.dimensions))
+                      if name in SIMULATED_PARAMS}
+            metrics = simulator.evaluate(params.get('kp', 0.0), params.get('ki', 0.0), params.get('kd', 0.0),
+                                         params.get('init_balance', 0.0), params.get('power_gain', 0.0))
+            scores[start:start + batch.size] = metrics['score']
+            stable[start:start + batch.size] = metrics['stable']
+        return indices, scores, stable
+
+    @staticmethod
+    def select(space, min_score=PRESCREEN_MIN_SCORE, max_candidates=PRESCREEN_MAX_CANDIDATES, simulator=None):
+        """
+        Udvælg de lovende kandidater i faldende forventet score.
+
+        Returns:
+            tuple: (liste af (fladt index, forventet score), antal simulerede)
+        """
+        indices, scores, stable = SimulationPrescreen.score_space(space, simulator)
+        keep = stable & (scores >= min_score)
+        kept_indices, kept_scores = indices[keep], scores[keep]
+        order = np.argsort(-kept_scores, kind='stable')[:max_candidates]
+
+        print(f"SIMULERING: {int((~stable).sum())} af {indices.size} kandidater vælter, "
+              f"{int(keep.sum())} er stabile med score >= {min_score:.0f}. "
+              f"{order.size} sendes videre til robotten.")
+        return [(int(kept_indices[i]), float(kept_scores[i])) for i in order], indices.size
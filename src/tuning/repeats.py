@@ -0,0 +1,135 @@
+# src/tuning/repeats.py
+"""
+Støjbevidste gentagelser af de bedste auto-tune kandidater
+
+Én kørsel pr. kandidat giver en støjfyldt score: en god kandidat kan være
+uheldig og en dårlig heldig. Når søgestrategien er færdig, køres kandidater
+igen, men kun hvor rækkefølgen i top-k endnu ikke er statistisk afgjort.
+
+Variansen pr. kandidat estimeres med "shrinkage": kandidatens egen
+stikprøvevarians vægtes sammen med den fælles (poolede) varians fra alle
+kandidater med gentagelser, så også kandidater med én kørsel får en
+fornuftig standardfejl.
+"""
+
+import math
+from scipy import stats
+from config.settings import (
+    REPEAT_TOP_K,
+    REPEAT_MAX_RUNS,
+    REPEAT_BUDGET_RUNS,
+    REPEAT_CONFIDENCE,
+    REPEAT_PRIOR_STD,
+    REPEAT_PRIOR_WEIGHT
+)
+
+
+class RepeatScheduler:
+    """Scores pr. parameter-tupel og valg af næste gentagelse"""
+
+    def __init__(self, top_k=REPEAT_TOP_K, max_runs=REPEAT_MAX_RUNS, budget_runs=REPEAT_BUDGET_RUNS,
+                 confidence=REPEAT_CONFIDENCE, prior_std=REPEAT_PRIOR_STD, prior_weight=REPEAT_PRIOR_WEIGHT):
+        self.top_k = top_k
+        self.max_runs = max_runs
+        self.budget_runs = budget_runs
+        self.z_critical = stats.norm.ppf(confidence)
+        self.prior_std = prior_std
+        self.prior_weight = prior_weight
+        self.candidates = {}  # nøgle -> [job, antal, sum, kvadratsum]
+        self.repeats_used = 0
+        # Kvadratafvigelser og frihedsgrader summeret over kandidaterne (opdateres inkrementelt)
+        self._sum_squares = 0.0
+        self._dof = 0
+
+    @property
+    def enabled(self):
+        return self.top_k > 0 and self.budget_runs > 0
+
+    @staticmethod
+    def _squares(runs, total, total_squares):
+        return max(total_squares - total * total / runs, 0.0) if runs else 0.0
+
+    def add(self, key, job, score):
+        candidate = self.candidates.setdefault(key, [job, 0, 0.0, 0.0])
+        self._sum_squares -= self._squares(*candidate[1:])
+        candidate[1] += 1
+        candidate[2] += score
+        candidate[3] += score * score
+        self._sum_squares += self._squares(*candidate[1:])
+        self._dof += 1 if candidate[1] > 1 else 0
+
+    def _variance(self, runs, total, total_squares, pooled):
+        """Kandidatens egen varians vægtet sammen med den fælles"""
+        return (self.prior_weight * pooled + self._squares(runs, total, total_squares)) / (self.prior_weight + runs - 1)
+
+    def pooled_variance(self):
+        """Fælles score-varians fra alle kandidater med mindst to kørsler, vægtet sammen med prior"""
+        return (self.prior_weight * self.prior_std ** 2 + self._sum_squares) / (self.prior_weight + self._dof)
+
+    def statistics(self):
+        """
+        Aggregat pr. kandidat i faldende middel-score.
+
+        Returns:
+            list: dicts med key, job, runs, mean, std og sem
+        """
+        pooled = self.pooled_variance()
+        rows = []
+        for key, (job, runs, total, total_squares) in self.candidates.items():
+            variance = self._variance(runs, total, total_squares, pooled)
+            rows.append({'key': key, 'job': job, 'runs': runs, 'mean': total / runs,
+                         'std': math.sqrt(variance), 'sem': math.sqrt(variance / runs)})
+        rows.sort(key=lambda row: row['mean'], reverse=True)
+        return rows
+
+    def estimate(self, key):
+        """(middel-score, standardfejl, antal kørsler) for én kandidat"""
+        _, runs, total, total_squares = self.candidates[key]
+        variance = self._variance(runs, total, total_squares, self.pooled_variance())
+        return total / runs, math.sqrt(variance / runs), runs
+
+    def unresolved(self, ranking=None):
+        """
+        Nabopar i rangeringen (inkl. grænsen mellem plads k og k+1) hvis
+        rækkefølge ikke er signifikant på det valgte konfidensniveau.
+        """
+        ranking = self.statistics() if ranking is None else ranking
+        pairs = []
+        for upper, lower in zip(ranking[:self.top_k], ranking[1:self.top_k + 1]):
+            spread = math.sqrt(upper['sem'] ** 2 + lower['sem'] ** 2)
+            if spread > 0 and (upper['mean'] - lower['mean']) / spread < self.z_critical:
+                pairs.append((upper, lower))
+        return pairs
+
+    def next_repeat(self, busy=()):
+        """
+        Næste kandidat der skal gentages, eller None når top-k er afgjort, budgettet
+        er brugt, eller de uafgjorte kandidater har nået max_runs / allerede kører.
+        """
+        if not self.enabled or self.repeats_used >= self.budget_runs:
+            return None
+        eligible = {}
+        for pair in self.unresolved():
+            for row in pair:
+                if row['runs'] < self.max_runs and row['key'] not in busy:
+                    eligible[row['key']] = row
+        if not eligible:
+            return None
+        # Størst standardfejl giver mest information pr. kørsel
+        choice = max(eligible.values(), key=lambda row: row['sem'])
+        self.repeats_used += 1
+        return choice['job']
+
+    def best(self):
+        """(job, middel-score) for kandidaten med højest middel-score, eller (None, -inf)"""
+        if not self.candidates:
+            return None, float('-inf')
+        job, runs, total, _ = max(self.candidates.values(), key=lambda c: c[2] / c[1])
+        return job, total / runs
+
+    def summary(self):
+        if not self.enabled or not self.candidates:
+            return ""
+        ranking = self.statistics()
+        state = "uafgjort" if self.unresolved(ranking) else "afgjort"
+        return f"{self.repeats_used} gentagelser, top-{self.top_k} {state}"
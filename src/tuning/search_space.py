@@ -0,0 +1,199 @@
+# src/tuning/search_space.py
+"""
+Deklarativt søgerum for AutoTuner
+
+Et søgerum er en liste af dimensioner (én pr. parameter). Hver dimension har
+en lille værdi-liste, men det kartesiske produkt materialiseres aldrig: et
+gitterpunkt adresseres med et fladt index og konverteres til et job (dict)
+først når det skal bruges.
+
+Spec-format (JSON-venligt, gemmes i kampagne-filen):
+    {'name': 'kp', 'type': 'range', 'start': 17.0, 'end': 19.0, 'step': 0.5}
+    {'name': 'power_gain', 'type': 'log', 'start': 0.01, 'end': 1.0, 'num': 5}
+    {'name': 'init_balance', 'type': 'choice', 'values': [-0.5, 0.0, 0.5]}
+"""
+
+import itertools
+import numpy as np
+from config.settings import (
+    AUTO_KP_START, AUTO_KP_END, AUTO_KP_STEP,
+    AUTO_KI_START, AUTO_KI_END, AUTO_KI_STEP,
+    AUTO_KD_START, AUTO_KD_END, AUTO_KD_STEP
+)
+
+GRID_ORDERS = ("lexicographic", "serpentine", "nearest")
+
+# Parametre som robotten kender (og som GUI'en kan sætte) - i gitterets standard-rækkefølge
+TUNABLE_PARAMS = ("kp", "kd", "ki", "init_balance", "power_gain")
+
+
+class Dimension:
+    """Én parameter i søgerummet med en endelig liste af værdier"""
+
+    def __init__(self, name, values, spec):
+        self.name = name
+        self.values = np.asarray(values, dtype=float)
+        self.spec = spec
+        if self.values.size == 0:
+            raise ValueError(f"Dimensionen {name} har ingen værdier")
+
+    def __len__(self):
+        return self.values.size
+
+    @staticmethod
+    def from_spec(spec):
+        name, kind = spec['name'], spec.get('type', 'range')
+        if kind == 'range':
+            start, end, step = float(spec['start']), float(spec['end']), float(spec['step'])
+            if step <= 0 or start > end:
+                raise ValueError(f"Ugyldigt interval for {name}: start={start}, slut={end}, skridt={step}")
+            # Antallet beregnes med tolerance, så afrunding ikke giver et ekstra punkt efter slut
+            num = int(np.floor((end - start) / step + 1e-9)) + 1
+            values = np.round(start + step * np.arange(num), 10)
+        elif kind == 'log':
+            start, end, num = float(spec['start']), float(spec['end']), int(spec['num'])
+            if start <= 0 or end < start or num < 1:
+                raise ValueError(f"Ugyldigt log-interval for {name}: start={start}, slut={end}, antal={num}")
+            values = np.geomspace(start, end, num)
+        elif kind == 'choice':
+            values = list(spec['values'])
+        else:
+            raise ValueError(f"Ukendt dimensionstype for {name}: {kind}")
+        return Dimension(name, values, dict(spec))
+
+
+class SearchSpace:
+    """Kartesisk produkt af dimensioner, adresseret lazily via flade indices"""
+
+    def __init__(self, dimensions):
+        self.dimensions = list(dimensions)
+        self.names = [dim.name for dim in self.dimensions]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Parametre optræder flere gange i søgerummet: {self.names}")
+        self.sizes = [len(dim) for dim in self.dimensions]
+        self._nearest_permutation = None
+
+    @staticmethod
+    def from_spec(specs):
+        return SearchSpace(Dimension.from_spec(spec) for spec in specs)
+
+    @staticmethod
+    def from_tune_params(tune_params):
+        """
+        Byg søgerummet fra tune_params. Nyere kampagner har en 'space' spec;
+        ældre har kun kp/kd/ki start/slut/skridt.
+        """
+        if 'space' in tune_params:
+            return SearchSpace.from_spec(tune_params['space'])
+        return SearchSpace.from_spec([
+            {'name': name, 'type': 'range', 'start': tune_params[f'{name}_start'],
+             'end': tune_params[f'{name}_end'], 'step': tune_params[f'{name}_step']}
+            for name in ('kp', 'kd', 'ki')
+        ])
+
+    @staticmethod
+    def default_spec():
+        """KP/KD/KI intervallerne fra settings (samme standard som GUI'ens felter)"""
+        return [
+            {'name': 'kp', 'type': 'range', 'start': AUTO_KP_START, 'end': AUTO_KP_END, 'step': AUTO_KP_STEP},
+            {'name': 'kd', 'type': 'range', 'start': AUTO_KD_START, 'end': AUTO_KD_END, 'step': AUTO_KD_STEP},
+            {'name': 'ki', 'type': 'range', 'start': AUTO_KI_START, 'end': AUTO_KI_END, 'step': AUTO_KI_STEP},
+        ]
+
+    def to_spec(self):
+        return [dim.spec for dim in self.dimensions]
+
+    @property
+    def ranges(self):
+        """Værdi-listerne pr. parameter (små - ét array pr. dimension)"""
+        return {dim.name: dim.values for dim in self.dimensions}
+
+    def __len__(self):
+        return int(np.prod(self.sizes, dtype=np.int64))
+
+    def job(self, grid_index):
+        """Job-dict for et gitter-index (tuple med ét index pr. dimension)"""
+        return {dim.name: float(dim.values[i]) for dim, i in zip(self.dimensions, grid_index)}
+
+    def unit_points(self, flat_indices):
+        """
+        Punkterne for de givne (leksikografiske) flade indices i index-koordinater
+        skaleret til [0, 1]. Log- og kategoriske dimensioner bliver dermed jævnt fordelt.
+        """
+        grid = np.array(np.unravel_index(np.asarray(flat_indices, dtype=np.int64), self.sizes), dtype=float).T
+        span = np.array([max(size - 1, 1) for size in self.sizes], dtype=float)
+        return grid / span
+
+    # --- Rækkefølger -------------------------------------------------------
+
+    def _serpentine_index(self, position):
+        """
+        Gitter-index for `position` i en boustrophedon-gennemgang. Hver indre
+        dimension gennemløbes skiftevis frem og tilbage, så to naboer i
+        rækkefølgen kun adskiller sig med ét skridt i én parameter.
+        """
+        digits = []
+        for axis in range(len(self.sizes)):
+            inner = int(np.prod(self.sizes[axis + 1:], dtype=np.int64))
+            digit, position = divmod(position, inner)
+            if digit % 2 == 1:
+                position = inner - 1 - position
+            digits.append(digit)
+        return tuple(digits)
+
+    def _nearest_order(self):
+        """
+        Grådig nærmeste-nabo rute (afstand i gitterskridt) startende i første punkt.
+        Kræver O(N) hukommelse og O(N^2) tid, så den beregnes kun én gang.
+        """
+        if self._nearest_permutation is None:
+            points = np.array(np.unravel_index(np.arange(len(self)), self.sizes), dtype=float).T
+            remaining = np.ones(len(points), dtype=bool)
+            order = np.empty(len(points), dtype=np.int64)
+            order[0] = 0
+            remaining[0] = False
+            for k in range(1, len(points)):
+                dist = np.sum((points - points[order[k - 1]]) ** 2, axis=1)
+                dist[~remaining] = np.inf
+                order[k] = int(np.argmin(dist))
+                remaining[order[k]] = False
+            self._nearest_permutation = order
+        return self._nearest_permutation
+
+    def grid_index(self, position, order="lexicographic"):
+        """
+        Gitter-index for den position'te job i den valgte rækkefølge:
+          - lexicographic: den klassiske indlejrede løkke (store spring i de indre parametre)
+          - serpentine:    boustrophedon - kun ét skridt i én parameter mellem jobs
+          - nearest:       grådig nærmeste-nabo rute med afstand målt i gitterskridt
+        """
+        if order == "lexicographic":
+            return tuple(int(i) for i in np.unravel_index(position, self.sizes))
+        if order == "serpentine":
+            return self._serpentine_index(position)
+        if order == "nearest":
+            return tuple(int(i) for i in np.unravel_index(self._nearest_order()[position], self.sizes))
+        raise ValueError(f"Ukendt rækkefølge: {order}")
+
+    def ordered_job(self, position, order="lexicographic"):
+        return self.job(self.grid_index(position, order))
+
+    def iter_jobs(self, order="lexicographic"):
+        """Generator over alle jobs i den valgte rækkefølge (intet materialiseres)"""
+        if order == "lexicographic":
+            for grid_index in itertools.product(*(range(size) for size in self.sizes)):
+                yield self.job(grid_index)
+        else:
+            for position in range(len(self)):
+                yield self.ordered_job(position, order)
+
+    def path_length(self, order="lexicographic"):
+        """Samlet parameter-ændring gennem rækkefølgen, målt i gitterskridt (euklidisk)"""
+        total = 0.0
+        previous = None
+        for position in range(len(self)):
+            current = np.array(self.grid_index(position, order), dtype=float)
+            if previous is not None:
+                total += float(np.sqrt(np.sum((current - previous) ** 2)))
+            previous = current
+        return total
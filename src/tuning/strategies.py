@@ -0,0 +1,753 @@
+# src/tuning/strategies.py
+"""
+Søgestrategier for AutoTuner
+
+En strategi følger et simpelt ask/tell-mønster: `propose()` returnerer det næste
+sæt parametre (eller None når søgningen er færdig), og `report()` fortæller
+strategien hvilken score et job fik.
+"""
+
+import math
+import numpy as np
+from config.settings import (
+    AUTO_DURATION_SEC,
+    AUTO_GRID_ORDER,
+    HALVING_MIN_DURATION_S,
+    HALVING_DURATION_S,
+    MIN_VALID_RUN_DURATION_S,
+    HALVING_ETA,
+    HALVING_BUDGET_S,
+    HYPERBAND_SEED,
+    BAYES_INITIAL_POINTS,
+    BAYES_MAX_EVALUATIONS,
+    BAYES_NOISE,
+    BAYES_XI,
+    BAYES_SEED,
+    BAYES_CANDIDATE_POOL,
+    PARETO_OBJECTIVES,
+    PARETO_MAX_EVALUATIONS,
+    PARETO_KAPPA,
+    PARETO_MIN_SCORE,
+    PRESCREEN_MIN_SCORE,
+    PRESCREEN_MAX_CANDIDATES,
+    PLANT_PARAMETER_FILE,
+    REFINE_TOP_K,
+    REFINE_MAX_PASSES,
+    REFINE_BUDGET_S,
+    LOCAL_INITIAL_STEP,
+    LOCAL_MAX_EVALUATIONS,
+    LOCAL_MAX_RUNS,
+    LOCAL_MIN_IMPROVEMENT,
+    LOCAL_PATIENCE,
+    LOCAL_MIN_SIZE,
+    LOCAL_CONFIDENCE,
+    load_pid_settings
+)
+from tuning.gaussian_process import GaussianProcess, expected_improvement
+from tuning.search_space import GRID_ORDERS, SearchSpace
+from tuning.prescreen import SimulationPrescreen
+from simulation.wheeled_plant import WheeledPendulumSimulator
+from tuning.pareto import ParetoFront
+from tuning.repeats import RepeatScheduler
+
+# Over denne størrelse beregnes den samlede parameter-ændring ikke ved start
+PATH_LENGTH_MAX_POINTS = 10000
+
+class SearchStrategy:
+    """
+    Basisklasse for søgestrategier
+
+    propose() kan returnere None midlertidigt mens jobs stadig er i gang (f.eks.
+    når et successive-halving trin venter på sine sidste scores). Søgningen er
+    først færdig når propose() returnerer None og intet job er udestående.
+    """
+
+    name = "base"
+    # False for strategier der ikke rangerer jobs efter den samlede score
+    # (så giver tidlig afbrydelse ud fra score-grænsen ingen mening)
+    scalar_score = True
+    # True for strategier der selv gentager usikre punkter (så gentager AutoTuner ikke top-k bagefter)
+    handles_noise = False
+    # False for strategier der bygger videre på hver score (model eller simplex) - en
+    # tidligt afbrudt kørsels delvise score ville give dem en forkert værdi for punktet
+    early_abort = True
+    # Kørselstid pr. job når brugeren ikke har valgt en (CLI'erne og GUI'ens felt)
+    default_duration_s = AUTO_DURATION_SEC
+    pareto_front = None
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, order=AUTO_GRID_ORDER):
+        # space: SearchSpace - gitteret adresseres lazily via flade indices
+        if order not in GRID_ORDERS:
+            raise ValueError(f"Ukendt rækkefølge: {order}")
+        self.space = space
+        self.param_names = list(space.names)
+        self.max_duration_s = max_duration_s
+        self.order = order
+
+    @property
+    def total_jobs(self):
+        """Forventet (maksimalt) antal jobs"""
+        raise NotImplementedError
+
+    def exhaustive_robot_time(self):
+        """Robot-sekunder det ville tage at køre hele gitteret med fuld varighed"""
+        return len(self.space) * self.max_duration_s
+
+    def propose(self):
+        raise NotImplementedError
+
+    def report(self, job, score):
+        pass
+
+    def report_metrics(self, job, metrics):
+        """Metrik-vektoren for et job (kaldes før report). De fleste strategier bruger kun scoren."""
+        pass
+
+    def summary(self):
+        """Valgfri strategi-specifik tekst til slut-rapporten"""
+        return ""
+
+    def job_key(self, job):
+        """Nøgle for et udestående job. Flere jobs kan være i gang samtidig (flere robotter)."""
+        return tuple(float(job[name]) for name in self.param_names) + (job.get('duration_s'),)
+
+
+class GridStrategy(SearchStrategy):
+    """Det fulde kartesiske produkt af alle parameter-værdier"""
+
+    name = "grid"
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, order=AUTO_GRID_ORDER):
+        super().__init__(space, max_duration_s, order)
+        self._index = 0
+        if len(space) <= PATH_LENGTH_MAX_POINTS:
+            print(f"AutoTuner: Rækkefølge '{order}' - samlet parameter-ændring {space.path_length(order):.0f} skridt.")
+
+    @property
+    def total_jobs(self):
+        return len(self.space)
+
+    def propose(self):
+        if self._index >= len(self.space):
+            return None
+        job = self.space.ordered_job(self._index, self.order)
+        self._index += 1
+        return job
+
+
+class BayesianStrategy(SearchStrategy):
+    """
+    Bayesiansk optimering med en Gaussian-proces og expected improvement
+
+    Kandidaterne er de samme gitterpunkter som GridStrategy ville køre. Efter
+    nogle tilfældige startpunkter vælges hvert nyt job som den ikke-testede
+    kandidat med størst expected improvement ud fra de hidtidige scores.
+    For store søgerum evalueres EI kun på en tilfældig pulje af kandidater.
+    """
+
+    name = "bayes"
+    early_abort = False
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, initial_points=BAYES_INITIAL_POINTS,
+                 max_evaluations=BAYES_MAX_EVALUATIONS, noise=BAYES_NOISE, xi=BAYES_XI, seed=BAYES_SEED,
+                 order=AUTO_GRID_ORDER, candidate_pool=BAYES_CANDIDATE_POOL):
+        super().__init__(space, max_duration_s, order)
+        self.initial_points = initial_points
+        self.max_evaluations = min(max_evaluations, len(space))
+        self.xi = xi
+        self.candidate_pool = candidate_pool
+        self.gp = GaussianProcess(noise=noise)
+        self.rng = np.random.default_rng(seed)
+
+        # Testede kandidater som flade (leksikografiske) indices
+        self._tested = set()
+        self._pending = {}
+        self._X = []
+        self._y = []
+
+    @property
+    def total_jobs(self):
+        return self.max_evaluations
+
+    def _untested_pool(self):
+        """Ikke-testede kandidater - alle hvis rummet er lille, ellers en tilfældig pulje"""
+        size = len(self.space)
+        if size <= self.candidate_pool:
+            return np.array([i for i in range(size) if i not in self._tested], dtype=np.int64)
+        pool = np.unique(self.rng.integers(0, size, self.candidate_pool))
+        return np.array([i for i in pool if i not in self._tested], dtype=np.int64)
+
+    def _propose_index(self, untested):
+        """Fladt index for næste kandidat blandt de ikke-testede"""
+        if len(self._y) < self.initial_points:
+            return int(self.rng.choice(untested))
+        # Index-koordinater i [0, 1], så længdeskalaen er sammenlignelig på tværs af dimensioner
+        self.gp.fit(np.array(self._X), self._y)
+        mean, std = self.gp.predict(self.space.unit_points(untested))
+        ei = expected_improvement(mean, std, max(self._y), self.xi)
+        return int(untested[np.argmax(ei)])
+
+    def propose(self):
+        if len(self._tested) >= self.max_evaluations:
+            return None
+
+        untested = self._untested_pool()
+        if untested.size == 0:
+            return None
+        choice = self._propose_index(untested)
+        self._tested.add(choice)
+        job = self.space.job(np.unravel_index(choice, self.space.sizes))
+        self._pending[self.job_key(job)] = choice
+        return job
+
+    def report(self, job, score):
+        choice = self._pending.pop(self.job_key(job), None)
+        if choice is None:
+            return
+        self._X.append(self.space.unit_points([choice])[0])
+        self._y.append(score)
+
+
+class ParetoStrategy(BayesianStrategy):
+    """
+    Multi-objektiv Bayesiansk optimering over metrik-vektoren
+
+    Hver metrik i PARETO_OBJECTIVES får sin egen Gaussian-proces. Kandidaternes
+    optimistiske prædiktion (middelværdi - kappa * spredning) sammenlignes med
+    den nuværende Pareto-front, og det næste job er den kandidat der ville øge
+    frontens hypervolumen mest. Jobs der vælter får referencepunktet, og jobs
+    uden metrikker (f.eks. genbrugt fra historikken) indgår ikke i modellen.
+    """
+
+    name = "pareto"
+    scalar_score = False
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, initial_points=BAYES_INITIAL_POINTS,
+                 max_evaluations=PARETO_MAX_EVALUATIONS, noise=BAYES_NOISE, kappa=PARETO_KAPPA, seed=BAYES_SEED,
+                 order=AUTO_GRID_ORDER, candidate_pool=BAYES_CANDIDATE_POOL, objectives=PARETO_OBJECTIVES,
+                 min_score=PARETO_MIN_SCORE):
+        super().__init__(space, max_duration_s, initial_points, max_evaluations, noise, seed=seed, order=order,
+                         candidate_pool=candidate_pool)
+        self.kappa = kappa
+        self.min_score = min_score
+        self.pareto_front = ParetoFront(objectives)
+        self.gps = [GaussianProcess(noise=noise) for _ in objectives]
+        self._metrics = {}
+
+    def _propose_index(self, untested):
+        if len(self._y) < self.initial_points:
+            return int(self.rng.choice(untested))
+        X = np.array(self._X)
+        Y = np.array(self._y)
+        unit = self.space.unit_points(untested)
+        optimistic = np.empty((untested.size, Y.shape[1]))
+        spread = np.zeros(untested.size)
+        for axis, gp in enumerate(self.gps):
+            gp.fit(X, Y[:, axis])
+            mean, std = gp.predict(unit)
+            optimistic[:, axis] = mean - self.kappa * std
+            spread += std / self.pareto_front.reference[axis]
+        best, _ = self.pareto_front.best_improvement(optimistic)
+        if best is None:
+            # Ingen kandidat forventes at forbedre fronten - udforsk hvor modellen er mest usikker
+            best = int(np.argmax(spread))
+        return int(untested[best])
+
+    def report_metrics(self, job, metrics):
+        self._metrics[self.job_key(job)] = metrics
+
+    def report(self, job, score):
+        key = self.job_key(job)
+        choice = self._pending.pop(key, None)
+        metrics = self._metrics.pop(key, None)
+        if choice is None:
+            return
+        if score <= self.min_score:
+            metrics = {}  # Væltet eller for kort: referencepunktet
+        elif metrics is None:
+            return
+        self.pareto_front.add(job, score, metrics)
+        self._X.append(self.space.unit_points([choice])[0])
+        self._y.append(self.pareto_front.vector(metrics))
+
+    def summary(self):
+        return f"{self.pareto_front.summary()}, hypervolumen {self.pareto_front.hypervolume():.3g}"
+
+
+class SuccessiveHalvingStrategy(SearchStrategy):
+    """
+    Successive halving over gitteret med varigheden som "fidelity"
+
+    Alle kandidater får først en kort kørsel. Efter hvert trin (rung) forfremmes
+    den bedste 1/eta del til en eta gange længere kørsel, indtil den fulde
+    varighed er nået. Jobs har derfor en ekstra nøgle 'duration_s'.
+    """
+
+    name = "halving"
+    default_duration_s = HALVING_DURATION_S
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, min_duration_s=HALVING_MIN_DURATION_S,
+                 eta=HALVING_ETA, budget_s=HALVING_BUDGET_S, order=AUTO_GRID_ORDER):
+        super().__init__(space, max_duration_s, order)
+        self.eta = eta
+        self.budget_s = budget_s
+        # Kandidater er positioner i gitter-rækkefølgen, så naboer i køen ligger tæt
+        self.num_candidates = len(space)
+        self.durations = self._rung_durations(min_duration_s, max_duration_s, eta)
+        self.brackets = self._make_brackets()
+        if len(self.durations) > 1 and self.planned_robot_time() >= self.exhaustive_robot_time():
+            # F.eks. 15s kørsler: trinene 10s/15s koster mere end gitteret med fuld varighed
+            print(f"AutoTuner: Trinene {', '.join(f'{d:.0f}s' for d in self.durations)} sparer ingen robot-tid "
+                  f"- kører hele gitteret med {max_duration_s:.0f}s. Brug mindst "
+                  f"{eta * MIN_VALID_RUN_DURATION_S:.0f}s varighed for at spare tid.")
+            self.durations = [float(max_duration_s)]
+            self.brackets = SuccessiveHalvingStrategy._make_brackets(self)
+
+        self.robot_time_s = 0.0
+        self._bracket_index = -1
+        self._rung = 0
+        self._queue = iter(())
+        self._queue_size = 0
+        self._rung_scores = {}
+        self._pending = {}
+        self._start_next_bracket()
+
+    @staticmethod
+    def _rung_durations(min_duration_s, max_duration_s, eta):
+        """
+        Varigheder fra kortest til længst; den længste er altid max_duration_s.
+
+        Kørsler kortere end MIN_VALID_RUN_DURATION_S scorer 0, så korte trin
+        forlænges til den grænse (og trin der bliver ens slås sammen).
+        """
+        durations = [float(max_duration_s)]
+        while durations[-1] / eta >= min_duration_s:
+            durations.append(durations[-1] / eta)
+        shortest = min(MIN_VALID_RUN_DURATION_S, float(max_duration_s))
+        clamped = sorted({max(duration, shortest) for duration in durations})
+        if len(clamped) < len(durations) or clamped[0] > durations[-1]:
+            print(f"AutoTuner: Korteste kørsel forlænget til {shortest:.1f}s (kortere kørsler scores ikke).")
+        return clamped
+
+    def _make_brackets(self):
+        """Liste af (kandidat-indices, første rung). Én bracket med hele gitteret."""
+        return [(range(self.num_candidates), 0)]
+
+    def _rung_sizes(self, num_candidates, first_rung):
+        sizes = [num_candidates]
+        for _ in range(first_rung + 1, len(self.durations)):
+            sizes.append(max(1, int(math.ceil(sizes[-1] / self.eta))))
+        return sizes
+
+    @property
+    def total_jobs(self):
+        return sum(sum(self._rung_sizes(len(indices), first_rung)) for indices, first_rung in self.brackets)
+
+    def planned_robot_time(self):
+        """Robot-sekunder hvis alle trin køres (uden budget-grænse)"""
+        total = 0.0
+        for indices, first_rung in self.brackets:
+            sizes = self._rung_sizes(len(indices), first_rung)
+            total += sum(n * d for n, d in zip(sizes, self.durations[first_rung:]))
+        return total
+
+    def _start_next_bracket(self):
+        self._bracket_index += 1
+        if self._bracket_index >= len(self.brackets):
+            self._queue = iter(())
+            self._queue_size = 0
+            return False
+        indices, first_rung = self.brackets[self._bracket_index]
+        self._rung = first_rung
+        self._queue = iter(indices)
+        self._queue_size = len(indices)
+        self._rung_scores = {}
+        return True
+
+    def _promote(self):
+        """Forfrem den bedste 1/eta del af det afsluttede trin til næste varighed"""
+        ranked = sorted(self._rung_scores, key=self._rung_scores.get, reverse=True)
+        keep = max(1, int(math.ceil(len(ranked) / self.eta)))
+        self._rung += 1
+        # Kandidat-index følger gitter-rækkefølgen - sortér for korte parameterspring
+        self._queue = iter(sorted(ranked[:keep]))
+        self._queue_size = keep
+        self._rung_scores = {}
+        print(f"AutoTuner: Forfremmer {keep} af {len(ranked)} kandidater til {self.durations[self._rung]:.1f}s kørsler.")
+
+    def propose(self):
+        while True:
+            if self._queue_size:
+                duration = self.durations[self._rung]
+                if self.budget_s is not None and self.robot_time_s + duration > self.budget_s:
+                    print("AutoTuner: Robot-tidsbudget opbrugt.")
+                    return None
+                candidate = next(self._queue)
+                self._queue_size -= 1
+                job = dict(self.space.ordered_job(candidate, self.order), duration_s=duration)
+                self._pending[self.job_key(job)] = candidate
+                return job
+
+            # Trinnet kan først afsluttes når alle dets kørsler har en score
+            if self._pending:
+                return None
+
+            if self._rung_scores and self._rung < len(self.durations) - 1:
+                self._promote()
+            elif not self._start_next_bracket():
+                return None
+
+    def report(self, job, score):
+        candidate = self._pending.pop(self.job_key(job), None)
+        if candidate is None:
+            return
+        self._rung_scores[candidate] = score
+        self.robot_time_s += job.get('duration_s', self.max_duration_s)
+
+
+class HyperbandStrategy(SuccessiveHalvingStrategy):
+    """
+    Hyperband: flere successive-halving brackets med forskellig balance mellem
+    antal kandidater og start-varighed. Kandidaterne trækkes tilfældigt fra gitteret.
+    """
+
+    name = "hyperband"
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, min_duration_s=HALVING_MIN_DURATION_S,
+                 eta=HALVING_ETA, budget_s=HALVING_BUDGET_S, seed=HYPERBAND_SEED, order=AUTO_GRID_ORDER):
+        self.rng = np.random.default_rng(seed)
+        super().__init__(space, max_duration_s, min_duration_s, eta, budget_s, order)
+
+    def _make_brackets(self):
+        s_max = len(self.durations) - 1
+        brackets = []
+        for s in range(s_max, -1, -1):
+            n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            n = min(n, self.num_candidates)
+            indices = sorted(self.rng.choice(self.num_candidates, size=n, replace=False).tolist())
+            brackets.append((indices, s_max - s))
+        return brackets
+
+
+class PrescreenStrategy(SearchStrategy):
+    """
+    Simulerings-screenet gitter: hele søgerummet scores først i simuleringen,
+    ustabile kandidater forkastes, og kun de bedste køres på robotten i
+    rækkefølge efter forventet score. Kræver en identificeret model (PLANT_PARAMETER_FILE),
+    da standard-modellen ikke gengiver robotten.
+    """
+
+    name = "sim"
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, order=AUTO_GRID_ORDER,
+                 min_score=PRESCREEN_MIN_SCORE, max_candidates=PRESCREEN_MAX_CANDIDATES,
+                 plant_file=PLANT_PARAMETER_FILE):
+        super().__init__(space, max_duration_s, order)
+        simulator = WheeledPendulumSimulator.from_parameter_file(plant_file)
+        self.candidates, self.num_simulated = SimulationPrescreen.select(space, min_score, max_candidates,
+                                                                         simulator=simulator)
+        self._index = 0
+
+    @property
+    def total_jobs(self):
+        return len(self.candidates)
+
+    def propose(self):
+        if self._index >= len(self.candidates):
+            return None
+        flat_index, predicted_score = self.candidates[self._index]
+        self._index += 1
+        job = self.space.job(np.unravel_index(flat_index, self.space.sizes))
+        print(f"AutoTuner: Forventet score i simulering: {predicted_score:.1f}")
+        return job
+
+    def summary(self):
+        avoided = len(self.space) - len(self.candidates)
+        return f"{avoided} af {len(self.space)} fysiske kørsler undgået ved simulering"
+
+
+class RefinementStrategy(SearchStrategy):
+    """
+    Adaptiv gitter-forfining omkring det bedste område
+
+    Første gennemløb er det grove gitter. Når alle scores for et gennemløb er
+    modtaget, halveres skridtet for 'range'-dimensionerne i en boks omkring de
+    top_k bedste resultater (udvidet med ét nyt skridt til hver side og holdt
+    inden for det oprindelige interval), og kun punkter der ikke er kørt før
+    sendes ud. Øvrige dimensioner begrænses til de værdier top_k har. Søgningen
+    stopper efter max_passes forfinelser, når en boks ikke giver nye punkter,
+    eller når næste job ville overskride robot-tidsbudgettet.
+    """
+
+    name = "refine"
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, order=AUTO_GRID_ORDER, top_k=REFINE_TOP_K,
+                 max_passes=REFINE_MAX_PASSES, budget_s=REFINE_BUDGET_S):
+        super().__init__(space, max_duration_s, order)
+        self.top_k = top_k
+        self.max_passes = max_passes
+        self.budget_s = budget_s
+        self.robot_time_s = 0.0
+        self.num_passes = 0
+        # Oprindeligt interval og nuværende skridt for dimensioner der kan forfines
+        self._bounds = {dim.name: (float(dim.values[0]), float(dim.values[-1]))
+                        for dim in space.dimensions if dim.spec.get('type', 'range') == 'range'}
+        self._steps = {dim.name: float(dim.spec['step']) for dim in space.dimensions if dim.name in self._bounds}
+        self._pass_space = space
+        self._position = 0
+        self._tested = set()
+        self._pending = {}
+        self._results = []
+
+    @property
+    def total_jobs(self):
+        if self.budget_s:
+            return int(self.budget_s // self.max_duration_s)
+        return len(self.space) * (self.max_passes + 1)
+
+    def exhaustive_robot_time(self):
+        """Robot-tid for hele intervallet med det fineste skridt der er nået"""
+        points = 1
+        for dim in self.space.dimensions:
+            if dim.name in self._steps:
+                start, end = self._bounds[dim.name]
+                points *= int(round((end - start) / self._steps[dim.name])) + 1
+            else:
+                points *= len(dim)
+        return points * self.max_duration_s
+
+    def _point_key(self, job):
+        return tuple(round(float(job[name]), 6) for name in self.param_names)
+
+    def _next_pass(self):
+        """Byg søgerummet for næste forfining. False når der ikke skal forfines mere."""
+        if self.num_passes >= self.max_passes or not self._results:
+            return False
+        top = sorted(self._results, key=lambda result: result[1], reverse=True)[:self.top_k]
+        specs = []
+        for dim in self.space.dimensions:
+            values = [job[dim.name] for job, _ in top]
+            if dim.name not in self._steps:
+                specs.append({'name': dim.name, 'type': 'choice', 'values': sorted(set(values))})
+                continue
+            step = self._steps[dim.name] / 2.0
+            self._steps[dim.name] = step
+            start, end = self._bounds[dim.name]
+            low = max(start, min(values) - step)
+            high = min(end, max(values) + step)
+            # Punkterne holdes på det oprindelige gitter (start + n * skridt), så de kan genkendes
+            low = start + np.ceil((low - start) / step - 1e-9) * step
+            specs.append({'name': dim.name, 'type': 'range', 'start': low, 'end': high, 'step': step})
+        self._pass_space = SearchSpace.from_spec(specs)
+        self._position = 0
+        self.num_passes += 1
+        steps = ", ".join(f"{name.upper()} {step:g}" for name, step in self._steps.items())
+        print(f"AutoTuner: Forfining {self.num_passes} omkring de {len(top)} bedste - skridt {steps}.")
+        return True
+
+    def propose(self):
+        while True:
+            while self._position < len(self._pass_space):
+                if self.budget_s and self.robot_time_s + self.max_duration_s > self.budget_s + 1e-9:
+                    return None
+                job = self._pass_space.ordered_job(self._position, self.order)
+                self._position += 1
+                key = self._point_key(job)
+                if key in self._tested:
+                    continue
+                self._tested.add(key)
+                self._pending[self.job_key(job)] = True
+                self.robot_time_s += self.max_duration_s
+                return job
+            if self._pending:
+                return None  # Gennemløbet er ikke færdigt før alle scores er modtaget
+            if not self._next_pass():
+                return None
+
+    def report(self, job, score):
+        if self._pending.pop(self.job_key(job), None) is None:
+            return
+        self._results.append((job, score))
+
+    def summary(self):
+        return f"{self.num_passes} forfinelser, {len(self._tested)} unikke punkter"
+
+
+class NelderMeadStrategy(SearchStrategy):
+    """
+    Støjtolerant Nelder-Mead lokalt omkring en god konfiguration
+
+    Starter i `start` (som standard best_config fra pid_settings.json) og
+    søger kontinuert inden for søgerummets intervaller - gitterets skridt
+    bruges ikke. Hvert nyt punkt køres én gang. Kun når en simplex-beslutning
+    (refleksion, ekspansion, kontraktion) afhænger af en forskel der ikke er
+    signifikant, køres det mest usikre af de to punkter igen (højst max_runs
+    gange). Søgningen stopper når forskellen mellem simplexens bedste og
+    dårligste middel-score, eller den bedste middel-scores forbedring over
+    `patience` iterationer, er under min_improvement, når simplexen er mindre
+    end min_size, eller efter max_evaluations kørsler.
+    """
+
+    name = "local"
+    handles_noise = True
+    early_abort = False
+
+    def __init__(self, space, max_duration_s=AUTO_DURATION_SEC, order=AUTO_GRID_ORDER, start=None,
+                 initial_step=LOCAL_INITIAL_STEP, max_evaluations=LOCAL_MAX_EVALUATIONS, max_runs=LOCAL_MAX_RUNS,
+                 min_improvement=LOCAL_MIN_IMPROVEMENT, patience=LOCAL_PATIENCE, min_size=LOCAL_MIN_SIZE,
+                 confidence=LOCAL_CONFIDENCE):
+        super().__init__(space, max_duration_s, order)
+        self._lower = np.array([dim.values.min() for dim in space.dimensions])
+        self._span = np.array([dim.values.max() for dim in space.dimensions]) - self._lower
+        start = start or NelderMeadStrategy.default_start()
+        self.start = {name: float(start.get(name, low + span / 2))
+                      for name, low, span in zip(self.param_names, self._lower, self._span)}
+        self.initial_step = initial_step
+        self.max_evaluations = max_evaluations
+        self.max_runs = max_runs
+        self.min_improvement = min_improvement
+        self.patience = patience
+        self.min_size = min_size
+        self.stats = RepeatScheduler(top_k=0, confidence=confidence)
+        self.num_evaluations = 0
+        self.num_iterations = 0
+        self.num_decision_repeats = 0
+        self.stop_reason = ""
+        self._waiting = None
+        self._finished = False
+        self._steps = self._search()
+
+    @staticmethod
+    def default_start():
+        """best_config fra pid_settings.json, ellers de gemte PID-parametre"""
+        pid_params, best_config = load_pid_settings()
+        if best_config and best_config.get('pid_params'):
+            return dict(best_config['pid_params'])
+        return pid_params
+
+    @property
+    def total_jobs(self):
+        return self.max_evaluations
+
+    # --- Punkter i enheds-koordinater (0..1 pr. parameter) ------------------
+
+    def _job(self, point):
+        values = self._lower + np.clip(point, 0.0, 1.0) * self._span
+        return {name: round(float(value), 4) for name, value in zip(self.param_names, values)}
+
+    def _key(self, point):
+        return self.job_key(self._job(point))
+
+    def _mean(self, point):
+        return self.stats.estimate(self._key(point))[0]
+
+    def _ensure(self, point):
+        """Kør punktet hvis det ikke er kørt før (generator)"""
+        if self._key(point) not in self.stats.candidates:
+            yield self._job(point)
+
+    def _better(self, a, b):
+        """Er a bedre end b? Usikre sammenligninger afgøres med gentagelser (generator)."""
+        if self._key(a) == self._key(b):
+            return False
+        while True:
+            mean_a, sem_a, runs_a = self.stats.estimate(self._key(a))
+            mean_b, sem_b, runs_b = self.stats.estimate(self._key(b))
+            if abs(mean_a - mean_b) >= self.stats.z_critical * math.sqrt(sem_a ** 2 + sem_b ** 2):
+                return mean_a > mean_b
+            uncertain = [(sem, point) for sem, runs, point in ((sem_a, runs_a, a), (sem_b, runs_b, b))
+                         if runs < self.max_runs]
+            if not uncertain:
+                return mean_a > mean_b
+            self.num_decision_repeats += 1
+            yield self._job(max(uncertain, key=lambda item: item[0])[1])
+
+    def _search(self):
+        """Nelder-Mead som generator: yield'er jobs og læser deres scores fra self.stats"""
+        dims = len(self.param_names)
+        safe_span = np.where(self._span > 0, self._span, 1.0)
+        origin = np.clip((np.array([self.start[name] for name in self.param_names]) - self._lower) / safe_span, 0, 1)
+        simplex = [origin]
+        for axis in range(dims):
+            vertex = origin.copy()
+            vertex[axis] += self.initial_step if vertex[axis] + self.initial_step <= 1.0 else -self.initial_step
+            simplex.append(vertex)
+        for vertex in simplex:
+            yield from self._ensure(vertex)
+
+        best_history = []
+        while True:
+            simplex.sort(key=self._mean, reverse=True)
+            self.num_iterations += 1
+            best_history.append(self._mean(simplex[0]))
+            if self._mean(simplex[0]) - self._mean(simplex[-1]) < self.min_improvement:
+                self.stop_reason = f"simplexens scores ligger inden for {self.min_improvement:g}"
+                return
+            if (len(best_history) > self.patience
+                    and best_history[-1] - best_history[-1 - self.patience] < self.min_improvement):
+                self.stop_reason = f"forbedring under {self.min_improvement:g} over {self.patience} iterationer"
+                return
+            if max(np.max(np.abs(vertex - simplex[0])) for vertex in simplex[1:]) < self.min_size:
+                self.stop_reason = "simplexen er konvergeret"
+                return
+
+            centroid = np.mean(simplex[:-1], axis=0)
+            worst = simplex[-1]
+            reflected = np.clip(2.0 * centroid - worst, 0.0, 1.0)
+            yield from self._ensure(reflected)
+            if (yield from self._better(reflected, simplex[0])):
+                expanded = np.clip(3.0 * centroid - 2.0 * worst, 0.0, 1.0)
+                yield from self._ensure(expanded)
+                simplex[-1] = expanded if (yield from self._better(expanded, reflected)) else reflected
+            elif (yield from self._better(reflected, simplex[-2])):
+                simplex[-1] = reflected
+            else:
+                # Kontraktion mod det bedste af det reflekterede og det dårligste punkt
+                anchor = reflected if (yield from self._better(reflected, worst)) else worst
+                contracted = centroid + 0.5 * (anchor - centroid)
+                yield from self._ensure(contracted)
+                if (yield from self._better(contracted, anchor)):
+                    simplex[-1] = contracted
+                else:
+                    for i in range(1, len(simplex)):
+                        simplex[i] = simplex[0] + 0.5 * (simplex[i] - simplex[0])
+                        yield from self._ensure(simplex[i])
+
+    def propose(self):
+        if self._waiting is not None or self._finished:
+            return None
+        if self.num_evaluations >= self.max_evaluations:
+            self.stop_reason = f"maks. {self.max_evaluations} kørsler"
+            job = None
+        else:
+            job = next(self._steps, None)
+        if job is None:
+            self._finished = True
+            print(f"AutoTuner: Lokal søgning stopper - {self.stop_reason}.")
+            return None
+        self._waiting = self.job_key(job)
+        self.num_evaluations += 1
+        return job
+
+    def report(self, job, score):
+        key = self.job_key(job)
+        if key != self._waiting:
+            return
+        self._waiting = None
+        self.stats.add(key, job, score)
+
+    def summary(self):
+        return (f"{self.num_iterations} Nelder-Mead iterationer, "
+                f"{self.num_decision_repeats} gentagelser ved usikre beslutninger")
+
+
+STRATEGIES = {
+    GridStrategy.name: GridStrategy,
+    BayesianStrategy.name: BayesianStrategy,
+    ParetoStrategy.name: ParetoStrategy,
+    SuccessiveHalvingStrategy.name: SuccessiveHalvingStrategy,
+    HyperbandStrategy.name: HyperbandStrategy,
+    PrescreenStrategy.name: PrescreenStrategy,
+    RefinementStrategy.name: RefinementStrategy,
+    NelderMeadStrategy.name: NelderMeadStrategy,
+}